@@ -19,6 +19,85 @@ class Settings(BaseSettings):
     mistral_api_key: str | None = Field(default=None, alias="MISTRAL_API_KEY")
     # OCR engine: tesseract | pixtral (Mistral Pixtral for vision).
     ocr_engine: str = Field(default="tesseract", alias="OCR_ENGINE")
+    # Tesseract quality routing: accept >= OCR_ACCEPT_SCORE; else retry with clean-up; Pixtral below OCR_ESCALATE_SCORE.
+    ocr_accept_score: float = Field(default=0.7, alias="OCR_ACCEPT_SCORE")
+    ocr_escalate_score: float = Field(default=0.55, alias="OCR_ESCALATE_SCORE")
+    ocr_retry_enhanced: bool = Field(default=True, alias="OCR_RETRY_ENHANCED")
+    # Image preprocessing before OCR (app.ocr.preprocess); vision images are downscaled to OCR_VISION_MAX_SIDE.
+    ocr_preprocess: bool = Field(default=True, alias="OCR_PREPROCESS")
+    ocr_target_width: int = Field(default=1600, alias="OCR_TARGET_WIDTH")
+    ocr_deskew: bool = Field(default=True, alias="OCR_DESKEW")
+    ocr_autocrop: bool = Field(default=True, alias="OCR_AUTOCROP")
+    ocr_vision_max_side: int = Field(default=1600, alias="OCR_VISION_MAX_SIDE")
+    # PDF rendering: DPI for plans without their own (pdf_extractor.PLAN_PDF_DPI); pages beyond PDF_MAX_PAGES are skipped.
+    pdf_dpi: int = Field(default=150, alias="PDF_DPI")
+    pdf_max_pages: int = Field(default=50, alias="PDF_MAX_PAGES")
+    # Auth: local = verify JWT in-process (remote /auth/v1/user only as fallback); remote = always call Supabase.
+    auth_mode: str = Field(default="local", alias="AUTH_MODE")
+    auth_jwks_ttl_seconds: float = Field(default=600.0, alias="AUTH_JWKS_TTL_SECONDS")
+    auth_clock_skew_seconds: int = Field(default=30, alias="AUTH_CLOCK_SKEW_SECONDS")
+    # user→org and org→plan cache; set CACHE_REDIS_URL to share it across workers.
+    org_cache_ttl_seconds: float = Field(default=60.0, alias="ORG_CACHE_TTL_SECONDS")
+    org_cache_max_entries: int = Field(default=10000, alias="ORG_CACHE_MAX_ENTRIES")
+    cache_redis_url: str | None = Field(default=None, alias="CACHE_REDIS_URL")
+    # Threads available for blocking Supabase calls made from async code.
+    db_max_concurrency: int = Field(default=32, alias="DB_MAX_CONCURRENCY")
+    # Shared outbound HTTP pools (Supabase Auth/functions, Mistral).
+    http_max_connections: int = Field(default=100, alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(default=20, alias="HTTP_MAX_KEEPALIVE_CONNECTIONS")
+    http_keepalive_expiry_seconds: float = Field(default=30.0, alias="HTTP_KEEPALIVE_EXPIRY_SECONDS")
+    http_connect_timeout_seconds: float = Field(default=5.0, alias="HTTP_CONNECT_TIMEOUT_SECONDS")
+    http_timeout_seconds: float = Field(default=10.0, alias="HTTP_TIMEOUT_SECONDS")
+    mistral_timeout_seconds: float = Field(default=120.0, alias="MISTRAL_TIMEOUT_SECONDS")
+    http2_enabled: bool = Field(default=True, alias="HTTP2_ENABLED")
+    # Rule-based structuring for clean receipts; the LLM is only called when it cannot validate.
+    structuring_fast_path: bool = Field(default=True, alias="STRUCTURING_FAST_PATH")
+    structuring_fast_path_min_confidence: float = Field(default=0.9, alias="STRUCTURING_FAST_PATH_MIN_CONFIDENCE")
+    # Pack up to N receipts (within a token budget) into one structuring request; 1 disables.
+    structuring_batch_size: int = Field(default=6, alias="STRUCTURING_BATCH_SIZE")
+    structuring_batch_token_budget: int = Field(default=6000, alias="STRUCTURING_BATCH_TOKEN_BUDGET")
+    structuring_batch_linger_ms: float = Field(default=250.0, alias="STRUCTURING_BATCH_LINGER_MS")
+    # Process-wide slots shared fairly across orgs (OCR CPU slots follow OCR_WORKERS).
+    scheduler_vision_slots: int = Field(default=4, alias="SCHEDULER_VISION_SLOTS")
+    scheduler_llm_slots: int = Field(default=8, alias="SCHEDULER_LLM_SLOTS")
+    # Mistral rate limit (size to your tier) and retry backoff for structuring/vision calls.
+    mistral_requests_per_second: float = Field(default=5.0, alias="MISTRAL_REQUESTS_PER_SECOND")
+    mistral_burst: float = Field(default=10.0, alias="MISTRAL_BURST")
+    mistral_backoff_base_seconds: float = Field(default=1.0, alias="MISTRAL_BACKOFF_BASE_SECONDS")
+    mistral_backoff_max_seconds: float = Field(default=30.0, alias="MISTRAL_BACKOFF_MAX_SECONDS")
+    # Batch extraction queue: supabase | sqlite | inline (BackgroundTasks in the API process).
+    job_queue_backend: str = Field(default="supabase", alias="JOB_QUEUE_BACKEND")
+    job_queue_sqlite_path: str = Field(default="vaultslip_jobs.db", alias="JOB_QUEUE_SQLITE_PATH")
+    job_visibility_timeout_seconds: float = Field(default=300.0, alias="JOB_VISIBILITY_TIMEOUT_SECONDS")
+    job_max_attempts: int = Field(default=3, alias="JOB_MAX_ATTEMPTS")
+    job_retry_backoff_seconds: float = Field(default=30.0, alias="JOB_RETRY_BACKOFF_SECONDS")
+    worker_concurrency: int = Field(default=2, alias="WORKER_CONCURRENCY")
+    worker_poll_interval_seconds: float = Field(default=2.0, alias="WORKER_POLL_INTERVAL_SECONDS")
+    # POST /upload: files validated and written to storage concurrently.
+    upload_concurrency: int = Field(default=8, alias="UPLOAD_CONCURRENCY")
+    # Resumable upload sessions (/upload/sessions): lifetime and size limits.
+    upload_session_ttl_hours: float = Field(default=24.0, alias="UPLOAD_SESSION_TTL_HOURS")
+    upload_session_max_file_mb: int = Field(default=20, alias="UPLOAD_SESSION_MAX_FILE_MB")
+    upload_session_max_part_mb: int = Field(default=5, alias="UPLOAD_SESSION_MAX_PART_MB")
+    upload_session_commit_timeout_seconds: float = Field(default=600.0, alias="UPLOAD_SESSION_COMMIT_TIMEOUT_SECONDS")
+    # Batch pipeline: concurrent downloads/extractions joined by bounded queues.
+    batch_download_concurrency: int = Field(default=8, alias="BATCH_DOWNLOAD_CONCURRENCY")
+    batch_extract_concurrency: int = Field(default=8, alias="BATCH_EXTRACT_CONCURRENCY")
+    batch_queue_depth: int = Field(default=16, alias="BATCH_QUEUE_DEPTH")
+    # Tesseract OCR pool: process | thread; OCR_WORKERS=0 means one worker per core.
+    ocr_executor: str = Field(default="process", alias="OCR_EXECUTOR")
+    ocr_workers: int = Field(default=0, alias="OCR_WORKERS")
+    # Per-org cache of OCR + structuring results, keyed by image SHA-256 (local SQLite, LRU-bounded).
+    extraction_cache_enabled: bool = Field(default=True, alias="EXTRACTION_CACHE_ENABLED")
+    extraction_cache_path: str = Field(default="vaultslip_extraction_cache.db", alias="EXTRACTION_CACHE_PATH")
+    extraction_cache_max_mb: float = Field(default=256.0, alias="EXTRACTION_CACHE_MAX_MB")
+    # Cross-batch near-duplicate images (perceptual hash, Hamming distance of 256 bits):
+    # <= DUPLICATE_FLAG_DISTANCE is saved for review; <= DUPLICATE_SKIP_DISTANCE is not extracted
+    # (off by default: retakes land ~15-30 bits apart, so only values well below that are safe).
+    duplicate_detection: bool = Field(default=True, alias="DUPLICATE_DETECTION")
+    duplicate_skip_distance: int = Field(default=-1, alias="DUPLICATE_SKIP_DISTANCE")
+    duplicate_flag_distance: int = Field(default=40, alias="DUPLICATE_FLAG_DISTANCE")
+    duplicate_index_ttl_seconds: float = Field(default=300.0, alias="DUPLICATE_INDEX_TTL_SECONDS")
     # Accept a simple comma-separated string in .env and expose a parsed list.
     cors_origins_raw: str = Field(default="http://localhost:3000", alias="CORS_ORIGINS")
 
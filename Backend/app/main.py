@@ -6,7 +6,10 @@ from fastapi.responses import JSONResponse
 
 from app.config import get_settings
 from app.logging_config import configure_logging
-from app.routes import health, me, receipts, upload, chat, contact, batches, profile, organizations, preferences, api_keys, data_export, account, receipt_templates
+from app.ocr.executor import shutdown_ocr_executor
+from app.services.db import shutdown_executor
+from app.services.http_clients import close_clients
+from app.routes import health, me, receipts, upload, chat, contact, batches, profile, organizations, preferences, api_keys, data_export, account, receipt_templates, upload_sessions
 
 configure_logging()
 logger = logging.getLogger(__name__)
@@ -39,6 +42,7 @@ app.include_router(api_keys.router, prefix="/api/api-keys", tags=["api-keys"])
 app.include_router(data_export.router, prefix="/api/data", tags=["data"])
 app.include_router(account.router, prefix="/api/account", tags=["account"])
 app.include_router(upload.router, prefix="/upload", tags=["upload"])
+app.include_router(upload_sessions.router, prefix="/upload/sessions", tags=["upload"])
 app.include_router(receipts.router, prefix="/receipts", tags=["receipts"])
 app.include_router(receipt_templates.router, prefix="/receipt-templates", tags=["templates"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
@@ -49,3 +53,10 @@ app.include_router(batches.router, prefix="/batches", tags=["batches"])
 @app.on_event("startup")
 async def _log_startup() -> None:
     logger.info("VaultSlip API startup complete")
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    shutdown_executor()
+    shutdown_ocr_executor()
+    await close_clients()
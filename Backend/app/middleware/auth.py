@@ -1,14 +1,55 @@
-"""Verify token via Supabase Auth server (works with HS256 and RS256). Resolve org_id from profiles."""
+"""Verify token locally (HS256 secret / RS256 JWKS), falling back to Supabase Auth. Resolve org_id (cached) from profiles."""
 import logging
 from functools import wraps
 import httpx
+import jwt
 from fastapi import Request, HTTPException
 from app.config import get_settings
-from app.services.supabase_client import get_supabase
+from app.services.http_clients import get_http_client
+from app.services.jwt_verifier import LocalVerificationUnavailable, verify_token_locally
+from app.services.org_quota import get_user_org_id
 
 logger = logging.getLogger(__name__)
 
 
+async def _verify_remote(token: str) -> str:
+    """Ask Supabase Auth who owns the token; returns user_id."""
+    settings = get_settings()
+    url = f"{settings.supabase_url.rstrip('/')}/auth/v1/user"
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "apikey": settings.supabase_service_role_key,
+    }
+    try:
+        resp = await get_http_client().get(url, headers=headers)
+    except httpx.RequestError as e:
+        logger.warning("Auth: Supabase request failed", extra={"error": str(type(e).__name__)})
+        raise HTTPException(status_code=503, detail="Auth service unavailable")
+    if resp.status_code != 200:
+        logger.info("Auth: invalid or expired token")
+        raise HTTPException(status_code=401, detail="Invalid token")
+    data = resp.json()
+    user_id = (data.get("id") or data.get("sub")) if isinstance(data, dict) else None
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+
+async def verify_token(token: str) -> str:
+    """Return user_id for a bearer token. Local check first when AUTH_MODE=local."""
+    if get_settings().auth_mode.lower() != "local":
+        return await _verify_remote(token)
+    try:
+        claims = await verify_token_locally(token)
+    except LocalVerificationUnavailable as e:
+        logger.info("Auth: local verification unavailable, using Supabase", extra={"reason": str(e)})
+        return await _verify_remote(token)
+    except jwt.InvalidTokenError:
+        logger.info("Auth: invalid or expired token")
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return claims["sub"]
+
+
 def require_auth(handler):
     @wraps(handler)
     async def wrapper(request: Request, *args, **kwargs):
@@ -20,30 +61,11 @@ def require_auth(handler):
         if not token:
             logger.info("Auth: empty token")
             raise HTTPException(status_code=401, detail="Missing token")
-        settings = get_settings()
-        url = f"{settings.supabase_url.rstrip('/')}/auth/v1/user"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "apikey": settings.supabase_service_role_key,
-        }
-        try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(url, headers=headers, timeout=10.0)
-        except httpx.RequestError as e:
-            logger.warning("Auth: Supabase request failed", extra={"error": str(type(e).__name__)})
-            raise HTTPException(status_code=503, detail="Auth service unavailable")
-        if resp.status_code != 200:
-            logger.info("Auth: invalid or expired token")
-            raise HTTPException(status_code=401, detail="Invalid token")
-        data = resp.json()
-        user_id = (data.get("id") or data.get("sub")) if isinstance(data, dict) else None
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        supabase = get_supabase()
-        r = supabase.table("profiles").select("org_id").eq("id", user_id).execute()
-        if not r.data or len(r.data) == 0:
+        user_id = await verify_token(token)
+        org_id = await get_user_org_id(user_id)
+        if not org_id:
             raise HTTPException(status_code=403, detail="Profile not found")
         request.state.user_id = user_id
-        request.state.org_id = str(r.data[0]["org_id"])
+        request.state.org_id = org_id
         return await handler(request, *args, **kwargs)
     return wrapper
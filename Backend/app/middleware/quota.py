@@ -15,7 +15,7 @@ def require_quota(feature: str):
     def decorator(func):
         @wraps(func)
         async def wrapper(request: Request, *args, **kwargs):
-            org = get_org(request.state.org_id)
+            org = await get_org(request.state.org_id)
             limits = TIER_LIMITS.get(org["plan"], TIER_LIMITS["free"])
             # With limits set to -1 / chat=True above, no feature is blocked.
             return await func(request, *args, **kwargs)
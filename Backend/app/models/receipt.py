@@ -1,5 +1,5 @@
 """Pydantic models for receipt extraction (strict output contract)."""
-from datetime import date
+import datetime as dt
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
@@ -14,7 +14,7 @@ class ReceiptItem(BaseModel):
 
 class ReceiptExtraction(BaseModel):
     vendor: str
-    date: Optional[date] = None
+    date: Optional[dt.date] = None
     items: List[ReceiptItem]
     subtotal: float
     tax: float
@@ -18,12 +18,14 @@ class RawOcrResult:
     - lines: individual non-empty lines in reading order
     - engine: identifier for which OCR engine produced this result
     - language: optional BCP-47 language code hint (e.g. \"en\", \"en-US\")
+    - word_confidences: per-word confidence 0-100, when the engine reports it
     """
 
     full_text: str
     lines: List[str]
     engine: str
     language: Optional[str] = None
+    word_confidences: Optional[List[float]] = None
 
 
 class OcrEngine(Protocol):
@@ -0,0 +1,63 @@
+"""Executor for CPU-bound OCR work (Tesseract, image decoding).
+
+Tesseract holds the CPU for hundreds of milliseconds per image; running it
+on the event loop serialises every extraction in the process. run_ocr()
+dispatches a picklable top-level function to a pool instead:
+
+- process (default): ProcessPoolExecutor with OCR_WORKERS processes
+  (0 = one per core). Image bytes are sent as a single bytes object, which
+  pickles as one buffer copy; decoding happens in the worker.
+- thread: ThreadPoolExecutor; pytesseract shells out to the tesseract binary,
+  so threads still overlap, at the cost of decoding on the API process's GIL.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.config import get_settings
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+
+
+def ocr_worker_count() -> int:
+    return get_settings().ocr_workers or os.cpu_count() or 1
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        settings = get_settings()
+        mode = settings.ocr_executor.lower()
+        if mode == "thread":
+            _executor = ThreadPoolExecutor(max_workers=ocr_worker_count(), thread_name_prefix="ocr")
+        elif mode == "process":
+            # spawn: the API process runs threads (DB pool, HTTP clients) that must not be forked.
+            _executor = ProcessPoolExecutor(
+                max_workers=ocr_worker_count(), mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            raise ValueError(f"Unknown OCR_EXECUTOR: {settings.ocr_executor}")
+    return _executor
+
+
+async def run_ocr(fn: Callable[..., T], *args: Any) -> T:
+    """Run a CPU-bound OCR function on the OCR pool. fn and args must be picklable."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args))
+
+
+def shutdown_ocr_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+__all__ = ["ocr_worker_count", "run_ocr", "shutdown_ocr_executor"]
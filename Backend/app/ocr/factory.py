@@ -8,8 +8,14 @@ from app.ocr.base_engine import OcrEngine
 from app.ocr.fallback_engine import FallbackOcrEngine
 from app.ocr.mistral_vision_client import MistralVisionClient
 from app.ocr.mistral_vision_engine import create_mistral_vision_engine
+from app.ocr.preprocess import default_config, enhanced_config
 from app.ocr.tesseract_engine import create_tesseract_engine
 
+# Bump when preprocessing or OCR routing changes what the engine returns for the
+# same image, so cached extractions (app.services.extraction_cache) are not reused.
+# v2: quality-score routing; v3: preprocessing before OCR.
+OCR_PIPELINE_VERSION = 3
+
 
 def _pixtral_engine(language: Optional[str] = None) -> OcrEngine:
     return create_mistral_vision_engine(
@@ -20,7 +26,10 @@ def _pixtral_engine(language: Optional[str] = None) -> OcrEngine:
 def get_ocr_engine(language: Optional[str] = None) -> OcrEngine:
     """Return the configured OCR engine.
 
-    - tesseract: local OCR; if MISTRAL_API_KEY is set, Pixtral is used on failure.
+    - tesseract: local OCR on preprocessed images (OCR_PREPROCESS), routed by
+      quality score: low-scoring results are retried with heavier clean-up
+      (binarization) and, if MISTRAL_API_KEY is set, escalated
+      to Pixtral (also used when Tesseract fails outright).
     - pixtral: Mistral Pixtral vision model only (no Tesseract).
     """
     settings = get_settings()
@@ -30,11 +39,30 @@ def get_ocr_engine(language: Optional[str] = None) -> OcrEngine:
     if engine_name == "pixtral":
         return _pixtral_engine(lang)
 
-    tesseract = create_tesseract_engine(language=lang)
-    if settings.mistral_api_key:
-        return FallbackOcrEngine(primary=tesseract, fallback=_pixtral_engine(lang))
-    return tesseract
+    return FallbackOcrEngine(
+        primary=create_tesseract_engine(language=lang, preprocess=default_config()),
+        fallback=_pixtral_engine(lang) if settings.mistral_api_key else None,
+        retry=create_tesseract_engine(language=lang, preprocess=enhanced_config()) if settings.ocr_retry_enhanced else None,
+        accept_score=settings.ocr_accept_score,
+        escalate_score=settings.ocr_escalate_score,
+    )
+
+
+def ocr_pipeline_id() -> str:
+    """OCR_PIPELINE_VERSION plus the settings that shape get_ocr_engine()'s output (for cache keys)."""
+    s = get_settings()
+    vision = f"pixtral@{s.ocr_vision_max_side}"
+    if s.ocr_engine.lower() == "pixtral":
+        return f"v{OCR_PIPELINE_VERSION}:{vision}"
+    parts = [
+        f"v{OCR_PIPELINE_VERSION}",
+        f"pre@{s.ocr_target_width}{'c' if s.ocr_autocrop else ''}{'d' if s.ocr_deskew else ''}" if s.ocr_preprocess else "raw",
+        f"route@{s.ocr_accept_score}/{s.ocr_escalate_score}{'+retry' if s.ocr_retry_enhanced else ''}",
+    ]
+    if s.mistral_api_key:
+        parts.append(vision)
+    return ":".join(parts)
 
 
-__all__ = ["get_ocr_engine"]
+__all__ = ["OCR_PIPELINE_VERSION", "get_ocr_engine", "ocr_pipeline_id"]
 
@@ -1,30 +1,101 @@
-"""OCR engine that tries primary first, then fallback on any failure."""
+"""OCR router: primary engine first, escalating only when the result looks poor.
+
+Per image:
+1. run the primary (Tesseract) and score the result (app.ocr.quality);
+2. score >= OCR_ACCEPT_SCORE: accept;
+3. otherwise, if a retry engine is set (Tesseract with image clean-up), run it
+   and keep the better result; accept if it now clears OCR_ACCEPT_SCORE;
+4. if the best score is still below OCR_ESCALATE_SCORE and a fallback is set
+   (Pixtral), use the fallback; between the two thresholds the best local
+   result is kept, since the vision model is slow and costs money.
+Any exception from the primary goes straight to the fallback, as before.
+"""
 from __future__ import annotations
 
 import logging
+import threading
 from typing import Optional
 
 from app.ocr.base_engine import OcrEngine, RawOcrResult
+from app.ocr.quality import score_ocr
 
 logger = logging.getLogger(__name__)
 
+_lock = threading.Lock()
+_stats = {"images": 0, "accepted": 0, "retried": 0, "accepted_after_retry": 0, "escalated": 0, "primary_errors": 0}
+
+
+def _count(*keys: str) -> None:
+    with _lock:
+        for key in keys:
+            _stats[key] += 1
+
+
+def ocr_routing_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+    images = stats["images"]
+    stats["escalation_rate"] = round(stats["escalated"] / images, 4) if images else 0.0
+    return stats
+
 
 class FallbackOcrEngine:
-    """Try primary OCR; on exception use fallback (e.g. Pixtral when Tesseract missing)."""
+    """Route each image to primary, primary-with-retry or fallback based on OCR quality."""
 
-    def __init__(self, primary: OcrEngine, fallback: OcrEngine) -> None:
+    def __init__(
+        self,
+        primary: OcrEngine,
+        fallback: Optional[OcrEngine] = None,
+        retry: Optional[OcrEngine] = None,
+        accept_score: float = 0.0,
+        escalate_score: float = 0.0,
+    ) -> None:
         self._primary = primary
         self._fallback = fallback
+        self._retry = retry
+        self._accept = accept_score
+        self._escalate = escalate_score
+
+    async def _escalate_to_fallback(self, image_bytes: bytes, filename: Optional[str]) -> RawOcrResult:
+        _count("escalated")
+        return await self._fallback.extract_text(image_bytes, filename=filename)
 
     async def extract_text(
         self, image_bytes: bytes, filename: Optional[str] = None
     ) -> RawOcrResult:
+        _count("images")
         try:
-            return await self._primary.extract_text(image_bytes, filename=filename)
+            best = await self._primary.extract_text(image_bytes, filename=filename)
         except Exception as e:
+            _count("primary_errors")
+            if self._fallback is None:
+                raise
             logger.warning(
                 "Primary OCR failed, using fallback: %s",
                 str(e),
                 extra={"error_type": type(e).__name__},
             )
-            return await self._fallback.extract_text(image_bytes, filename=filename)
+            return await self._escalate_to_fallback(image_bytes, filename)
+        best_score = score_ocr(best).score
+        if best_score >= self._accept:
+            _count("accepted")
+            return best
+        if self._retry is not None:
+            _count("retried")
+            try:
+                retried = await self._retry.extract_text(image_bytes, filename=filename)
+                retried_score = score_ocr(retried).score
+                if retried_score > best_score:
+                    best, best_score = retried, retried_score
+            except Exception as e:
+                logger.warning("OCR retry failed", extra={"error_type": type(e).__name__})
+            if best_score >= self._accept:
+                _count("accepted_after_retry")
+                return best
+        if self._fallback is not None and best_score < self._escalate:
+            logger.info("Low-quality OCR, escalating to fallback engine", extra={"ocr_score": best_score})
+            return await self._escalate_to_fallback(image_bytes, filename)
+        return best
+
+
+__all__ = ["FallbackOcrEngine", "ocr_routing_stats"]
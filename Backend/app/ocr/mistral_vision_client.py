@@ -1,30 +1,25 @@
 """Mistral Pixtral vision API client for OCR: image bytes to raw text."""
 from __future__ import annotations
 
-import asyncio
 import base64
 from typing import Optional
 
-from mistralai import Mistral
-
 from app.config import get_settings
+from app.ocr.executor import run_ocr
+from app.ocr.preprocess import prepare_for_vision
+from app.services.http_clients import get_mistral_client
+from app.services.mistral_limiter import call_mistral
+from app.services.scheduler import MISTRAL_VISION
 from app.ocr.vision_protocol import VisionClientProtocol
 
 VISION_MODEL = "pixtral-large-latest"
 MAX_IMAGE_BYTES = 3 * 1024 * 1024
 
 
-def _client() -> Mistral:
-    settings = get_settings()
-    if not settings.mistral_api_key:
-        raise RuntimeError("MISTRAL_API_KEY is not configured")
-    return Mistral(api_key=settings.mistral_api_key)
-
-
-def _call_mistral_vision(url: str) -> str:
-    """Sync Mistral vision call (run in thread)."""
-    client = _client()
-    resp = client.chat.complete(
+async def _call_mistral_vision(url: str) -> str:
+    """Async Mistral vision call on the shared pooled client."""
+    client = get_mistral_client()
+    resp = await client.chat.complete_async(
         model=VISION_MODEL,
         messages=[
             {
@@ -54,13 +49,12 @@ class MistralVisionClient(VisionClientProtocol):
     async def extract_text_from_image(
         self, image_bytes: bytes, filename: Optional[str] = None
     ) -> str:
+        # Pixtral does not need 12MP photos; a downscaled JPEG is far smaller to upload and bill.
+        image_bytes, mime = await run_ocr(prepare_for_vision, image_bytes, get_settings().ocr_vision_max_side)
         if len(image_bytes) > MAX_IMAGE_BYTES:
             raise ValueError(
                 f"Image too large for vision API (max {MAX_IMAGE_BYTES // (1024*1024)} MB)"
             )
         b64 = base64.b64encode(image_bytes).decode("utf-8")
-        mime = "image/jpeg"
-        if filename and filename.lower().endswith(".png"):
-            mime = "image/png"
         url = f"data:{mime};base64,{b64}"
-        return await asyncio.to_thread(_call_mistral_vision, url)
+        return await call_mistral(lambda: _call_mistral_vision(url), MISTRAL_VISION)
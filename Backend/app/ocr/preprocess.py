@@ -0,0 +1,185 @@
+"""Image preprocessing before OCR (and before sending images to the vision model).
+
+Phone photos arrive as 12MP colour JPEGs, often rotated, skewed and with
+background around the receipt. Tesseract is slower and less accurate on
+those, and the vision payload is needlessly large. preprocess_image() runs:
+
+    EXIF orientation → downscale to target width → grayscale → auto-crop
+    → deskew → adaptive threshold (optional)
+
+Pure Pillow: row/column profiles are taken with BOX resizes rather than
+per-pixel Python loops. Runs inside the OCR executor (see tesseract_engine).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageFilter, ImageOps  # type: ignore[import-untyped]
+
+from app.config import get_settings
+
+_PROFILE_SIZE = 400  # deskew/crop analysis resolution
+
+
+@dataclass(frozen=True)
+class PreprocessConfig:
+    target_width: int = 1600  # downscale wider images; 0 disables
+    min_width: int = 0  # upscale narrower images (small crops read poorly); 0 disables
+    grayscale: bool = True
+    autocrop: bool = True
+    deskew: bool = True
+    max_skew_degrees: float = 5.0
+    threshold: bool = False
+    threshold_window: int = 31
+    threshold_offset: int = 10
+
+
+def default_config() -> Optional[PreprocessConfig]:
+    """Config for the first OCR pass, or None when OCR_PREPROCESS is off."""
+    s = get_settings()
+    if not s.ocr_preprocess:
+        return None
+    return PreprocessConfig(target_width=s.ocr_target_width, deskew=s.ocr_deskew, autocrop=s.ocr_autocrop)
+
+
+def enhanced_config() -> PreprocessConfig:
+    """Heavier config for the router's retry pass: also binarize and upscale small images."""
+    s = get_settings()
+    return PreprocessConfig(target_width=s.ocr_target_width, min_width=1000, threshold=True)
+
+
+def _profile(img: Image.Image, axis: int) -> List[float]:
+    """Mean intensity per row (axis=0) or per column (axis=1)."""
+    size = (1, img.height) if axis == 0 else (img.width, 1)
+    return list(img.resize(size, Image.BOX).tobytes())  # mode "L": one byte per sample
+
+
+def _otsu(img: Image.Image) -> int:
+    hist = img.histogram()[:256]
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    weight_bg = sum_bg = 0.0
+    best, best_var = 127, -1.0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best, best_var = t, var
+    return best
+
+
+def _span(profile: List[float], threshold: float) -> Optional[Tuple[int, int]]:
+    inside = [i for i, v in enumerate(profile) if v >= threshold]
+    if not inside:
+        return None
+    return inside[0], inside[-1] + 1
+
+
+def autocrop_box(gray: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box of the bright paper area, or None when there is no clear background."""
+    small = gray.copy()
+    small.thumbnail((_PROFILE_SIZE, _PROFILE_SIZE))
+    paper = small.point(lambda p, t=_otsu(small): 255 if p > t else 0)
+    rows = _span(_profile(paper, 0), 255 * 0.35)
+    cols = _span(_profile(paper, 1), 255 * 0.35)
+    if rows is None or cols is None:
+        return None
+    sx, sy = gray.width / small.width, gray.height / small.height
+    margin = 4
+    box = (
+        max(0, int((cols[0] - margin) * sx)),
+        max(0, int((rows[0] - margin) * sy)),
+        min(gray.width, int((cols[1] + margin) * sx)),
+        min(gray.height, int((rows[1] + margin) * sy)),
+    )
+    # Only crop when it removes a meaningful border; otherwise the paper fills the frame.
+    if (box[2] - box[0]) * (box[3] - box[1]) > 0.92 * gray.width * gray.height:
+        return None
+    return box
+
+
+def estimate_skew(gray: Image.Image, max_degrees: float, step: float = 0.5) -> float:
+    """Angle (degrees) that makes text rows most horizontal, by row-profile variance."""
+    small = gray.copy()
+    small.thumbnail((_PROFILE_SIZE, _PROFILE_SIZE))
+    # Local threshold, so dark background corners left after cropping do not count as text.
+    ink = ImageOps.invert(adaptive_threshold(small, 15, 12))
+    best_angle, best_score = 0.0, -1.0
+    steps = int(max_degrees / step)
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        rows = _profile(ink.rotate(angle, resample=Image.NEAREST, fillcolor=0), 0)
+        mean = sum(rows) / len(rows)
+        score = sum((r - mean) ** 2 for r in rows)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def adaptive_threshold(gray: Image.Image, window: int, offset: int) -> Image.Image:
+    """Local-mean binarization: ink where a pixel is darker than its neighbourhood by `offset`."""
+    local_mean = gray.filter(ImageFilter.BoxBlur(window // 2))
+    darker = ImageChops.subtract(local_mean, gray)  # > 0 where pixel is darker than its surroundings
+    return darker.point(lambda d: 0 if d > offset else 255)
+
+
+def preprocess_image(img: Image.Image, cfg: PreprocessConfig) -> Image.Image:
+    img = ImageOps.exif_transpose(img)
+    if cfg.target_width and img.width > cfg.target_width:
+        img = img.resize((cfg.target_width, round(img.height * cfg.target_width / img.width)), Image.LANCZOS)
+    elif cfg.min_width and img.width < cfg.min_width:
+        img = img.resize((cfg.min_width, round(img.height * cfg.min_width / img.width)), Image.LANCZOS)
+    if cfg.grayscale or cfg.threshold or cfg.deskew or cfg.autocrop:
+        img = ImageOps.grayscale(img)
+    if cfg.autocrop:
+        box = autocrop_box(img)
+        if box is not None:
+            img = img.crop(box)
+    if cfg.deskew:
+        angle = estimate_skew(img, cfg.max_skew_degrees)
+        if angle:
+            img = img.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    if cfg.threshold:
+        img = adaptive_threshold(img, cfg.threshold_window, cfg.threshold_offset)
+    return img
+
+
+def preprocess_bytes(image_bytes: bytes, cfg: Optional[PreprocessConfig]) -> Image.Image:
+    img = Image.open(BytesIO(image_bytes))
+    return preprocess_image(img, cfg) if cfg is not None else img
+
+
+def prepare_for_vision(image_bytes: bytes, max_side: int, quality: int = 85) -> Tuple[bytes, str]:
+    """Orientation-fixed, downscaled JPEG for the vision API; (bytes, mime)."""
+    img = ImageOps.exif_transpose(Image.open(BytesIO(image_bytes)))
+    if max(img.size) <= max_side and img.format == "JPEG":
+        return image_bytes, "image/jpeg"
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+__all__ = [
+    "PreprocessConfig",
+    "adaptive_threshold",
+    "autocrop_box",
+    "default_config",
+    "enhanced_config",
+    "estimate_skew",
+    "prepare_for_vision",
+    "preprocess_bytes",
+    "preprocess_image",
+]
@@ -0,0 +1,71 @@
+"""Heuristic quality score for OCR output, used to route between OCR engines.
+
+Combines signals that separate a readable receipt from OCR garbage:
+- mean Tesseract word confidence (image_to_data);
+- word ratio: share of tokens that look like words or numbers (known receipt
+  vocabulary, or alphabetic with a vowel, or numeric);
+- character-class ratio: share of characters that are letters, digits,
+  whitespace or common receipt punctuation;
+- amount lines: lines ending in a price, which every real receipt has.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from app.ocr.base_engine import RawOcrResult
+
+_VOCAB = {
+    "total", "subtotal", "sub", "tax", "vat", "gst", "cash", "change", "card", "visa", "mastercard", "amex",
+    "debit", "credit", "qty", "price", "amount", "due", "balance", "receipt", "thank", "thanks", "you",
+    "store", "date", "time", "item", "items", "tip", "discount", "sale", "paid", "tel", "invoice",
+}
+_TOKEN = re.compile(r"\S+")
+_NUMERIC = re.compile(r"^[$€£]?-?\d+(?:[.,:/-]\d+)*%?$")
+_WORDLIKE = re.compile(r"^[A-Za-z][A-Za-z'&.-]*[A-Za-z.]?$")
+_VOWEL = re.compile(r"[aeiouyAEIOUY]")
+_ALLOWED = re.compile(r"[\w\s.,:;$€£%#@&*/()+\-'\"!?]")
+_AMOUNT_LINE = re.compile(r"\d+[.,]\d{2}\s*[A-Z]?\s*$")
+
+WEIGHTS = {"confidence": 0.45, "words": 0.25, "chars": 0.15, "amounts": 0.15}
+
+
+@dataclass
+class OcrQuality:
+    mean_confidence: float  # 0-1; 0.5 when the engine does not report confidences
+    word_ratio: float
+    char_ratio: float
+    amount_lines: int
+    score: float
+
+
+def _is_wordlike(token: str) -> bool:
+    core = token.strip(".,:;*()[]\"'").lower()
+    if not core:
+        return False
+    if core in _VOCAB or _NUMERIC.match(core):
+        return True
+    return len(core) >= 2 and bool(_WORDLIKE.match(core)) and bool(_VOWEL.search(core))
+
+
+def score_ocr(result: RawOcrResult) -> OcrQuality:
+    text = result.full_text or "\n".join(result.lines)
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return OcrQuality(0.0, 0.0, 0.0, 0, 0.0)
+    confs = result.word_confidences
+    mean_conf = (sum(confs) / len(confs) / 100) if confs else 0.5
+    word_ratio = sum(_is_wordlike(t) for t in tokens) / len(tokens)
+    chars = [c for c in text if not c.isspace()]
+    char_ratio = sum(bool(_ALLOWED.match(c)) for c in chars) / len(chars) if chars else 0.0
+    amount_lines = sum(bool(_AMOUNT_LINE.search(line)) for line in result.lines)
+    score = (
+        WEIGHTS["confidence"] * mean_conf
+        + WEIGHTS["words"] * word_ratio
+        + WEIGHTS["chars"] * char_ratio
+        + WEIGHTS["amounts"] * min(1.0, amount_lines / 2)
+    )
+    return OcrQuality(round(mean_conf, 4), round(word_ratio, 4), round(char_ratio, 4), amount_lines, round(score, 4))
+
+
+__all__ = ["OcrQuality", "score_ocr"]
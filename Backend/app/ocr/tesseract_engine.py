@@ -1,31 +1,60 @@
 """Tesseract-based OCR engine.
 
 This uses pytesseract + Pillow to turn receipt images into plain text that can
-be fed into downstream LLMs for structuring.
+be fed into downstream LLMs for structuring. Word-level confidences from
+image_to_data are kept on the result so the OCR router can judge quality.
+Images go through app.ocr.preprocess first, inside the OCR executor.
 """
 from __future__ import annotations
 
-from io import BytesIO
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
-from PIL import Image  # type: ignore[import-untyped]
 import pytesseract  # type: ignore[import-untyped]
 
 from app.ocr.base_engine import RawOcrResult, OcrEngine
+from app.ocr.executor import run_ocr
+from app.ocr.preprocess import PreprocessConfig, preprocess_bytes
+from app.services.scheduler import OCR_CPU, scheduled
+
+
+def _image_to_text(
+    image_bytes: bytes, language: str, preprocess: Optional[PreprocessConfig] = None
+) -> Tuple[str, List[float]]:
+    """Decode, preprocess + OCR one image; returns (text, word confidences 0-100).
+
+    Runs in the OCR executor, so it must stay top-level (picklable).
+    """
+    # Decode the image in-memory; do not write to disk.
+    img = preprocess_bytes(image_bytes, preprocess)
+    try:
+        data = pytesseract.image_to_data(img, lang=language, output_type=pytesseract.Output.DICT)
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+        # pytesseract exceptions do not survive pickling; one would break the whole process pool.
+        raise RuntimeError(f"{type(e).__name__}: {e}") from None
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences: List[float] = []
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        conf = float(data["conf"][i])
+        if not word or conf < 0:
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        confidences.append(conf)
+    return "\n".join(" ".join(words) for words in lines.values()), confidences
 
 
 class TesseractOcrEngine:
     """Simple OCR engine backed by Tesseract."""
 
-    def __init__(self, language: str = "eng") -> None:
+    def __init__(self, language: str = "eng", preprocess: Optional[PreprocessConfig] = None) -> None:
         # language is configurable so non-English receipts can be supported later.
         self._language = language
+        self._preprocess = preprocess
 
     async def extract_text(self, image_bytes: bytes, filename: Optional[str] = None) -> RawOcrResult:
-        """Run OCR using Tesseract and return a RawOcrResult."""
-        # Decode the image in-memory; do not write to disk.
-        img = Image.open(BytesIO(image_bytes))
-        text = pytesseract.image_to_string(img, lang=self._language) or ""
+        """Run OCR using Tesseract (off the event loop) and return a RawOcrResult."""
+        async with scheduled(OCR_CPU):
+            text, confidences = await run_ocr(_image_to_text, image_bytes, self._language, self._preprocess)
         # Normalise newlines and split into non-empty lines.
         normalised = text.replace("\r\n", "\n").replace("\r", "\n")
         lines = [line.strip() for line in normalised.split("\n") if line.strip()]
@@ -34,13 +63,13 @@ class TesseractOcrEngine:
             lines=lines,
             engine="tesseract",
             language=self._language,
+            word_confidences=confidences,
         )
 
 
-def create_tesseract_engine(language: str = "eng") -> OcrEngine:
+def create_tesseract_engine(language: str = "eng", preprocess: Optional[PreprocessConfig] = None) -> OcrEngine:
     """Factory helper so callers do not depend on the concrete class."""
-    return TesseractOcrEngine(language=language)
+    return TesseractOcrEngine(language=language, preprocess=preprocess)
 
 
 __all__ = ["TesseractOcrEngine", "create_tesseract_engine"]
-
@@ -0,0 +1,94 @@
+"""Packs concurrent LLM structuring requests into multi-receipt prompts.
+
+Extraction workers call `await batcher.structure(ocr)`; the batcher collects
+requests until STRUCTURING_BATCH_SIZE receipts or STRUCTURING_BATCH_TOKEN_BUDGET
+prompt tokens are pending (or STRUCTURING_BATCH_LINGER_MS passes), then sends
+them in one structure_many_with_mistral call. The system prompt and schema
+are paid once per group instead of once per receipt. Receipts that come back
+missing or invalid are retried with a single-receipt call.
+
+Use one batcher per extraction batch: a group never mixes orgs.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import List, Optional, Set, Tuple
+
+from app.models.receipt import ReceiptExtraction
+from app.ocr.base_engine import RawOcrResult
+from app.pipeline.structuring_llm_mistral import (
+    estimate_tokens,
+    structure_many_with_mistral,
+    structure_with_mistral,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StructuringBatcher:
+    def __init__(self, max_items: int, token_budget: int, linger_seconds: float) -> None:
+        self._max_items = max_items
+        self._token_budget = token_budget
+        self._linger = linger_seconds
+        self._pending: List[Tuple[RawOcrResult, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.receipts = 0
+        self.fallbacks = 0
+
+    async def structure(self, ocr: RawOcrResult) -> ReceiptExtraction:
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        tokens = estimate_tokens(ocr)
+        if self._pending and self._pending_tokens + tokens > self._token_budget:
+            self._flush()
+        self._pending.append((ocr, fut))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self._max_items or self._pending_tokens >= self._token_budget:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._linger, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        group, self._pending, self._pending_tokens = self._pending, [], 0
+        if not group:
+            return
+        task = asyncio.create_task(self._run(group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: List[Tuple[RawOcrResult, asyncio.Future]]) -> None:
+        self.requests += 1
+        self.receipts += len(group)
+        results: List[Optional[ReceiptExtraction]] = [None] * len(group)
+        if len(group) > 1:
+            try:
+                results = await structure_many_with_mistral([ocr for ocr, _ in group])
+            except Exception as e:
+                logger.warning("Batched structuring failed, falling back to single calls", extra={"error": str(e)})
+            self.fallbacks += sum(1 for r in results if r is None)
+        await asyncio.gather(*(self._resolve(ocr, fut, res) for (ocr, fut), res in zip(group, results)))
+
+    async def _resolve(self, ocr: RawOcrResult, fut: asyncio.Future, result: Optional[ReceiptExtraction]) -> None:
+        if result is None:
+            try:
+                result = await structure_with_mistral(ocr)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+        if not fut.done():
+            fut.set_result(result)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "receipts": self.receipts, "fallbacks": self.fallbacks}
+
+
+__all__ = ["StructuringBatcher"]
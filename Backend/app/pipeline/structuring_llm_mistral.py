@@ -2,13 +2,29 @@
 from __future__ import annotations
 
 import json
+import logging
+from typing import List, Optional
 
-from mistralai import Mistral
+from pydantic import BaseModel, ValidationError
 
-from app.config import get_settings
+from app.services.http_clients import get_mistral_client
+from app.services.mistral_limiter import call_mistral
+from app.services.scheduler import MISTRAL_LLM
 from app.models.receipt import ReceiptExtraction
 from app.ocr.base_engine import RawOcrResult
 
+logger = logging.getLogger(__name__)
+
+STRUCTURING_MODEL = "mistral-large-latest"
+
+
+class _IndexedReceipt(ReceiptExtraction):
+    index: int
+
+
+class _ReceiptBatch(BaseModel):
+    receipts: List[_IndexedReceipt]
+
 
 def _response_format_schema() -> dict:
     schema = ReceiptExtraction.model_json_schema()
@@ -27,31 +43,84 @@ def _build_messages(ocr: RawOcrResult) -> list[dict]:
     ]
 
 
-def _client() -> Mistral:
-    settings = get_settings()
-    if not settings.mistral_api_key:
-        raise RuntimeError("MISTRAL_API_KEY is not configured")
-    return Mistral(api_key=settings.mistral_api_key)
+def estimate_tokens(ocr: RawOcrResult) -> int:
+    """Rough prompt-token estimate (~4 chars/token) used to pack batched requests."""
+    return len(ocr.full_text or "\n".join(ocr.lines)) // 4 + 1
+
+
+def _batch_response_format_schema() -> dict:
+    schema = _ReceiptBatch.model_json_schema()
+    return {"type": "json_schema", "json_schema": {"name": "ReceiptBatch", "schema": schema}}
+
+
+def _build_batch_messages(ocrs: List[RawOcrResult]) -> list[dict]:
+    instructions = (
+        "You are a receipt data extraction system. The user message contains several receipts, each "
+        "starting with a line '### RECEIPT <index>'. Convert each one independently into a JSON object "
+        "matching the provided schema, copy its <index> into the 'index' field, and return them all in "
+        "the 'receipts' array. Never merge receipts. Do not include any extra commentary."
+    )
+    parts = [f"### RECEIPT {i}\n{ocr.full_text or chr(10).join(ocr.lines)}" for i, ocr in enumerate(ocrs)]
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": "\n\n".join(parts)},
+    ]
+
+
+async def structure_many_with_mistral(
+    ocrs: List[RawOcrResult], max_retries: int = 2
+) -> List[Optional[ReceiptExtraction]]:
+    """Structure several receipts in one request; None for any receipt missing or invalid in the reply.
+
+    Callers fall back to structure_with_mistral for the None entries.
+    """
+    client = get_mistral_client()
+
+    async def call() -> list:
+        resp = await client.chat.complete_async(
+            model=STRUCTURING_MODEL,
+            messages=_build_batch_messages(ocrs),
+            response_format=_batch_response_format_schema(),
+        )
+        content = resp.choices[0].message.content
+        data = json.loads(content) if isinstance(content, str) else content
+        receipts = data.get("receipts") if isinstance(data, dict) else None
+        if not isinstance(receipts, list):
+            raise ValueError("Batched structuring reply has no 'receipts' array")
+        return receipts
+
+    out: List[Optional[ReceiptExtraction]] = [None] * len(ocrs)
+    for raw in await call_mistral(call, MISTRAL_LLM, max_retries=max_retries):
+        # Validate one by one so a single bad receipt does not discard the rest.
+        try:
+            item = _IndexedReceipt.model_validate(raw)
+        except ValidationError:
+            continue
+        if 0 <= item.index < len(ocrs) and out[item.index] is None:
+            out[item.index] = ReceiptExtraction.model_validate(item.model_dump(exclude={"index"}))
+    missing = sum(1 for r in out if r is None)
+    if missing:
+        logger.info("Batched structuring left receipts unresolved", extra={"batch": len(ocrs), "missing": missing})
+    return out
 
 
 async def structure_with_mistral(
     ocr: RawOcrResult, max_retries: int = 3
 ) -> ReceiptExtraction:
-    """Call Mistral to turn OCR text into a validated ReceiptExtraction."""
-    client = _client()
-    for attempt in range(max_retries):
-        try:
-            resp = client.chat.complete(
-                model="mistral-large-latest",
-                messages=_build_messages(ocr),
-                response_format=_response_format_schema(),
-            )
-            content = resp.choices[0].message.content
-            data = json.loads(content) if isinstance(content, str) else content
-            return ReceiptExtraction.model_validate(data)
-        except Exception:
-            if attempt == max_retries - 1:
-                raise
-
-
-__all__ = ["structure_with_mistral"]
+    """Call Mistral (async, rate-limited, with backoff) to turn OCR text into a validated ReceiptExtraction."""
+    client = get_mistral_client()
+
+    async def call() -> ReceiptExtraction:
+        resp = await client.chat.complete_async(
+            model=STRUCTURING_MODEL,
+            messages=_build_messages(ocr),
+            response_format=_response_format_schema(),
+        )
+        content = resp.choices[0].message.content
+        data = json.loads(content) if isinstance(content, str) else content
+        return ReceiptExtraction.model_validate(data)
+
+    return await call_mistral(call, MISTRAL_LLM, max_retries=max_retries)
+
+
+__all__ = ["STRUCTURING_MODEL", "estimate_tokens", "structure_many_with_mistral", "structure_with_mistral"]
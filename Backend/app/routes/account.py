@@ -4,7 +4,12 @@ import httpx
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel
 from app.middleware.auth import require_auth
+from app.services.db import execute
+from app.services.duplicate_index import forget_org_receipts
+from app.services.extraction_cache import get_extraction_cache
 from app.services.supabase_client import get_supabase
+from app.services.org_quota import invalidate_org, invalidate_user
+from app.services.http_clients import get_http_client
 from app.config import get_settings
 
 router = APIRouter()
@@ -25,21 +30,19 @@ async def delete_account(request: Request, data: AccountDeletion):
     user_id = request.state.user_id
     org_id = request.state.org_id
     supabase = get_supabase()
-    profile = supabase.table("profiles").select("email").eq("id", user_id).execute()
+    profile = await execute(supabase.table("profiles").select("email").eq("id", user_id))
     email = profile.data[0].get("email") if profile.data else None
     if not email:
         raise HTTPException(status_code=404, detail="Profile not found")
     settings = get_settings()
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{settings.supabase_url.rstrip('/')}/auth/v1/token?grant_type=password",
-                json={"email": email, "password": data.password},
-                headers={"apikey": settings.supabase_service_role_key, "Content-Type": "application/json"},
-                timeout=10.0,
-            )
-            if resp.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid password")
+        resp = await get_http_client().post(
+            f"{settings.supabase_url.rstrip('/')}/auth/v1/token?grant_type=password",
+            json={"email": email, "password": data.password},
+            headers={"apikey": settings.supabase_service_role_key, "Content-Type": "application/json"},
+        )
+        if resp.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid password")
     except httpx.RequestError:
         raise HTTPException(status_code=503, detail="Auth service unavailable")
     except HTTPException:
@@ -47,16 +50,22 @@ async def delete_account(request: Request, data: AccountDeletion):
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid password")
     try:
-        supabase.table("api_keys").delete().eq("user_id", user_id).execute()
-        supabase.table("chat_messages").delete().eq("user_id", user_id).execute()
-        supabase.table("receipts").delete().eq("org_id", org_id).execute()
-        supabase.table("batches").delete().eq("org_id", org_id).execute()
-        supabase.table("user_preferences").delete().eq("user_id", user_id).execute()
-        supabase.table("data_export_jobs").delete().eq("user_id", user_id).execute()
-        org_members = supabase.table("profiles").select("id").eq("org_id", org_id).execute()
+        await execute(supabase.table("api_keys").delete().eq("user_id", user_id))
+        await execute(supabase.table("chat_messages").delete().eq("user_id", user_id))
+        await execute(supabase.table("receipts").delete().eq("org_id", org_id))
+        forget_org_receipts(org_id)
+        await execute(supabase.table("batches").delete().eq("org_id", org_id))
+        await execute(supabase.table("user_preferences").delete().eq("user_id", user_id))
+        await execute(supabase.table("data_export_jobs").delete().eq("user_id", user_id))
+        org_members = await execute(supabase.table("profiles").select("id").eq("org_id", org_id))
         if org_members.data and len(org_members.data) == 1:
-            supabase.table("organizations").delete().eq("id", org_id).execute()
-        supabase.table("profiles").delete().eq("id", user_id).execute()
+            await execute(supabase.table("organizations").delete().eq("id", org_id))
+            await invalidate_org(org_id)
+            cache = get_extraction_cache()
+            if cache is not None:
+                await cache.purge_org(org_id)
+        await execute(supabase.table("profiles").delete().eq("id", user_id))
+        await invalidate_user(user_id)
         logger.info("Account deleted", extra={"user_id": user_id})
         return {"message": "Account deleted successfully"}
     except Exception as e:
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel
 from app.middleware.auth import require_auth
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
 from app.services.crypto import generate_api_key, hash_api_key, get_key_prefix
 
@@ -17,11 +18,11 @@ class ApiKeyCreate(BaseModel):
     expires_in_days: int | None = None
 
 
-def count_keys_today(user_id: str) -> int:
+async def count_keys_today(user_id: str) -> int:
     """Count API keys created today by user."""
     supabase = get_supabase()
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    r = supabase.table("api_keys").select("id", count="exact").eq("user_id", user_id).gte("created_at", today_start.isoformat()).execute()
+    r = await execute(supabase.table("api_keys").select("id", count="exact").eq("user_id", user_id).gte("created_at", today_start.isoformat()))
     return r.count or 0
 
 
@@ -31,7 +32,7 @@ async def list_api_keys(request: Request):
     """List user's API keys (prefix only, never full key)."""
     user_id = request.state.user_id
     supabase = get_supabase()
-    r = supabase.table("api_keys").select("id, key_prefix, is_active, last_used_at, created_at, expires_at").eq("user_id", user_id).order("created_at", desc=True).execute()
+    r = await execute(supabase.table("api_keys").select("id, key_prefix, is_active, last_used_at, created_at, expires_at").eq("user_id", user_id).order("created_at", desc=True))
     return {"keys": r.data or []}
 
 
@@ -41,7 +42,7 @@ async def create_api_key(request: Request, data: ApiKeyCreate = ApiKeyCreate()):
     """Generate new API key (return full key ONCE)."""
     user_id = request.state.user_id
     org_id = request.state.org_id
-    if count_keys_today(user_id) >= MAX_KEYS_PER_DAY:
+    if await count_keys_today(user_id) >= MAX_KEYS_PER_DAY:
         raise HTTPException(status_code=429, detail="Rate limit: max 5 keys per day")
     full_key = generate_api_key()
     key_hash = hash_api_key(full_key)
@@ -50,13 +51,13 @@ async def create_api_key(request: Request, data: ApiKeyCreate = ApiKeyCreate()):
     if data.expires_in_days:
         expires_at = (datetime.utcnow() + timedelta(days=data.expires_in_days)).isoformat()
     supabase = get_supabase()
-    r = supabase.table("api_keys").insert({
+    r = await execute(supabase.table("api_keys").insert({
         "user_id": user_id,
         "org_id": org_id,
         "key_hash": key_hash,
         "key_prefix": key_prefix,
         "expires_at": expires_at,
-    }).execute()
+    }))
     if not r.data:
         raise HTTPException(status_code=500, detail="Failed to create API key")
     return {
@@ -75,7 +76,7 @@ async def revoke_api_key(request: Request, key_id: str):
     """Revoke an API key (set is_active = false)."""
     user_id = request.state.user_id
     supabase = get_supabase()
-    r = supabase.table("api_keys").update({"is_active": False}).eq("id", key_id).eq("user_id", user_id).execute()
+    r = await execute(supabase.table("api_keys").update({"is_active": False}).eq("id", key_id).eq("user_id", user_id))
     if not r.data:
         raise HTTPException(status_code=404, detail="API key not found")
     return {"id": key_id, "revoked": True}
@@ -14,7 +14,7 @@ router = APIRouter()
 async def get_chat_history(request: Request, limit: int = 50):
     org_id = request.state.org_id
     user_id = request.state.user_id
-    history = get_recent_chat_history(org_id, user_id, limit=limit)
+    history = await get_recent_chat_history(org_id, user_id, limit=limit)
     return {"messages": history}
 
 
@@ -29,9 +29,9 @@ async def chat(request: Request, body: dict):
         raise HTTPException(400, detail="Message cannot be empty")
     if len(message) > 2000:
         raise HTTPException(400, detail="Message too long. Max 2000 characters.")
-    history = get_recent_chat_history(org_id, user_id, limit=20)
+    history = await get_recent_chat_history(org_id, user_id, limit=20)
     messages = history + [{"role": "user", "content": message}]
     response = await run_agent(org_id, messages)
-    save_chat_message(org_id, user_id, "user", message)
-    save_chat_message(org_id, user_id, "assistant", response)
+    await save_chat_message(org_id, user_id, "user", message)
+    await save_chat_message(org_id, user_id, "assistant", response)
     return {"response": response}
@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
 
 router = APIRouter()
@@ -24,10 +25,10 @@ async def contact_sales(lead: LeadForm):
         raise HTTPException(400, detail="Message too long")
     if "http://" in lead.message or "www." in lead.message:
         raise HTTPException(400, detail="Invalid submission")
-    get_supabase().table("enterprise_leads").insert({
+    await execute(get_supabase().table("enterprise_leads").insert({
         "name": lead.name,
         "email": lead.email,
         "company": lead.company,
         "message": lead.message,
-    }).execute()
+    }))
     return {"status": "ok", "message": "We will be in touch within 24 hours."}
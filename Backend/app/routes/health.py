@@ -1,9 +1,32 @@
-"""Health check for Render/load balancers."""
+"""Health check for Render/load balancers; process-local metrics."""
 from fastapi import APIRouter
 
+from app.ocr.fallback_engine import ocr_routing_stats
+from app.pipeline.structuring_rules import fast_path_stats
+from app.services.duplicate_index import duplicate_index_stats
+from app.services.extraction_cache import extraction_cache_stats
+from app.services.http_clients import pool_stats
+from app.services.mistral_limiter import mistral_limiter_stats
+from app.services.org_quota import cache_stats
+from app.services.scheduler import scheduler_stats
+
 router = APIRouter()
 
 
 @router.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@router.get("/health/metrics")
+async def metrics():
+    return {
+        "org_cache": await cache_stats(),
+        "http": pool_stats(),
+        "extraction_cache": extraction_cache_stats(),
+        "mistral": mistral_limiter_stats(),
+        "ocr_routing": ocr_routing_stats(),
+        "structuring_fast_path": fast_path_stats(),
+        "scheduler": scheduler_stats(),
+        "duplicate_index": duplicate_index_stats(),
+    }
@@ -1,9 +1,10 @@
 """Protected route: return current user_id, org_id, plan, display_name, email."""
 from fastapi import APIRouter, Request
-import httpx
 from app.middleware.auth import require_auth
 from app.services.org_quota import get_org
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
+from app.services.http_clients import get_http_client
 from app.config import get_settings
 
 router = APIRouter()
@@ -13,9 +14,9 @@ router = APIRouter()
 @require_auth
 async def me(request: Request):
     user_id = request.state.user_id
-    org = get_org(request.state.org_id)
+    org = await get_org(request.state.org_id)
     supabase = get_supabase()
-    profile = supabase.table("profiles").select("email, display_name").eq("id", user_id).execute()
+    profile = await execute(supabase.table("profiles").select("email, display_name").eq("id", user_id))
     email = None
     display_name = None
     if profile.data and len(profile.data) > 0:
@@ -26,11 +27,10 @@ async def me(request: Request):
         auth_url = f"{settings.supabase_url.rstrip('/')}/auth/v1/user"
         auth_header = request.headers.get("Authorization", "")
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(auth_url, headers={"Authorization": auth_header, "apikey": settings.supabase_service_role_key}, timeout=10.0)
-                if resp.status_code == 200:
-                    auth_data = resp.json()
-                    email = auth_data.get("email")
+            resp = await get_http_client().get(auth_url, headers={"Authorization": auth_header, "apikey": settings.supabase_service_role_key})
+            if resp.status_code == 200:
+                auth_data = resp.json()
+                email = auth_data.get("email")
         except Exception:
             pass
     return {
@@ -3,7 +3,9 @@ import logging
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel, Field, field_validator
 from app.middleware.auth import require_auth
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
+from app.services.org_quota import invalidate_org
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -29,7 +31,7 @@ async def get_organization(request: Request, org_id: str):
     if org_id != user_org_id:
         raise HTTPException(status_code=403, detail="Access denied")
     supabase = get_supabase()
-    r = supabase.table("organizations").select("id, name, plan").eq("id", org_id).execute()
+    r = await execute(supabase.table("organizations").select("id, name, plan").eq("id", org_id))
     if not r.data:
         raise HTTPException(status_code=404, detail="Organization not found")
     return r.data[0]
@@ -44,11 +46,12 @@ async def update_organization(request: Request, org_id: str, data: OrganizationU
         raise HTTPException(status_code=403, detail="Access denied")
     supabase = get_supabase()
     try:
-        r = supabase.table("organizations").update(
+        r = await execute(supabase.table("organizations").update(
             {"name": data.name}
-        ).eq("id", org_id).execute()
+        ).eq("id", org_id))
         if not r.data:
             raise HTTPException(status_code=404, detail="Organization not found")
+        await invalidate_org(org_id)
         return {"id": org_id, "name": data.name, "updated": True}
     except Exception as e:
         logger.error("Organization update failed", extra={"org_id": org_id, "error": str(e)})
@@ -3,6 +3,7 @@ import logging
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel, Field
 from app.middleware.auth import require_auth
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
 
 router = APIRouter()
@@ -21,10 +22,10 @@ class NotificationPreferences(BaseModel):
     weekly_summary: bool = False
 
 
-def get_or_create_preferences(user_id: str) -> dict:
+async def get_or_create_preferences(user_id: str) -> dict:
     """Get user preferences, creating defaults if missing."""
     supabase = get_supabase()
-    r = supabase.table("user_preferences").select("*").eq("user_id", user_id).execute()
+    r = await execute(supabase.table("user_preferences").select("*").eq("user_id", user_id))
     if r.data and len(r.data) > 0:
         return r.data[0]
     defaults = {
@@ -36,7 +37,7 @@ def get_or_create_preferences(user_id: str) -> dict:
         "processing_complete_alerts": True,
         "weekly_summary": False,
     }
-    r = supabase.table("user_preferences").insert(defaults).execute()
+    r = await execute(supabase.table("user_preferences").insert(defaults))
     return r.data[0] if r.data else defaults
 
 
@@ -45,7 +46,7 @@ def get_or_create_preferences(user_id: str) -> dict:
 async def get_preferences(request: Request):
     """Get user preferences."""
     user_id = request.state.user_id
-    prefs = get_or_create_preferences(user_id)
+    prefs = await get_or_create_preferences(user_id)
     return prefs
 
 
@@ -61,10 +62,10 @@ async def update_export_preferences(request: Request, data: ExportPreferences):
             "auto_export_enabled": data.auto_export_enabled,
             "auto_export_frequency": data.auto_export_frequency,
         }
-        r = supabase.table("user_preferences").upsert({
+        r = await execute(supabase.table("user_preferences").upsert({
             "user_id": user_id,
             **update_data
-        }).execute()
+        }))
         return r.data[0] if r.data else update_data
     except Exception as e:
         logger.error("Export preferences update failed", extra={"user_id": user_id, "error": str(e)})
@@ -83,10 +84,10 @@ async def update_notification_preferences(request: Request, data: NotificationPr
             "processing_complete_alerts": data.processing_complete_alerts,
             "weekly_summary": data.weekly_summary,
         }
-        r = supabase.table("user_preferences").upsert({
+        r = await execute(supabase.table("user_preferences").upsert({
             "user_id": user_id,
             **update_data
-        }).execute()
+        }))
         return r.data[0] if r.data else update_data
     except Exception as e:
         logger.error("Notification preferences update failed", extra={"user_id": user_id, "error": str(e)})
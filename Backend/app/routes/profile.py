@@ -3,7 +3,9 @@ import logging
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel, Field, field_validator
 from app.middleware.auth import require_auth
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
+from app.services.org_quota import invalidate_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -28,11 +30,12 @@ async def update_profile(request: Request, data: ProfileUpdate):
     user_id = request.state.user_id
     supabase = get_supabase()
     try:
-        r = supabase.table("profiles").update({
+        r = await execute(supabase.table("profiles").update({
             "display_name": data.display_name
-        }).eq("id", user_id).execute()
+        }).eq("id", user_id))
         if not r.data:
             raise HTTPException(status_code=404, detail="Profile not found")
+        await invalidate_user(user_id)
         return {"user_id": user_id, "display_name": data.display_name, "updated": True}
     except Exception as e:
         logger.error("Profile update failed", extra={"user_id": user_id, "error": str(e)})
@@ -3,6 +3,7 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Request, HTTPException
 from pydantic import BaseModel, Field
 from app.middleware.auth import require_auth
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
 
 router = APIRouter()
@@ -26,13 +27,13 @@ async def create_template(request: Request, data: TemplateCreate):
     org_id = request.state.org_id
     user_id = request.state.user_id
     supabase = get_supabase()
-    r = supabase.table("receipt_templates").insert({
+    r = await execute(supabase.table("receipt_templates").insert({
         "org_id": org_id,
         "user_id": user_id,
         "name": data.name,
         "description": data.description,
         "template_data": data.template_data,
-    }).execute()
+    }))
     return r.data[0] if r.data else None
 
 
@@ -41,9 +42,9 @@ async def create_template(request: Request, data: TemplateCreate):
 async def list_templates(request: Request):
     org_id = request.state.org_id
     supabase = get_supabase()
-    r = supabase.table("receipt_templates").select("*").eq(
+    r = await execute(supabase.table("receipt_templates").select("*").eq(
         "org_id", org_id
-    ).order("created_at", desc=True).execute()
+    ).order("created_at", desc=True))
     return {"templates": r.data or []}
 
 
@@ -52,9 +53,9 @@ async def list_templates(request: Request):
 async def get_template(request: Request, template_id: str):
     org_id = request.state.org_id
     supabase = get_supabase()
-    r = supabase.table("receipt_templates").select("*").eq("id", template_id).eq(
+    r = await execute(supabase.table("receipt_templates").select("*").eq("id", template_id).eq(
         "org_id", org_id
-    ).execute()
+    ))
     if not r.data or len(r.data) == 0:
         raise HTTPException(404, detail="Template not found")
     return r.data[0]
@@ -75,9 +76,9 @@ async def update_template(request: Request, template_id: str, data: TemplateUpda
     if not update_data:
         raise HTTPException(400, detail="No fields to update")
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-    r = supabase.table("receipt_templates").update(update_data).eq("id", template_id).eq(
+    r = await execute(supabase.table("receipt_templates").update(update_data).eq("id", template_id).eq(
         "org_id", org_id
-    ).execute()
+    ))
     if not r.data or len(r.data) == 0:
         raise HTTPException(404, detail="Template not found")
     return r.data[0]
@@ -88,9 +89,9 @@ async def update_template(request: Request, template_id: str, data: TemplateUpda
 async def delete_template(request: Request, template_id: str):
     org_id = request.state.org_id
     supabase = get_supabase()
-    r = supabase.table("receipt_templates").delete().eq("id", template_id).eq(
+    r = await execute(supabase.table("receipt_templates").delete().eq("id", template_id).eq(
         "org_id", org_id
-    ).execute()
+    ))
     if not r.data or len(r.data) == 0:
         raise HTTPException(404, detail="Template not found")
     return {"deleted": True}
@@ -101,14 +102,14 @@ async def delete_template(request: Request, template_id: str):
 async def apply_template(request: Request, receipt_id: str, template_id: str):
     org_id = request.state.org_id
     supabase = get_supabase()
-    receipt = supabase.table("receipts").select("*").eq("id", receipt_id).eq(
+    receipt = await execute(supabase.table("receipts").select("*").eq("id", receipt_id).eq(
         "org_id", org_id
-    ).eq("is_deleted", False).execute()
+    ).eq("is_deleted", False))
     if not receipt.data or len(receipt.data) == 0:
         raise HTTPException(404, detail="Receipt not found")
-    template = supabase.table("receipt_templates").select("*").eq("id", template_id).eq(
+    template = await execute(supabase.table("receipt_templates").select("*").eq("id", template_id).eq(
         "org_id", org_id
-    ).execute()
+    ))
     if not template.data or len(template.data) == 0:
         raise HTTPException(404, detail="Template not found")
     template_data = template.data[0].get("template_data", {})
@@ -127,21 +128,21 @@ async def apply_template(request: Request, receipt_id: str, template_id: str):
         update_fields["currency"] = template_data["currency"]
     if update_fields:
         update_fields["updated_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        supabase.table("receipts").update(update_fields).eq("id", receipt_id).execute()
+        await execute(supabase.table("receipts").update(update_fields).eq("id", receipt_id))
     if "items" in template_data and isinstance(template_data["items"], list):
-        existing = supabase.table("receipt_items").select("id").eq("receipt_id", receipt_id).execute()
+        existing = await execute(supabase.table("receipt_items").select("id").eq("receipt_id", receipt_id))
         for item_id in [x["id"] for x in (existing.data or [])]:
-            supabase.table("receipt_items").delete().eq("id", item_id).execute()
+            await execute(supabase.table("receipt_items").delete().eq("id", item_id))
         for item in template_data["items"]:
-            supabase.table("receipt_items").insert({
+            await execute(supabase.table("receipt_items").insert({
                 "receipt_id": receipt_id,
                 "description": str(item.get("description", "")),
                 "quantity": float(item.get("quantity", 0)) if item.get("quantity") is not None else None,
                 "unit_price": float(item.get("unit_price", 0)) if item.get("unit_price") is not None else None,
                 "subtotal": float(item.get("subtotal", 0)) if item.get("subtotal") is not None else None,
-            }).execute()
-    updated = supabase.table("receipts").select("*").eq("id", receipt_id).execute()
-    items = supabase.table("receipt_items").select("*").eq("receipt_id", receipt_id).execute()
+            }))
+    updated = await execute(supabase.table("receipts").select("*").eq("id", receipt_id))
+    items = await execute(supabase.table("receipt_items").select("*").eq("receipt_id", receipt_id))
     result = updated.data[0] if updated.data else {}
     result["items"] = items.data or []
     return result
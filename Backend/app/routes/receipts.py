@@ -1,16 +1,19 @@
 """Receipts CRUD: list, get, patch, export; bulk import from CSV/XLSX."""
-import csv
-import io
 import uuid
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from pathlib import Path
+from typing import Literal, Optional
 from fastapi import APIRouter, Request, HTTPException, Query, UploadFile, File
 from fastapi.responses import StreamingResponse
 from app.middleware.auth import require_auth
 from app.middleware.quota import TIER_LIMITS, require_quota
 from app.services.org_quota import get_org, increment_usage
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
-from app.services.receipt_store import create_batch, update_batch, save_receipt_from_import
+from app.services.receipt_export import stream_csv, stream_xlsx
+from app.services.receipt_query import ReceiptFilters, apply_filters, apply_keyset, page_cursor, parse_cursor
+from app.services.receipt_search import search_ranked
+from app.services.receipt_store import create_batch, update_batch, save_receipts_bulk, import_inputs
 from app.services.import_parser import parse_csv, parse_xlsx
 
 router = APIRouter()
@@ -19,43 +22,109 @@ SAFE_FIELDS = {"vendor", "category", "date", "notes", "total", "tax", "currency"
 
 @router.get("/export")
 @require_auth
-async def export_receipts(request: Request, format: str = "csv"):
+async def export_receipts(
+    request: Request,
+    format: Literal["csv", "xlsx"] = "csv",
+    include_items: bool = False,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    vendor: Optional[str] = None,
+    needs_review: Optional[bool] = None,
+):
+    """Export the org's receipts (newest first), read from the DB in chunks; one row per item with include_items.
+
+    CSV is streamed as it is built; XLSX is spooled to a temp file and sent once complete.
+    """
     org_id = request.state.org_id
-    org = get_org(org_id)
+    org = await get_org(org_id)
     limits = TIER_LIMITS.get(org["plan"], TIER_LIMITS["free"])
     if limits.get("export") == "basic" and format != "csv":
         raise HTTPException(403, detail="Excel export requires Pro plan")
-    r = get_supabase().table("receipts").select(
-        "id, vendor, date, total, tax, currency, category, confidence, needs_review, created_at"
-    ).eq("org_id", org_id).eq("is_deleted", False).order("created_at", desc=True).execute()
-    rows = r.data or []
-    if format == "csv":
-        buf = io.StringIO()
-        w = csv.writer(buf)
-        w.writerow(["id", "vendor", "date", "total", "tax", "currency", "category", "confidence", "needs_review", "created_at"])
-        for x in rows:
-            w.writerow([
-                x.get("id"), x.get("vendor"), x.get("date"), x.get("total"), x.get("tax"),
-                x.get("currency"), x.get("category"), x.get("confidence"), x.get("needs_review"), x.get("created_at"),
-            ])
-        buf.seek(0)
+    filters = ReceiptFilters(
+        date_from=date_from.isoformat() if date_from else None,
+        date_to=date_to.isoformat() if date_to else None,
+        category=category, vendor=vendor, needs_review=needs_review,
+    )
+    if format == "xlsx":
         return StreamingResponse(
-            iter([buf.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=receipts.csv"},
+            stream_xlsx(org_id, filters, include_items),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": "attachment; filename=receipts.xlsx"},
         )
-    raise HTTPException(400, detail="format must be csv")
+    return StreamingResponse(
+        stream_csv(org_id, filters, include_items),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=receipts.csv"},
+    )
+
+
+@router.get("/search")
+@require_auth
+async def search_receipts(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+):
+    """Ranked full-text + fuzzy vendor search; pass next_cursor back as cursor for the next page."""
+    try:
+        return await search_ranked(
+            request.state.org_id, q, limit=limit, cursor=cursor,
+            date_from=date_from.isoformat() if date_from else None,
+            date_to=date_to.isoformat() if date_to else None,
+            category=category, min_total=min_total, max_total=max_total,
+        )
+    except ValueError:
+        raise HTTPException(400, detail="Invalid cursor")
 
 
 @router.get("")
 @require_auth
-async def list_receipts(request: Request, skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=100)):
-    r = get_supabase().table("receipts").select(
+async def list_receipts(
+    request: Request,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, description="Deprecated: offset paging, ignored when cursor is given"),
+    sort: Literal["created_at", "date", "total"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None,
+    vendor: Optional[str] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+    needs_review: Optional[bool] = None,
+):
+    """Keyset-paged receipts; pass next_cursor back as cursor (with the same sort/order/filters)."""
+    descending = order == "desc"
+    after = None
+    if cursor:
+        try:
+            after = parse_cursor(cursor, sort, descending)
+        except ValueError:
+            raise HTTPException(400, detail="Invalid cursor")
+    filters = ReceiptFilters(
+        date_from=date_from.isoformat() if date_from else None,
+        date_to=date_to.isoformat() if date_to else None,
+        category=category, vendor=vendor, min_total=min_total, max_total=max_total, needs_review=needs_review,
+    )
+    query = get_supabase().table("receipts").select(
         "id, batch_id, image_url, vendor, date, total, tax, currency, category, confidence, needs_review, created_at"
-    ).eq("org_id", request.state.org_id).eq("is_deleted", False).order("created_at", desc=True).range(
-        skip, skip + limit - 1
-    ).execute()
-    return {"items": r.data or [], "skip": skip, "limit": limit}
+    ).eq("org_id", request.state.org_id).eq("is_deleted", False)
+    query = apply_keyset(apply_filters(query, filters), sort, descending, after)
+    # One extra row tells whether there is a next page.
+    start = 0 if cursor else skip
+    r = await execute(query.range(start, start + limit))
+    rows = r.data or []
+    items = rows[:limit]
+    next_cursor = page_cursor(items[-1], sort, descending) if len(rows) > limit else None
+    return {"items": items, "skip": skip, "limit": limit, "next_cursor": next_cursor}
 
 
 @router.post("/import")
@@ -65,7 +134,7 @@ async def import_receipts(request: Request, file: UploadFile = File(...)):
     """Bulk import receipts from CSV or XLSX (vendor, date, total, currency, category)."""
     org_id = request.state.org_id
     user_id = request.state.user_id
-    _ = get_org(org_id)
+    _ = await get_org(org_id)
     ext = Path(file.filename or "").suffix.lower()
     if ext not in (".csv", ".xlsx"):
         raise HTTPException(400, detail="Only CSV and XLSX are allowed for import.")
@@ -77,12 +146,18 @@ async def import_receipts(request: Request, file: UploadFile = File(...)):
     if not rows:
         raise HTTPException(400, detail="No valid receipt rows found. Need vendor, date, or total.")
     batch_id = str(uuid.uuid4())
-    create_batch(org_id, user_id, batch_id, total_files=len(rows))
-    for row in rows:
-        save_receipt_from_import(org_id, batch_id, row)
-    increment_usage(org_id, len(rows))
-    update_batch(batch_id, status="done", processed=len(rows))
-    return {"batch_id": batch_id, "imported": len(rows)}
+    await create_batch(org_id, user_id, batch_id, total_files=len(rows))
+    saved = await save_receipts_bulk(org_id, batch_id, import_inputs(rows))
+    imported = len(saved["saved"])
+    failed = [{"row": f["index"] + 1, "error": "Could not save row"} for f in saved["failed"]]
+    if imported:
+        await increment_usage(org_id, imported)
+    status = "done" if not failed else ("partial" if imported else "failed")
+    await update_batch(batch_id, status=status, processed=imported, failed=len(failed))
+    resp: dict[str, object] = {"batch_id": batch_id, "imported": imported}
+    if failed:
+        resp["failed"] = failed
+    return resp
 
 
 RECEIPT_COLUMNS = (
@@ -94,13 +169,13 @@ RECEIPT_COLUMNS = (
 @router.get("/{receipt_id}")
 @require_auth
 async def get_receipt(request: Request, receipt_id: str):
-    r = get_supabase().table("receipts").select(RECEIPT_COLUMNS).eq("id", receipt_id).eq(
+    r = await execute(get_supabase().table("receipts").select(RECEIPT_COLUMNS).eq("id", receipt_id).eq(
         "org_id", request.state.org_id
-    ).eq("is_deleted", False).execute()
+    ).eq("is_deleted", False))
     if not r.data or len(r.data) == 0:
         raise HTTPException(404, detail="Receipt not found")
     receipt = r.data[0]
-    items = get_supabase().table("receipt_items").select("*").eq("receipt_id", receipt_id).execute()
+    items = await execute(get_supabase().table("receipt_items").select("*").eq("receipt_id", receipt_id))
     receipt["items"] = items.data or []
     return receipt
 
@@ -112,9 +187,9 @@ async def patch_receipt(request: Request, receipt_id: str, body: dict):
     if not allowed:
         raise HTTPException(400, detail=f"Allowed fields: {SAFE_FIELDS}")
     allowed["updated_at"] = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-    r = get_supabase().table("receipts").update(allowed).eq(
+    r = await execute(get_supabase().table("receipts").update(allowed).eq(
         "id", receipt_id
-    ).eq("org_id", request.state.org_id).execute()
+    ).eq("org_id", request.state.org_id))
     if not r.data or len(r.data) == 0:
         raise HTTPException(404, detail="Receipt not found")
     return r.data[0]
@@ -125,20 +200,20 @@ async def patch_receipt(request: Request, receipt_id: str, body: dict):
 async def patch_receipt_items(request: Request, receipt_id: str, body: dict):
     org_id = request.state.org_id
     supabase = get_supabase()
-    receipt_check = supabase.table("receipts").select("id").eq("id", receipt_id).eq(
+    receipt_check = await execute(supabase.table("receipts").select("id").eq("id", receipt_id).eq(
         "org_id", org_id
-    ).eq("is_deleted", False).execute()
+    ).eq("is_deleted", False))
     if not receipt_check.data or len(receipt_check.data) == 0:
         raise HTTPException(404, detail="Receipt not found")
     items = body.get("items", [])
     if not isinstance(items, list):
         raise HTTPException(400, detail="items must be an array")
-    existing = supabase.table("receipt_items").select("id").eq("receipt_id", receipt_id).execute()
+    existing = await execute(supabase.table("receipt_items").select("id").eq("receipt_id", receipt_id))
     existing_ids = {x["id"] for x in (existing.data or [])}
     new_ids = {x.get("id") for x in items if x.get("id")}
     to_delete = existing_ids - new_ids
     for item_id in to_delete:
-        supabase.table("receipt_items").delete().eq("id", item_id).execute()
+        await execute(supabase.table("receipt_items").delete().eq("id", item_id))
     for item in items:
         item_data = {
             "receipt_id": receipt_id,
@@ -148,8 +223,8 @@ async def patch_receipt_items(request: Request, receipt_id: str, body: dict):
             "subtotal": float(item.get("subtotal", 0)) if item.get("subtotal") is not None else None,
         }
         if item.get("id") and item["id"] in existing_ids:
-            supabase.table("receipt_items").update(item_data).eq("id", item["id"]).execute()
+            await execute(supabase.table("receipt_items").update(item_data).eq("id", item["id"]))
         else:
-            supabase.table("receipt_items").insert(item_data).execute()
-    updated = supabase.table("receipt_items").select("*").eq("receipt_id", receipt_id).execute()
+            await execute(supabase.table("receipt_items").insert(item_data))
+    updated = await execute(supabase.table("receipt_items").select("*").eq("receipt_id", receipt_id))
     return {"items": updated.data or []}
@@ -1,15 +1,19 @@
-"""POST /upload: auth, quota, validate files, save to Storage, background extract."""
+"""POST /upload: auth, quota, validate files, save to Storage, enqueue extraction."""
+import asyncio
 import logging
 import uuid
 from pathlib import Path
 from fastapi import APIRouter, Request, UploadFile, File, HTTPException, BackgroundTasks
+from app.config import get_settings
 from app.middleware.auth import require_auth
 from app.middleware.quota import require_quota
+from app.services.db import run_sync
 from app.services.supabase_client import get_supabase
-from app.services.receipt_store import create_batch
+from app.services.receipt_store import create_batch, update_batch
 from app.services.org_quota import get_org
 from app.services.receipt_detector import validate_receipt_image
 from app.services.batch_processor import process_batch_bg
+from app.services.job_queue import get_job_queue
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -29,6 +33,69 @@ def is_valid_pdf(content: bytes) -> bool:
     return len(content) >= 5 and content[:5] == PDF_SIG
 
 
+async def check_content(content: bytes, filename: str | None, ext: str) -> str | None:
+    """Validate file bytes: raises 400 for invalid files; returns a skip reason for non-receipts."""
+    if ext in IMAGE_EXTS:
+        if not is_valid_image(content):
+            raise HTTPException(400, detail=f"Invalid image: {filename}")
+        check = await asyncio.to_thread(validate_receipt_image, content, filename or "")
+        if not check["is_receipt"]:
+            return check["reason"]
+    elif ext == ".pdf":
+        if not is_valid_pdf(content):
+            raise HTTPException(400, detail=f"Invalid PDF: {filename}")
+    return None
+
+
+def content_type_for(ext: str) -> str:
+    return {".pdf": "application/pdf", ".png": "image/png"}.get(ext, "image/jpeg")
+
+
+async def start_batch(
+    background_tasks: BackgroundTasks,
+    org_id: str,
+    user_id: str,
+    batch_id: str,
+    storage_paths: list[tuple[str, str]],
+    total_files: int,
+) -> str:
+    """Create the batch row and hand it to the job queue (or a background task); returns its status."""
+    queue = get_job_queue()
+    status = "queued" if queue is not None else "processing"
+    await create_batch(org_id, user_id, batch_id, total_files=total_files, status=status)
+    if queue is None:
+        background_tasks.add_task(process_batch_bg, org_id, user_id, batch_id, storage_paths)
+    else:
+        try:
+            await queue.enqueue(batch_id, org_id, user_id, storage_paths)
+        except Exception as e:
+            logger.error("Failed to enqueue batch", extra={"batch_id": batch_id, "error": str(e)})
+            await update_batch(batch_id, status="failed")
+            raise HTTPException(503, detail="Could not queue batch for processing. Please try again.")
+    return status
+
+
+async def _store_file(
+    f: UploadFile, ext: str, org_id: str, batch_id: str, bucket, sem: asyncio.Semaphore
+) -> tuple[str, str] | dict[str, str]:
+    """Read, validate and store one file; returns (path, ext), or a skipped-file entry.
+
+    Holds the file's bytes only while it is being validated and written.
+    """
+    async with sem:
+        content = await f.read()
+        await f.close()
+        if len(content) > MAX_SIZE_MB * 1024 * 1024:
+            raise HTTPException(400, detail=f"File too large: {f.filename}. Max 1 MB per file.")
+        reason = await check_content(content, f.filename, ext)
+        if reason is not None:
+            return {"filename": f.filename or "unnamed", "reason": reason}
+        path = f"{org_id}/{batch_id}/{uuid.uuid4()}{ext}"
+        content_type = f.content_type or content_type_for(ext)
+        await run_sync(bucket.upload, path, content, {"content-type": content_type})
+        return path, ext
+
+
 @router.post("")
 @require_auth
 @require_quota("upload")
@@ -41,36 +108,39 @@ async def upload_receipts(
     user_id = request.state.user_id
     # Quota enforcement is effectively disabled for now; all plans behave the same.
     # get_org(org_id) is still called for consistency and future use.
-    _ = get_org(org_id)
+    _ = await get_org(org_id)
     if not files:
         raise HTTPException(400, detail="No files provided")
     if len(files) > MAX_FILES:
         raise HTTPException(400, detail=f"Max {MAX_FILES} files per batch")
-    batch_id = str(uuid.uuid4())
-    storage_paths: list[tuple[str, str]] = []
-    skipped: list[dict[str, str]] = []
-    bucket = get_supabase().storage.from_("receipts")
-    for f in files:
-        ext = Path(f.filename or "").suffix.lower()
+    exts = [Path(f.filename or "").suffix.lower() for f in files]
+    for f, ext in zip(files, exts):
         if ext not in ALLOWED_EXT:
             raise HTTPException(400, detail=f"Invalid type: {f.filename}. Allowed: jpg, jpeg, png, pdf.")
-        content = await f.read()
-        if len(content) > MAX_SIZE_MB * 1024 * 1024:
-            raise HTTPException(400, detail=f"File too large: {f.filename}. Max 1 MB per file.")
-        if ext in IMAGE_EXTS:
-            if not is_valid_image(content):
-                raise HTTPException(400, detail=f"Invalid image: {f.filename}")
-            check = validate_receipt_image(content, f.filename or "")
-            if not check["is_receipt"]:
-                skipped.append({"filename": f.filename or "unnamed", "reason": check["reason"]})
-                continue
-        elif ext == ".pdf":
-            if not is_valid_pdf(content):
-                raise HTTPException(400, detail=f"Invalid PDF: {f.filename}")
-        path = f"{org_id}/{batch_id}/{uuid.uuid4()}{ext}"
-        content_type = f.content_type or ("application/pdf" if ext == ".pdf" else "image/jpeg")
-        bucket.upload(path, content, {"content-type": content_type})
-        storage_paths.append((path, ext))
+    batch_id = str(uuid.uuid4())
+    bucket = get_supabase().storage.from_("receipts")
+    # Validation and storage writes for different files overlap; UPLOAD_CONCURRENCY bounds
+    # both the storage fan-out and how many file bodies are in memory at once.
+    sem = asyncio.Semaphore(max(1, get_settings().upload_concurrency))
+    tasks = [
+        asyncio.create_task(_store_file(f, ext, org_id, batch_id, bucket, sem)) for f, ext in zip(files, exts)
+    ]
+    try:
+        outcomes = await asyncio.gather(*tasks)
+    except BaseException:
+        # One file was rejected (or the client went away): stop the rest and drop what was stored.
+        for task in tasks:
+            task.cancel()
+        done = await asyncio.gather(*tasks, return_exceptions=True)
+        stored = [o[0] for o in done if isinstance(o, tuple)]
+        if stored:
+            try:
+                await run_sync(bucket.remove, stored)
+            except Exception as e:
+                logger.warning("Failed to remove files of rejected upload", extra={"batch_id": batch_id, "error": str(e)})
+        raise
+    storage_paths: list[tuple[str, str]] = [o for o in outcomes if isinstance(o, tuple)]
+    skipped: list[dict[str, str]] = [o for o in outcomes if isinstance(o, dict)]
     if not storage_paths:
         if skipped:
             raise HTTPException(
@@ -81,11 +151,10 @@ async def upload_receipts(
                 },
             )
         raise HTTPException(400, detail="No valid receipt files found")
-    create_batch(org_id, user_id, batch_id, total_files=len(files))
-    background_tasks.add_task(process_batch_bg, org_id, user_id, batch_id, storage_paths)
+    status = await start_batch(background_tasks, org_id, user_id, batch_id, storage_paths, len(files))
     resp: dict[str, object] = {
         "batch_id": batch_id,
-        "status": "processing",
+        "status": status,
         "total_files": len(files),
     }
     if skipped:
@@ -0,0 +1,280 @@
+"""Resumable upload sessions: create, declare files, PUT parts in any order, commit into a batch.
+
+    POST /upload/sessions                                   → {session_id, limits}
+    PUT  /upload/sessions/{id}/files/{file_id}              declare filename, size, sha256, part_count
+    PUT  /upload/sessions/{id}/files/{file_id}/parts/{n}    raw bytes; X-Content-SHA256 header
+    GET  /upload/sessions/{id}                              what has arrived (to resume)
+    POST /upload/sessions/{id}/commit                       assemble, validate, create + enqueue batch
+
+Every call is idempotent, so clients can upload parts in parallel and retry
+freely after a dropped connection. Hashes are verified server-side per part on
+arrival and per file on commit.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import uuid
+from pathlib import Path as FilePath
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Path, Request
+from pydantic import BaseModel, Field
+
+from app.config import get_settings
+from app.middleware.auth import require_auth
+from app.middleware.quota import require_quota
+from app.routes.upload import ALLOWED_EXT, MAX_FILES, check_content, content_type_for, start_batch
+from app.services import upload_sessions as sessions
+from app.services.db import run_sync
+from app.services.receipt_store import update_batch
+from app.services.supabase_client import get_supabase
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+FILE_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+SHA256_PATTERN = r"^[0-9a-fA-F]{64}$"
+TAKEN_OVER = "Upload session was taken over by another commit"
+
+
+class FileDeclaration(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    size_bytes: int = Field(gt=0)
+    sha256: str = Field(pattern=SHA256_PATTERN)
+    part_count: int = Field(default=1, ge=1)
+
+
+def _limits() -> dict:
+    settings = get_settings()
+    return {
+        "max_files": MAX_FILES,
+        "max_file_bytes": settings.upload_session_max_file_mb * 1024 * 1024,
+        "max_part_bytes": settings.upload_session_max_part_mb * 1024 * 1024,
+    }
+
+
+async def _open_session(org_id: str, session_id: str) -> dict:
+    try:
+        uuid.UUID(session_id)
+    except ValueError:
+        raise HTTPException(404, detail="Upload session not found")
+    session = await sessions.get_session(org_id, session_id)
+    if session is None:
+        raise HTTPException(404, detail="Upload session not found")
+    if sessions.is_expired(session):
+        raise HTTPException(410, detail="Upload session expired")
+    return session
+
+
+def _require_open(session: dict) -> None:
+    if session["status"] != "open":
+        raise HTTPException(409, detail=f"Upload session is {session['status']}")
+
+
+def _file_state(f: dict) -> dict:
+    return {
+        "file_id": f["file_id"],
+        "filename": f["filename"],
+        "size_bytes": f["size_bytes"],
+        "part_count": f["part_count"],
+        "received_parts": f["received_parts"],
+        "complete": len(f["received_parts"]) == f["part_count"],
+    }
+
+
+@router.post("")
+@require_auth
+@require_quota("upload")
+async def create_upload_session(request: Request):
+    session = await sessions.create_session(request.state.org_id, request.state.user_id)
+    return {"session_id": session["id"], "expires_at": session["expires_at"], **_limits()}
+
+
+@router.get("/{session_id}")
+@require_auth
+async def get_upload_session(request: Request, session_id: str):
+    session = await _open_session(request.state.org_id, session_id)
+    files = await sessions.list_files(session_id)
+    return {
+        "session_id": session_id,
+        "status": session["status"],
+        "batch_id": session.get("batch_id"),
+        "expires_at": session["expires_at"],
+        "files": [_file_state(f) for f in files],
+    }
+
+
+@router.put("/{session_id}/files/{file_id}")
+@require_auth
+async def declare_upload_file(
+    request: Request,
+    body: FileDeclaration,
+    session_id: str,
+    file_id: str = Path(pattern=FILE_ID_PATTERN),
+):
+    session = await _open_session(request.state.org_id, session_id)
+    _require_open(session)
+    ext = FilePath(body.filename).suffix.lower()
+    if ext not in ALLOWED_EXT:
+        raise HTTPException(400, detail=f"Invalid type: {body.filename}. Allowed: jpg, jpeg, png, pdf.")
+    limits = _limits()
+    if body.size_bytes > limits["max_file_bytes"]:
+        raise HTTPException(400, detail=f"File too large: {body.filename}. Max {get_settings().upload_session_max_file_mb} MB per file.")
+    if not math.ceil(body.size_bytes / limits["max_part_bytes"]) <= body.part_count <= body.size_bytes:
+        raise HTTPException(400, detail="part_count does not fit size_bytes and the part size limit")
+    files = await sessions.list_files(session_id)
+    if len(files) >= MAX_FILES and all(f["file_id"] != file_id for f in files):
+        raise HTTPException(400, detail=f"Max {MAX_FILES} files per batch")
+    try:
+        await sessions.declare_file(
+            session_id, file_id, body.filename, ext, body.size_bytes, body.sha256, body.part_count
+        )
+    except sessions.UploadSessionConflict as e:
+        raise HTTPException(409, detail=str(e))
+    declared = next((f for f in await sessions.list_files(session_id) if f["file_id"] == file_id), None)
+    return _file_state(declared)
+
+
+@router.put("/{session_id}/files/{file_id}/parts/{part_number}")
+@require_auth
+async def put_upload_part(
+    request: Request,
+    session_id: str,
+    file_id: str = Path(pattern=FILE_ID_PATTERN),
+    part_number: int = Path(ge=1),
+):
+    claimed = (request.headers.get("x-content-sha256") or "").lower()
+    if len(claimed) != 64:
+        raise HTTPException(400, detail="X-Content-SHA256 header (hex SHA-256 of the part) is required")
+    session = await _open_session(request.state.org_id, session_id)
+    _require_open(session)
+    files = await sessions.list_files(session_id)
+    declared = next((f for f in files if f["file_id"] == file_id), None)
+    if declared is None:
+        raise HTTPException(404, detail="Declare the file before uploading its parts")
+    if part_number > declared["part_count"]:
+        raise HTTPException(400, detail=f"File {file_id} has {declared['part_count']} parts")
+    # Read the body as it arrives, enforcing the part limit before buffering more.
+    limit = _limits()["max_part_bytes"]
+    digest = hashlib.sha256()
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise HTTPException(413, detail=f"Part too large (max {limit} bytes)")
+        digest.update(chunk)
+    if not body:
+        raise HTTPException(400, detail="Empty part")
+    if digest.hexdigest() != claimed:
+        raise HTTPException(400, detail="Part SHA-256 does not match X-Content-SHA256")
+    try:
+        stored = await sessions.put_part(
+            request.state.org_id, session_id, file_id, part_number, bytes(body), claimed
+        )
+    except sessions.UploadSessionConflict as e:
+        raise HTTPException(409, detail=str(e))
+    return {"file_id": file_id, "part_number": part_number, "status": "stored" if stored else "exists"}
+
+
+async def _finalize_file(
+    org_id: str, session_id: str, batch_id: str, f: dict, sem: asyncio.Semaphore
+) -> tuple[str, str] | dict[str, str]:
+    """Assemble, verify, validate and store one file; (path, ext) or a skipped-file entry."""
+    async with sem:
+        content = await sessions.assemble_file(f)
+        if content is None:
+            # Let the client re-send this file's parts instead of failing the session for good.
+            await sessions.discard_parts(session_id, f)
+            raise HTTPException(
+                422, detail=f"File {f['file_id']} does not match its declared size/SHA-256; re-upload its parts"
+            )
+        reason = await check_content(content, f["filename"], f["ext"])
+        if reason is not None:
+            return {"filename": f["filename"], "reason": reason}
+        path = f"{org_id}/{batch_id}/{uuid.uuid4()}{f['ext']}"
+        bucket = get_supabase().storage.from_("receipts")
+        await run_sync(bucket.upload, path, content, {"content-type": content_type_for(f["ext"])})
+        return path, f["ext"]
+
+
+def _check_complete(files: list[dict]) -> None:
+    if not files:
+        raise HTTPException(400, detail="No files provided")
+    missing = {
+        f["file_id"]: sorted(set(range(1, f["part_count"] + 1)) - set(f["received_parts"]))
+        for f in files
+        if len(f["received_parts"]) != f["part_count"]
+    }
+    if missing:
+        raise HTTPException(409, detail={"error": "Upload incomplete", "missing_parts": missing})
+
+
+@router.post("/{session_id}/commit")
+@require_auth
+@require_quota("upload")
+async def commit_upload_session(request: Request, background_tasks: BackgroundTasks, session_id: str):
+    org_id = request.state.org_id
+    session = await _open_session(org_id, session_id)
+    if session["status"] == "committed":
+        return {"session_id": session_id, "batch_id": session["batch_id"], "status": "committed"}
+    _check_complete(await sessions.list_files(session_id))
+    deadline = await sessions.begin_commit(session_id)
+    if deadline is None:
+        raise HTTPException(409, detail="Upload session is already being committed")
+    batch_id = str(uuid.uuid4())
+    sem = asyncio.Semaphore(max(1, get_settings().upload_concurrency))
+    storage_paths: list[tuple[str, str]] = []
+    bucket = get_supabase().storage.from_("receipts")
+    try:
+        # Listed again now that no more parts can be recorded (files may have been declared meanwhile).
+        files = await sessions.list_files(session_id)
+        _check_complete(files)
+        outcomes = await asyncio.gather(
+            *(_finalize_file(org_id, session_id, batch_id, f, sem) for f in files), return_exceptions=True
+        )
+        failure = next((o for o in outcomes if isinstance(o, BaseException)), None)
+        storage_paths = [o for o in outcomes if isinstance(o, tuple)]
+        skipped: list[dict[str, str]] = [o for o in outcomes if isinstance(o, dict)]
+        if failure is None and not storage_paths:
+            failure = HTTPException(
+                400,
+                detail={"error": "No valid receipts found. Please upload receipt images only.", "skipped": skipped},
+            )
+        if failure is None:
+            # Assembly may have outlived the deadline; only create the batch while the session is still ours.
+            renewed = await sessions.renew_commit(session_id, deadline)
+            if renewed is None:
+                failure = HTTPException(409, detail=TAKEN_OVER)
+            else:
+                deadline = renewed
+        if failure is not None:
+            if storage_paths:
+                await run_sync(bucket.remove, [p for p, _ in storage_paths])
+            raise failure
+        status = await start_batch(
+            background_tasks, org_id, request.state.user_id, batch_id, storage_paths, len(files)
+        )
+    except BaseException:
+        # No-op if the session was taken over (the deadline no longer matches).
+        await sessions.finish_commit(session_id, deadline, None)
+        raise
+    if not await sessions.finish_commit(session_id, deadline, batch_id):
+        # Taken over between renewing and finishing: the other commit owns the session and its parts.
+        logger.warning(
+            "Upload session was taken over after its batch was started",
+            extra={"session_id": session_id, "batch_id": batch_id},
+        )
+        await update_batch(batch_id, status="failed")
+        await run_sync(bucket.remove, [p for p, _ in storage_paths])
+        raise HTTPException(409, detail=TAKEN_OVER)
+    for f in files:
+        await sessions.discard_parts(session_id, f)
+    resp: dict[str, object] = {
+        "session_id": session_id,
+        "batch_id": batch_id,
+        "status": status,
+        "total_files": len(files),
+    }
+    if skipped:
+        resp["skipped"] = skipped
+    return resp
@@ -1,100 +1,296 @@
 """Background batch extraction for uploaded receipts.
 
-This module is responsible for:
-- Downloading images from Supabase storage
-- De-duplicating images within a batch (by SHA-256)
-- Running the extraction pipeline
-- Persisting receipts and updating batch status/usage
-- Optionally notifying the user when processing completes
+Runs as a pipeline of concurrent stages joined by bounded queues:
+
+    download (+ PDF pages, dedupe) → OCR + structure → persist
+
+PDF pages stream out of the renderer as they are ready (app.services.pdf_extractor);
+pages with a text layer go straight to structuring without OCR.
+
+Receipts that need the LLM are packed into multi-receipt prompts per batch
+(see app.pipeline.structuring_batcher).
+
+- Downloads run concurrently (BATCH_DOWNLOAD_CONCURRENCY).
+- Images are de-duplicated within a batch (by SHA-256) before extraction; the same
+  hash keys the org's extraction cache, so re-uploads skip OCR and the LLM.
+- Re-photographed receipts are caught by a perceptual hash checked against the org's
+  earlier receipts (app.services.duplicate_index) before OCR: close ones are saved for
+  review with duplicate_of set; with DUPLICATE_SKIP_DISTANCE set, near-identical ones
+  are not extracted and are listed on the batch (skipped_duplicates).
+- Each receipt is saved as soon as it is extracted (small multi-row inserts).
+- Peak memory is bounded by BATCH_QUEUE_DEPTH and stage concurrency, not batch size.
+- Batch status/usage are updated at the end and the user is optionally notified.
 """
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import logging
-from typing import List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 
+from app.config import get_settings
+from app.ocr.base_engine import RawOcrResult
+from app.ocr.executor import run_ocr
+from app.services.db import execute, run_sync
 from app.services.supabase_client import get_supabase
-from app.services.extraction import extract_batch
-from app.services.receipt_store import update_batch, save_receipt
-from app.services.org_quota import increment_usage
+from app.services.extraction import OCR_LANGUAGE, extract_one, new_structuring_batcher
+from app.services.receipt_store import update_batch, save_receipts_bulk
+from app.services.org_quota import get_org, increment_usage
+from app.services.scheduler import org_context
 from app.services.email_service import send_processing_complete_email
-from app.services.pdf_extractor import pdf_to_images
+from app.services.duplicate_index import BKTree, get_duplicate_index, image_phash, to_hex
+from app.services.pdf_extractor import PdfPolicy, iter_pdf_pages, pdf_policy_for_plan
 from app.utils.redaction import sanitize_failure_reason
 
 logger = logging.getLogger(__name__)
 
+NEEDS_REVIEW_BELOW = 0.85
+SAVE_CHUNK_MAX = 25
+_DONE = object()
+
+
+@dataclass
+class _BatchState:
+    seen_hashes: set[str] = field(default_factory=set)
+    unit_paths: List[str] = field(default_factory=list)  # extraction unit index -> storage path
+    errors: List[Dict] = field(default_factory=list)
+    saved: int = 0
+    # Perceptual duplicates: unit -> (phash, flagged, duplicate_of); this batch's hashes;
+    # images not extracted as near-duplicates ({"index", "duplicate_of", "distance"}).
+    phashes: Dict[int, Tuple[int, bool, Optional[str]]] = field(default_factory=dict)
+    batch_phashes: BKTree = field(default_factory=BKTree)
+    skipped_duplicates: List[Dict] = field(default_factory=list)
+
+
+def _text_layer_ocr(text: str) -> RawOcrResult:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return RawOcrResult(full_text="\n".join(lines), lines=lines, engine="pdf_text", language=OCR_LANGUAGE)
+
+
+async def _run_pipeline(
+    org_id: str,
+    batch_id: str,
+    storage_paths: List[Tuple[str, str]],
+    state: _BatchState,
+    pdf_policy: PdfPolicy,
+) -> None:
+    settings = get_settings()
+    bucket = get_supabase().storage.from_("receipts")
+    files: asyncio.Queue = asyncio.Queue()
+    for idx, (path, ext) in enumerate(storage_paths):
+        files.put_nowait((idx, path, ext))
+    images: asyncio.Queue = asyncio.Queue(maxsize=settings.batch_queue_depth)
+    results: asyncio.Queue = asyncio.Queue(maxsize=settings.batch_queue_depth)
+    batcher = new_structuring_batcher()
+    dup_index = get_duplicate_index()
+
+    async def check_duplicate(
+        content: bytes, file_index: int
+    ) -> Tuple[Optional[int], Optional[str], Optional[str], Optional[int]]:
+        """(phash, "skip" | "flag" | None, duplicate_of, distance) for an image; phash None if it could not be hashed."""
+        try:
+            phash = await run_ocr(image_phash, content)
+        except Exception as e:
+            logger.warning("Could not hash image", extra={"batch_id": batch_id, "index": file_index, "error": str(e)})
+            return None, None, None, None
+        limit = max(settings.duplicate_flag_distance, settings.duplicate_skip_distance)
+        try:
+            # Receipts of this batch are skipped: a failed earlier attempt may have saved them.
+            match = await dup_index.find(org_id, phash, limit, exclude_batch=batch_id)
+        except Exception as e:
+            # Index unavailable (e.g. migration 012 not applied): extract as usual.
+            logger.warning("Duplicate index lookup failed", extra={"org_id": org_id, "error": str(e)})
+            match = None
+        in_batch = state.batch_phashes.search(phash, limit)
+        state.batch_phashes.add(phash, None)
+        distance = min([d for d, _ in in_batch] + ([match.distance] if match else []), default=None)
+        duplicate_of = match.receipt_id if match else None
+        if distance is None:
+            return phash, None, None, None
+        if distance <= settings.duplicate_skip_distance:
+            logger.info(
+                "Skipping near-duplicate image",
+                extra={"org_id": org_id, "batch_id": batch_id, "index": file_index, "distance": distance,
+                       "duplicate_of": duplicate_of},
+            )
+            return phash, "skip", duplicate_of, distance
+        return phash, "flag" if distance <= settings.duplicate_flag_distance else None, duplicate_of, distance
+
+    async def emit(content: bytes, path: str, file_index: int, ocr: Optional[RawOcrResult] = None) -> None:
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in state.seen_hashes:
+            logger.info(
+                "Skipping duplicate image in batch",
+                extra={"org_id": org_id, "batch_id": batch_id, "index": file_index},
+            )
+            return
+        state.seen_hashes.add(digest)
+        phash = verdict = duplicate_of = None
+        if dup_index is not None and ocr is None:
+            phash, verdict, duplicate_of, distance = await check_duplicate(content, file_index)
+            if verdict == "skip":
+                state.skipped_duplicates.append(
+                    {"index": file_index, "duplicate_of": duplicate_of, "distance": distance}
+                )
+                return
+        state.unit_paths.append(path)
+        unit = len(state.unit_paths) - 1
+        if phash is not None:
+            state.phashes[unit] = (phash, verdict == "flag", duplicate_of)
+        await images.put((unit, content, digest, ocr))
+
+    async def download_stage() -> None:
+        while True:
+            try:
+                idx, path, ext = files.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                data = await run_sync(bucket.download, path)
+                if ext == ".pdf":
+                    async for page in iter_pdf_pages(data, pdf_policy):
+                        if page.kind == "text":
+                            await emit(page.text.encode("utf-8"), path, idx, ocr=_text_layer_ocr(page.text))
+                        else:
+                            await emit(page.image, path, idx)
+                else:
+                    await emit(data, path, idx)
+            except Exception as e:
+                logger.error(
+                    "Failed to download or process file from storage",
+                    extra={"org_id": org_id, "batch_id": batch_id, "index": idx, "error": str(e)},
+                )
+
+    async def extract_stage() -> None:
+        while True:
+            item = await images.get()
+            if item is _DONE:
+                return
+            unit, content, digest, ocr = item
+            try:
+                _, data = await extract_one(
+                    unit, content, org_id=org_id, image_hash=digest, batcher=batcher, ocr=ocr
+                )
+            except Exception as e:
+                logger.error("Extraction failed for index %s: %s", unit, str(e))
+                state.errors.append({"index": unit, "error": str(e)})
+                continue
+            await results.put((unit, data))
+
+    async def save(chunk: List[Tuple[int, Dict]]) -> None:
+        to_save = []
+        for unit, data in chunk:
+            rec = {
+                "image_url": bucket.get_public_url(state.unit_paths[unit]),
+                "data": data,
+                "needs_review": (data.get("confidence") or 0) < NEEDS_REVIEW_BELOW,
+            }
+            if dup_index is not None:
+                # Same keys on every row of a multi-row insert.
+                phash, flagged, duplicate_of = state.phashes.get(unit, (None, False, None))
+                rec["image_phash"] = to_hex(phash) if phash is not None else None
+                rec["duplicate_of"] = duplicate_of if flagged else None
+                rec["needs_review"] = rec["needs_review"] or flagged
+            to_save.append(rec)
+        try:
+            saved = await save_receipts_bulk(org_id, batch_id, to_save)
+        except Exception as e:
+            state.errors.extend({"index": unit, "error": f"Save failed: {e}"} for unit, _ in chunk)
+            return
+        state.saved += len(saved["saved"])
+        if dup_index is not None:
+            for ok in saved["saved"]:
+                phash = state.phashes.get(chunk[ok["index"]][0], (None,))[0]
+                if phash is not None:
+                    dup_index.add(org_id, phash, ok["receipt_id"])
+        state.errors.extend(
+            {"index": chunk[f["index"]][0], "error": f"Save failed: {f['error']}"} for f in saved["failed"]
+        )
+
+    async def persist_stage() -> None:
+        finished = False
+        while not finished:
+            item = await results.get()
+            if item is _DONE:
+                return
+            # Save what is ready now; pick up anything else already queued in the same insert.
+            chunk = [item]
+            while len(chunk) < SAVE_CHUNK_MAX and not results.empty():
+                nxt = results.get_nowait()
+                if nxt is _DONE:
+                    finished = True
+                    break
+                chunk.append(nxt)
+            await save(chunk)
+
+    downloaders = [asyncio.create_task(download_stage()) for _ in range(settings.batch_download_concurrency)]
+    extractors = [asyncio.create_task(extract_stage()) for _ in range(settings.batch_extract_concurrency)]
+    persister = asyncio.create_task(persist_stage())
+    try:
+        await asyncio.gather(*downloaders)
+        for _ in extractors:
+            await images.put(_DONE)
+        await asyncio.gather(*extractors)
+        await results.put(_DONE)
+        await persister
+    finally:
+        # Only has work to do if a stage failed unexpectedly (or we were cancelled).
+        for task in (*downloaders, *extractors, persister):
+            task.cancel()
+
 
 async def process_batch_bg(org_id: str, user_id: str, batch_id: str, storage_paths: List[Tuple[str, str]]) -> None:
     """Background task: download → dedupe → extract → store → notify. Supports images and PDF (pages as images)."""
     supabase = get_supabase()
-    bucket = supabase.storage.from_("receipts")
     logger.info(
         "Starting batch extraction",
         extra={"org_id": org_id, "batch_id": batch_id, "files": len(storage_paths)},
     )
-    path_tuples: List[Tuple[str, str]] = []
-    contents: List[Tuple[int, bytes]] = []
-    seen_hashes: set[str] = set()
-    for idx, (path, ext) in enumerate(storage_paths):
-        try:
-            data = bucket.download(path)
-            if ext == ".pdf":
-                images = pdf_to_images(data)
-                for img_bytes in images:
-                    digest = hashlib.sha256(img_bytes).hexdigest()
-                    if digest in seen_hashes:
-                        continue
-                    seen_hashes.add(digest)
-                    path_tuples.append((path, ext))
-                    contents.append((len(contents), img_bytes))
-            else:
-                digest = hashlib.sha256(data).hexdigest()
-                if digest in seen_hashes:
-                    logger.info(
-                        "Skipping duplicate image in batch",
-                        extra={"org_id": org_id, "batch_id": batch_id, "index": idx},
-                    )
-                    continue
-                seen_hashes.add(digest)
-                path_tuples.append((path, ext))
-                contents.append((len(contents), data))
-        except Exception as e:
-            logger.error(
-                "Failed to download or process file from storage",
-                extra={"org_id": org_id, "batch_id": batch_id, "index": idx, "error": str(e)},
-            )
-    if not contents:
+    await update_batch(batch_id, status="processing")
+    try:
+        plan = (await get_org(org_id)).get("plan")
+    except Exception:
+        plan = None
+    state = _BatchState()
+    # OCR/LLM slots are shared fairly across orgs, weighted by plan.
+    with org_context(org_id, plan):
+        await _run_pipeline(org_id, batch_id, storage_paths, state, pdf_policy_for_plan(plan))
+    duplicates = {}
+    if state.skipped_duplicates:
+        logger.info(
+            "Skipped near-duplicate images",
+            extra={"org_id": org_id, "batch_id": batch_id, "skipped": len(state.skipped_duplicates)},
+        )
+        # Needs migration 012_add_receipt_image_phash.sql (only written when skipping is enabled).
+        duplicates = {"skipped_duplicates": state.skipped_duplicates}
+    if not state.unit_paths and state.skipped_duplicates:
+        await update_batch(batch_id, status="done", processed=0, failed=0, **duplicates)
+        return
+    if not state.unit_paths:
         logger.error("No contents downloaded for batch", extra={"org_id": org_id, "batch_id": batch_id})
-        update_batch(batch_id, status="failed")
+        await update_batch(batch_id, status="failed")
         return
-    update_batch(batch_id, status="processing")
-    out = await extract_batch(contents, concurrency=8)
-    success = 0
-    for item in out["results"]:
-        idx = item["index"]
-        path, _ = path_tuples[idx]
-        url = bucket.get_public_url(path)
-        needs_review = (item["data"].get("confidence") or 0) < 0.85
-        save_receipt(org_id, batch_id, url, item["data"], needs_review)
-        success += 1
-    increment_usage(org_id, success)
-    status = "done" if not out["errors"] else "partial"
-    err_list = out["errors"]
+    success = state.saved
+    err_list = state.errors
+    if success:
+        await increment_usage(org_id, success)
+    status = "done" if not err_list else ("partial" if success else "failed")
     failure_reason = None
     if err_list:
         first_err = err_list[0].get("error") or "Extraction failed"
         failure_reason = sanitize_failure_reason(first_err)
         for err in err_list:
             idx = err.get("index")
-            path = path_tuples[idx][0] if idx < len(path_tuples) else "?"
+            path = state.unit_paths[idx] if idx < len(state.unit_paths) else "?"
             logger.error(
                 "Batch extraction failed for file: batch_id=%s index=%s path=%s error=%s",
                 batch_id, idx, path, err.get("error", ""),
             )
     # Add failure_reason to kwargs after running migration 009_add_batch_failure_reason.sql:
     # if failure_reason is not None: kwargs["failure_reason"] = failure_reason
-    kwargs = {"status": status, "processed": success, "failed": len(err_list)}
-    update_batch(batch_id, **kwargs)
+    kwargs = {"status": status, "processed": success, "failed": len(err_list), **duplicates}
+    await update_batch(batch_id, **kwargs)
     logger.info(
         "Finished batch extraction: batch_id=%s processed=%s failed=%s status=%s",
         batch_id, success, len(err_list), status,
@@ -102,17 +298,16 @@ async def process_batch_bg(org_id: str, user_id: str, batch_id: str, storage_pat
     if status != "done":
         return
     try:
-        prefs = supabase.table("user_preferences").select(
+        prefs = await execute(supabase.table("user_preferences").select(
             "processing_complete_alerts, email_notifications_enabled"
-        ).eq("user_id", user_id).execute()
+        ).eq("user_id", user_id))
         if prefs.data and len(prefs.data) > 0:
             p = prefs.data[0]
             if p.get("email_notifications_enabled") and p.get("processing_complete_alerts"):
-                profile = supabase.table("profiles").select("email").eq("id", user_id).execute()
+                profile = await execute(supabase.table("profiles").select("email").eq("id", user_id))
                 if profile.data and len(profile.data) > 0:
                     email = profile.data[0].get("email")
                     if email:
                         await send_processing_complete_email(email, batch_id)
     except Exception as e:  # pragma: no cover - best-effort notifications
         logger.warning("Failed to send completion email", extra={"error": str(e)})
-
@@ -3,7 +3,9 @@ import json
 from typing import Dict, List
 
 from app.services.mistral_client import chat_completion
+from app.services.org_quota import get_org
 from app.services.receipt_tools import run_tool
+from app.services.scheduler import org_context
 
 TOOLS: List[Dict] = [
     {
@@ -11,15 +13,32 @@ TOOLS: List[Dict] = [
         "function": {
             "name": "search_receipts",
             "description": "Search receipts by vendor, date range, category, or amount.",
-            "parameters": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Words in the vendor, category, notes or items"},
+                    "date_from": {"type": "string", "description": "YYYY-MM-DD"},
+                    "date_to": {"type": "string", "description": "YYYY-MM-DD"},
+                    "category": {"type": "string"},
+                    "min_total": {"type": "number"},
+                    "max_total": {"type": "number"},
+                },
+                "required": ["query"],
+            },
         },
     },
     {
         "type": "function",
         "function": {
             "name": "get_spending_summary",
-            "description": "Get summary: total spend, by category, by vendor.",
-            "parameters": {"type": "object", "properties": {}},
+            "description": "Get summary: total spend, by category, by vendor, by month.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "date_from": {"type": "string", "description": "YYYY-MM-DD"},
+                    "date_to": {"type": "string", "description": "YYYY-MM-DD"},
+                },
+            },
         },
     },
     {
@@ -54,8 +73,18 @@ async def run_agent(org_id: str, messages: list[dict], max_turns: int = 5) -> st
         "Use the tools to search, summarize, or list flagged receipts. Be concise."
     )
     history: List[Dict] = [{"role": "system", "content": system}] + messages
+    try:
+        plan = (await get_org(org_id)).get("plan")
+    except Exception:
+        plan = None
+    # LLM slots are shared fairly with batch extraction, weighted by plan.
+    with org_context(org_id, plan):
+        return await _converse(org_id, history, max_turns)
+
+
+async def _converse(org_id: str, history: List[Dict], max_turns: int) -> str:
     for _ in range(max_turns):
-        resp = chat_completion("mistral-large-latest", history, tools=TOOLS)
+        resp = await chat_completion("mistral-large-latest", history, tools=TOOLS)
         choice = resp["choices"][0]
         msg = choice["message"]
         if choice.get("finish_reason") == "stop":
@@ -67,7 +96,7 @@ async def run_agent(org_id: str, messages: list[dict], max_turns: int = 5) -> st
         for tc in tool_calls:
             name = tc["function"]["name"]
             args = json.loads(tc["function"].get("arguments") or "{}")
-            result = run_tool(org_id, name, args)
+            result = await run_tool(org_id, name, args)
             history.append(
                 {
                     "role": "tool",
@@ -0,0 +1,51 @@
+"""Non-blocking access to the sync Supabase client for async code.
+
+supabase-py's `.execute()` and storage calls do blocking HTTP. Running them
+on the event loop stalls every in-flight request, so async callers go
+through execute() / run_sync(), which use a bounded thread pool
+(DB_MAX_CONCURRENCY). Query builders themselves are cheap and stay inline:
+
+    r = await execute(get_supabase().table("receipts").select("id").eq("org_id", org_id))
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.config import get_settings
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().db_max_concurrency, thread_name_prefix="supabase-db"
+        )
+    return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking Supabase/storage call on the DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def execute(query: Any) -> Any:
+    """Await a PostgREST query builder's `.execute()` without blocking the loop."""
+    return await run_sync(query.execute)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+__all__ = ["execute", "run_sync", "shutdown_executor"]
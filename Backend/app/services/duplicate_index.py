@@ -0,0 +1,261 @@
+"""Per-org perceptual-hash index for spotting re-photographed / re-scanned receipts.
+
+image_phash() hashes the paper, not the photo: reduced-scale decode, crop the
+background, deskew, crop again, then a 256-bit pHash (sign of the 16x16
+lowest DCT coefficients of a 32x32 thumbnail against their median). Coarser
+64-bit hashes cannot tell two receipts printed from the same template apart;
+at 256 bits different receipts stay roughly 50+ bits apart while retakes of
+the same receipt land around 15-30.
+
+Hashes are stored on receipts (receipts.image_phash, hex) and loaded per org
+into an in-process BK-tree, so a lookup within Hamming distance d touches a
+small part of the org's history instead of every row. Trees are refreshed
+after DUPLICATE_INDEX_TTL_SECONDS so receipts saved by other workers show up.
+Trees can also hold receipts deleted since they were loaded (retried batches,
+soft deletes, account deletion, possibly by another process), so every hit is
+checked against the receipts table before it counts; a stale hit drops the
+org's tree so the next lookup reloads it.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.config import get_settings
+from app.ocr.preprocess import autocrop_box, estimate_skew
+from app.services.db import execute
+from app.services.supabase_client import get_supabase
+
+HASH_SIZE = 32  # thumbnail side
+HASH_COEFFS = 16  # low-frequency block side -> 256 bits
+MAX_ORGS = 1000
+LOAD_PAGE = 1000  # PostgREST default max rows per request
+
+_DCT = np.array(
+    [[np.cos(np.pi * (2 * n + 1) * k / (2 * HASH_SIZE)) for n in range(HASH_SIZE)] for k in range(HASH_SIZE)]
+)
+
+
+def _paper(img: Image.Image) -> Image.Image:
+    box = autocrop_box(img)
+    return img.crop(box) if box is not None else img
+
+
+def image_phash(content: bytes) -> int:
+    """256-bit perceptual hash of the receipt in an image. CPU-bound (~20-40 ms); run it on the OCR pool."""
+    img = Image.open(BytesIO(content))
+    img.draft("L", (512, 512))
+    gray = ImageOps.grayscale(ImageOps.exif_transpose(img))
+    paper = _paper(gray)
+    angle = estimate_skew(paper, max_degrees=5.0)
+    if angle:
+        # Rotate the whole photo, filling with its background, so the re-crop is tight.
+        corners = np.asarray(gray)[[0, -1]][:, [0, -1]]
+        paper = _paper(gray.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=int(np.median(corners))))
+    pixels = np.asarray(paper.resize((HASH_SIZE, HASH_SIZE), Image.BOX), dtype=np.float64)
+    coeffs = (_DCT @ pixels @ _DCT.T)[:HASH_COEFFS, :HASH_COEFFS].flatten()
+    bits = coeffs > np.median(coeffs[1:])
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_hex(phash: int) -> str:
+    return f"{phash:064x}"
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance; items are (hash, receipt_id)."""
+
+    def __init__(self) -> None:
+        self._root: Optional[Tuple[int, Optional[str], Dict[int, tuple]]] = None
+        self.size = 0
+
+    def add(self, phash: int, item: Optional[str]) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = (phash, item, {})
+            return
+        node = self._root
+        while True:
+            d = hamming(phash, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (phash, item, {})
+                return
+            node = child
+
+    def search(self, phash: int, max_distance: int) -> List[Tuple[int, Optional[str]]]:
+        """(distance, item) within max_distance, closest first."""
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node_hash, item, children = stack.pop()
+            d = hamming(phash, node_hash)
+            if d <= max_distance:
+                found.append((d, item))
+            # Triangle inequality: only subtrees at distance d±max can hold matches.
+            for edge, child in children.items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        return sorted(found, key=lambda f: f[0])
+
+
+@dataclass
+class DuplicateMatch:
+    receipt_id: Optional[str]  # None for an image earlier in the same batch
+    distance: int
+
+
+class DuplicateIndex:
+    """Lazily loaded per-org BK-trees of saved receipts' hashes."""
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._trees: "OrderedDict[str, Tuple[float, BKTree]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._guard = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+        self.stale_hits = 0
+        self.loads = 0
+
+    async def _load(self, org_id: str) -> BKTree:
+        tree = BKTree()
+        start = 0
+        while True:
+            r = await execute(
+                get_supabase().table("receipts").select("id, image_phash")
+                .eq("org_id", org_id).eq("is_deleted", False).not_.is_("image_phash", "null")
+                .order("created_at").range(start, start + LOAD_PAGE - 1)
+            )
+            for row in r.data or []:
+                tree.add(int(row["image_phash"], 16), row["id"])
+            if len(r.data or []) < LOAD_PAGE:
+                break
+            start += LOAD_PAGE
+        self.loads += 1
+        return tree
+
+    async def _tree(self, org_id: str) -> BKTree:
+        with self._guard:
+            cached = self._trees.get(org_id)
+            if cached is not None and time.monotonic() - cached[0] < self._ttl:
+                self._trees.move_to_end(org_id)
+                return cached[1]
+            lock = self._locks.setdefault(org_id, asyncio.Lock())
+        async with lock:
+            with self._guard:
+                cached = self._trees.get(org_id)
+                if cached is not None and time.monotonic() - cached[0] < self._ttl:
+                    return cached[1]
+            tree = await self._load(org_id)
+            with self._guard:
+                self._trees[org_id] = (time.monotonic(), tree)
+                self._trees.move_to_end(org_id)
+                while len(self._trees) > MAX_ORGS:
+                    evicted, _ = self._trees.popitem(last=False)
+                    self._locks.pop(evicted, None)
+            return tree
+
+    async def _saved(self, org_id: str, receipt_ids: List[str]) -> Dict[str, Optional[str]]:
+        """receipt id -> batch id for those of receipt_ids that are still saved and not deleted."""
+        r = await execute(
+            get_supabase().table("receipts").select("id, batch_id")
+            .eq("org_id", org_id).eq("is_deleted", False).in_("id", receipt_ids)
+        )
+        return {row["id"]: row.get("batch_id") for row in r.data or []}
+
+    async def find(
+        self, org_id: str, phash: int, max_distance: int, exclude_batch: Optional[str] = None
+    ) -> Optional[DuplicateMatch]:
+        """Closest live receipt of the org within max_distance, if any.
+
+        exclude_batch ignores receipts of that batch, e.g. ones a failed attempt saved before a retry.
+        """
+        self.lookups += 1
+        hits = (await self._tree(org_id)).search(phash, max_distance)
+        if not hits:
+            return None
+        ids = list({rid for _, rid in hits})
+        saved = await self._saved(org_id, ids)
+        if len(saved) < len(ids):
+            self.stale_hits += len(ids) - len(saved)
+            self.purge_org(org_id)
+        for distance, receipt_id in hits:
+            if receipt_id in saved and (exclude_batch is None or saved[receipt_id] != exclude_batch):
+                self.matches += 1
+                return DuplicateMatch(receipt_id=receipt_id, distance=distance)
+        return None
+
+    def add(self, org_id: str, phash: int, receipt_id: str) -> None:
+        """Record a newly saved receipt (only if the org's tree is loaded; otherwise the next load has it)."""
+        with self._guard:
+            cached = self._trees.get(org_id)
+        if cached is not None:
+            cached[1].add(phash, receipt_id)
+
+    def purge_org(self, org_id: str) -> None:
+        """Forget the org's tree (after receipts were deleted); the next lookup reloads it."""
+        with self._guard:
+            self._trees.pop(org_id, None)
+
+    def stats(self) -> dict:
+        with self._guard:
+            return {
+                "orgs_loaded": len(self._trees),
+                "hashes_loaded": sum(tree.size for _, tree in self._trees.values()),
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "stale_hits": self.stale_hits,
+                "loads": self.loads,
+            }
+
+
+_index: Optional[DuplicateIndex] = None
+
+
+def get_duplicate_index() -> Optional[DuplicateIndex]:
+    """Process-wide index, or None when DUPLICATE_DETECTION is off."""
+    global _index
+    settings = get_settings()
+    if not settings.duplicate_detection:
+        return None
+    if _index is None:
+        _index = DuplicateIndex(ttl_seconds=settings.duplicate_index_ttl_seconds)
+    return _index
+
+
+def forget_org_receipts(org_id: str) -> None:
+    """Call after deleting an org's receipts so this process stops matching them right away."""
+    if _index is not None:
+        _index.purge_org(org_id)
+
+
+def duplicate_index_stats() -> dict:
+    return _index.stats() if _index is not None else {"enabled": get_settings().duplicate_detection}
+
+
+__all__ = [
+    "BKTree",
+    "DuplicateIndex",
+    "DuplicateMatch",
+    "duplicate_index_stats",
+    "forget_org_receipts",
+    "get_duplicate_index",
+    "hamming",
+    "image_phash",
+    "to_hex",
+]
@@ -1,7 +1,7 @@
 """Email service using Supabase."""
 import logging
-import httpx
 from app.config import get_settings
+from app.services.http_clients import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +16,13 @@ async def send_processing_complete_email(user_email: str, batch_id: str) -> bool
             "subject": "Receipt processing complete",
             "html": f"<p>Your receipt batch {batch_id} has finished processing.</p>",
         }
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, json=payload, headers={
-                "Authorization": f"Bearer {settings.supabase_service_role_key}",
-            }, timeout=10.0)
-            if resp.status_code == 200:
-                return True
-            logger.warning("Email send failed", extra={"status": resp.status_code})
-            return False
+        resp = await get_http_client().post(url, json=payload, headers={
+            "Authorization": f"Bearer {settings.supabase_service_role_key}",
+        })
+        if resp.status_code == 200:
+            return True
+        logger.warning("Email send failed", extra={"status": resp.status_code})
+        return False
     except Exception as e:
         logger.error("Email send error", extra={"error": str(e)})
         return False
@@ -41,14 +40,13 @@ async def send_weekly_summary_email(user_email: str, summary_data: dict) -> bool
             "subject": "Your weekly receipt summary",
             "html": f"<p>This week you processed {receipt_count} receipts totaling ${total_spent:.2f}.</p>",
         }
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(url, json=payload, headers={
-                "Authorization": f"Bearer {settings.supabase_service_role_key}",
-            }, timeout=10.0)
-            if resp.status_code == 200:
-                return True
-            logger.warning("Email send failed", extra={"status": resp.status_code})
-            return False
+        resp = await get_http_client().post(url, json=payload, headers={
+            "Authorization": f"Bearer {settings.supabase_service_role_key}",
+        })
+        if resp.status_code == 200:
+            return True
+        logger.warning("Email send failed", extra={"status": resp.status_code})
+        return False
     except Exception as e:
         logger.error("Email send error", extra={"error": str(e)})
         return False
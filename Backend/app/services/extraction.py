@@ -1,31 +1,104 @@
-"""Receipt extraction pipeline: OCR engine + Mistral structuring."""
+"""Receipt extraction pipeline: OCR engine + rule-based or Mistral structuring."""
 import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from app.ocr.factory import get_ocr_engine
-from app.pipeline.structuring_llm_mistral import structure_with_mistral
+from app.config import get_settings
+from app.ocr.factory import get_ocr_engine, ocr_pipeline_id
+from app.models.receipt import ReceiptExtraction
+from app.ocr.base_engine import RawOcrResult
+from app.pipeline.structuring_llm_mistral import STRUCTURING_MODEL, structure_with_mistral
+from app.pipeline.structuring_batcher import StructuringBatcher
+from app.pipeline.structuring_rules import structure_with_rules
+from app.services.extraction_cache import CACHE_FORMAT_VERSION, CacheKey, CachedExtraction, get_extraction_cache
 
 logger = logging.getLogger(__name__)
 
+OCR_LANGUAGE = "eng"
 
-async def _extract_one(index: int, content: bytes) -> Tuple[int, Dict]:
-    engine = get_ocr_engine()
-    ocr = await engine.extract_text(content)
-    ext = await structure_with_mistral(ocr)
-    return index, ext.model_dump()
+
+def _cache_key(org_id: str, image_hash: str) -> CacheKey:
+    return CacheKey(
+        org_id=org_id,
+        image_hash=image_hash,
+        engine=get_settings().ocr_engine.lower(),
+        language=OCR_LANGUAGE,
+        model=f"{STRUCTURING_MODEL}:v{CACHE_FORMAT_VERSION}",
+        pipeline=ocr_pipeline_id(),
+    )
+
+
+def new_structuring_batcher() -> Optional[StructuringBatcher]:
+    """Batcher for one extraction batch, or None when STRUCTURING_BATCH_SIZE <= 1."""
+    settings = get_settings()
+    if settings.structuring_batch_size <= 1:
+        return None
+    return StructuringBatcher(
+        max_items=settings.structuring_batch_size,
+        token_budget=settings.structuring_batch_token_budget,
+        linger_seconds=settings.structuring_batch_linger_ms / 1000,
+    )
+
+
+async def structure(ocr: RawOcrResult, batcher: Optional[StructuringBatcher] = None) -> ReceiptExtraction:
+    """Rule-based fast path when it validates; otherwise Mistral (batched when a batcher is given)."""
+    settings = get_settings()
+    if settings.structuring_fast_path:
+        ext = structure_with_rules(ocr, settings.structuring_fast_path_min_confidence)
+        if ext is not None:
+            return ext
+    if batcher is not None:
+        return await batcher.structure(ocr)
+    return await structure_with_mistral(ocr)
+
+
+async def extract_one(
+    index: int,
+    content: bytes,
+    org_id: Optional[str] = None,
+    image_hash: Optional[str] = None,
+    batcher: Optional[StructuringBatcher] = None,
+    ocr: Optional[RawOcrResult] = None,
+) -> Tuple[int, Dict]:
+    """OCR + structure one image; returns (index, ReceiptExtraction dict).
+
+    With org_id, results are served from / stored in the org's extraction cache.
+    A precomputed ocr (e.g. a PDF text layer) skips the OCR engine.
+    """
+    cache = get_extraction_cache() if org_id else None
+    key = None
+    if cache is not None:
+        key = _cache_key(org_id, image_hash or hashlib.sha256(content).hexdigest())
+        try:
+            hit = await cache.get(key)
+        except Exception as e:
+            logger.warning("Extraction cache read failed", extra={"error": str(e)})
+            hit = None
+        if hit is not None:
+            return index, hit.extraction
+    if ocr is None:
+        ocr = await get_ocr_engine(OCR_LANGUAGE).extract_text(content)
+    data = (await structure(ocr, batcher)).model_dump(mode="json")
+    if key is not None:
+        try:
+            await cache.put(key, CachedExtraction(ocr=ocr, extraction=data))
+        except Exception as e:
+            logger.warning("Extraction cache write failed", extra={"error": str(e)})
+    return index, data
 
 
 async def extract_batch(image_contents: List[Tuple[int, bytes]], concurrency: int = 8) -> dict:
     """Process a batch of images using the hybrid OCR + Mistral pipeline."""
     sem = asyncio.Semaphore(concurrency)
+    batcher = new_structuring_batcher()
     results: List[Dict] = []
     errors: List[Dict] = []
 
     async def one(index: int, content: bytes) -> None:
         async with sem:
             try:
-                idx, data = await _extract_one(index, content)
+                idx, data = await extract_one(index, content, batcher=batcher)
                 results.append({"index": idx, "data": data})
             except Exception as e:
                 err_msg = str(e)
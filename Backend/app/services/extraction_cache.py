@@ -0,0 +1,208 @@
+"""Content-addressed cache of OCR + structuring results.
+
+Keyed by (org, image SHA-256, OCR engine, language, structuring model, OCR
+pipeline), so a receipt that is uploaded again, in a later batch or inside a
+re-submitted PDF, skips both OCR and the LLM call, while a change to
+preprocessing or OCR routing (app.ocr.factory.ocr_pipeline_id) misses. Entries
+never cross orgs. Stored in a local SQLite file (EXTRACTION_CACHE_PATH) and
+kept under EXTRACTION_CACHE_MAX_MB by evicting least recently used entries;
+triggers keep the total size in a one-row table, so a put does not re-sum
+the cache.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional
+
+from app.config import get_settings
+from app.ocr.base_engine import RawOcrResult
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored shape or the structuring prompt changes.
+CACHE_FORMAT_VERSION = 1
+# SQLite layout; a file with an older layout is dropped and recreated (it is only a cache).
+SCHEMA_VERSION = 2
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    org_id: str
+    image_hash: str
+    engine: str
+    language: str
+    model: str
+    pipeline: str
+
+
+@dataclass
+class CachedExtraction:
+    ocr: RawOcrResult
+    extraction: Dict
+
+
+class ExtractionCache:
+    """SQLite-backed LRU; safe across processes on one host."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self._path = path
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    self._create_schema(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS extraction_cache")
+        conn.execute("DROP TABLE IF EXISTS extraction_cache_size")
+        conn.execute(
+            """CREATE TABLE extraction_cache (
+                org_id TEXT NOT NULL,
+                image_hash TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                language TEXT NOT NULL,
+                model TEXT NOT NULL,
+                pipeline TEXT NOT NULL,
+                ocr_json TEXT NOT NULL,
+                extraction_json TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (org_id, image_hash, engine, language, model, pipeline)
+            )"""
+        )
+        conn.execute("CREATE INDEX idx_extraction_cache_lru ON extraction_cache(last_used)")
+        conn.execute("CREATE TABLE extraction_cache_size (id INTEGER PRIMARY KEY CHECK (id = 1), total INTEGER NOT NULL)")
+        conn.execute("INSERT INTO extraction_cache_size VALUES (1, 0)")
+        for name, event, delta in (
+            ("add", "INSERT", "NEW.size"),
+            ("remove", "DELETE", "-OLD.size"),
+            ("resize", "UPDATE OF size", "NEW.size - OLD.size"),
+        ):
+            conn.execute(
+                f"CREATE TRIGGER extraction_cache_{name} AFTER {event} ON extraction_cache"
+                f" BEGIN UPDATE extraction_cache_size SET total = total + {delta} WHERE id = 1; END"
+            )
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key_params(key: CacheKey) -> tuple:
+        return (key.org_id, key.image_hash, key.engine, key.language, key.model, key.pipeline)
+
+    def _get(self, key: CacheKey) -> Optional[CachedExtraction]:
+        where = "org_id = ? AND image_hash = ? AND engine = ? AND language = ? AND model = ? AND pipeline = ?"
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT ocr_json, extraction_json FROM extraction_cache WHERE {where}", self._key_params(key)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    f"UPDATE extraction_cache SET last_used = ? WHERE {where}", (time.time(), *self._key_params(key))
+                )
+        with self._lock:
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        return CachedExtraction(ocr=RawOcrResult(**json.loads(row[0])), extraction=json.loads(row[1]))
+
+    def _put(self, key: CacheKey, value: CachedExtraction) -> None:
+        ocr_json = json.dumps(asdict(value.ocr))
+        extraction_json = json.dumps(value.extraction, default=str)
+        size = len(ocr_json) + len(extraction_json)
+        with self._connection() as conn:
+            # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete does not fire triggers.
+            conn.execute(
+                "INSERT INTO extraction_cache"
+                " (org_id, image_hash, engine, language, model, pipeline, ocr_json, extraction_json, size, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (org_id, image_hash, engine, language, model, pipeline) DO UPDATE SET"
+                " ocr_json = excluded.ocr_json, extraction_json = excluded.extraction_json,"
+                " size = excluded.size, last_used = excluded.last_used",
+                (*self._key_params(key), ocr_json, extraction_json, size, time.time()),
+            )
+            total = conn.execute("SELECT total FROM extraction_cache_size WHERE id = 1").fetchone()[0]
+            if total > self._max_bytes:
+                self._evict(conn, total - self._max_bytes)
+
+    def _evict(self, conn: sqlite3.Connection, excess: int) -> None:
+        victims = []
+        for rowid, size in conn.execute("SELECT rowid, size FROM extraction_cache ORDER BY last_used"):
+            victims.append((rowid,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM extraction_cache WHERE rowid = ?", victims)
+        with self._lock:
+            self._evictions += len(victims)
+
+    def _purge_org(self, org_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM extraction_cache WHERE org_id = ?", (org_id,))
+
+    async def get(self, key: CacheKey) -> Optional[CachedExtraction]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: CacheKey, value: CachedExtraction) -> None:
+        await asyncio.to_thread(self._put, key, value)
+
+    async def purge_org(self, org_id: str) -> None:
+        """Drop every entry for an org (account deletion)."""
+        await asyncio.to_thread(self._purge_org, org_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "evictions": self._evictions}
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Configured cache, or None when EXTRACTION_CACHE_ENABLED is off."""
+    global _cache
+    settings = get_settings()
+    if not settings.extraction_cache_enabled:
+        return None
+    if _cache is None:
+        _cache = ExtractionCache(settings.extraction_cache_path, int(settings.extraction_cache_max_mb * 1024 * 1024))
+    return _cache
+
+
+def extraction_cache_stats() -> dict:
+    return _cache.stats() if _cache is not None else {}
+
+
+__all__ = [
+    "CACHE_FORMAT_VERSION",
+    "CacheKey",
+    "CachedExtraction",
+    "ExtractionCache",
+    "extraction_cache_stats",
+    "get_extraction_cache",
+]
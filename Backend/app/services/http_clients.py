@@ -0,0 +1,177 @@
+"""Shared, pooled outbound HTTP clients (Supabase Auth, edge functions, Mistral).
+
+One keep-alive pool per process instead of a new client (and TLS handshake)
+per call. Clients are created lazily and closed on app shutdown via
+close_clients(). HTTP/2 is used when the `h2` package is installed.
+pool_stats() reports in-flight requests against the pool limit.
+"""
+from __future__ import annotations
+
+import importlib.util
+import threading
+from typing import Dict, Optional
+
+import httpx
+from mistralai import Mistral
+
+from app.config import get_settings
+
+
+class _PoolCounter:
+    """In-flight / peak request counts for one pool."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.total = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.total += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def exit(self, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak,
+            "saturation": round(self.in_flight / self.limit, 4) if self.limit else 0.0,
+            "requests": self.total,
+            "errors": self.errors,
+        }
+
+
+class _CountingAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport, counter: _PoolCounter) -> None:
+        self._inner = inner
+        self._counter = counter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._counter.enter()
+        failed = True
+        try:
+            resp = await self._inner.handle_async_request(request)
+            failed = False
+            return resp
+        finally:
+            self._counter.exit(failed)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class _CountingTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport, counter: _PoolCounter) -> None:
+        self._inner = inner
+        self._counter = counter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._counter.enter()
+        failed = True
+        try:
+            resp = self._inner.handle_request(request)
+            failed = False
+            return resp
+        finally:
+            self._counter.exit(failed)
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+_http: Optional[httpx.AsyncClient] = None
+_mistral: Optional[Mistral] = None
+_mistral_sync_http: Optional[httpx.Client] = None
+_mistral_async_http: Optional[httpx.AsyncClient] = None
+_counters: Dict[str, _PoolCounter] = {}
+_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    return get_settings().http2_enabled and importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    s = get_settings()
+    return httpx.Limits(
+        max_connections=s.http_max_connections,
+        max_keepalive_connections=s.http_max_keepalive_connections,
+        keepalive_expiry=s.http_keepalive_expiry_seconds,
+    )
+
+
+def _timeout(read_seconds: float) -> httpx.Timeout:
+    s = get_settings()
+    return httpx.Timeout(read_seconds, connect=s.http_connect_timeout_seconds)
+
+
+def _async_client(name: str, read_seconds: float) -> httpx.AsyncClient:
+    limits = _limits()
+    counter = _counters.setdefault(name, _PoolCounter(limits.max_connections or 0))
+    inner = httpx.AsyncHTTPTransport(limits=limits, http2=_http2_available())
+    return httpx.AsyncClient(transport=_CountingAsyncTransport(inner, counter), timeout=_timeout(read_seconds))
+
+
+def _sync_client(name: str, read_seconds: float) -> httpx.Client:
+    limits = _limits()
+    counter = _counters.setdefault(name, _PoolCounter(limits.max_connections or 0))
+    inner = httpx.HTTPTransport(limits=limits, http2=_http2_available())
+    return httpx.Client(transport=_CountingTransport(inner, counter), timeout=_timeout(read_seconds))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared async client for Supabase Auth and edge functions."""
+    global _http
+    if _http is None or _http.is_closed:
+        with _lock:
+            if _http is None or _http.is_closed:
+                _http = _async_client("supabase", get_settings().http_timeout_seconds)
+    return _http
+
+
+def get_mistral_client() -> Mistral:
+    """Shared Mistral SDK client backed by pooled sync and async HTTP clients."""
+    global _mistral, _mistral_sync_http, _mistral_async_http
+    if _mistral is None:
+        with _lock:
+            if _mistral is None:
+                settings = get_settings()
+                if not settings.mistral_api_key:
+                    raise RuntimeError("MISTRAL_API_KEY is not configured")
+                _mistral_sync_http = _sync_client("mistral", settings.mistral_timeout_seconds)
+                _mistral_async_http = _async_client("mistral_async", settings.mistral_timeout_seconds)
+                _mistral = Mistral(
+                    api_key=settings.mistral_api_key,
+                    client=_mistral_sync_http,
+                    async_client=_mistral_async_http,
+                    timeout_ms=int(settings.mistral_timeout_seconds * 1000),
+                )
+    return _mistral
+
+
+def pool_stats() -> dict:
+    return {"http2": _http2_available(), "pools": {k: c.snapshot() for k, c in _counters.items()}}
+
+
+async def close_clients() -> None:
+    global _http, _mistral, _mistral_sync_http, _mistral_async_http
+    if _http is not None:
+        await _http.aclose()
+    if _mistral_async_http is not None:
+        await _mistral_async_http.aclose()
+    if _mistral_sync_http is not None:
+        _mistral_sync_http.close()
+    _http = _mistral = _mistral_sync_http = _mistral_async_http = None
+
+
+__all__ = ["get_http_client", "get_mistral_client", "pool_stats", "close_clients"]
@@ -0,0 +1,297 @@
+"""Durable queue for batch extraction jobs, consumed by `python -m app.worker`.
+
+Jobs are leased with a visibility timeout: a worker that dies without
+completing its job loses the lease and another worker picks it up. Failed
+jobs are retried with exponential backoff up to JOB_MAX_ATTEMPTS, then
+marked dead.
+
+Backends (JOB_QUEUE_BACKEND):
+- supabase: `extraction_jobs` table + lease RPC (migration 010); production.
+- sqlite: local file (JOB_QUEUE_SQLITE_PATH); single host, dev and tests.
+- inline: no queue; the API runs process_batch_bg in BackgroundTasks.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional, Protocol, Tuple
+
+from app.config import get_settings
+from app.services.db import execute
+from app.services.supabase_client import get_supabase
+
+
+@dataclass
+class ExtractionJob:
+    id: str
+    batch_id: str
+    org_id: str
+    user_id: str
+    storage_paths: List[Tuple[str, str]]
+    attempts: int
+    max_attempts: int
+
+
+class JobQueue(Protocol):
+    async def enqueue(self, batch_id: str, org_id: str, user_id: str, storage_paths: List[Tuple[str, str]]) -> str:
+        ...
+
+    async def lease(self, worker_id: str, visibility_timeout: float) -> Optional[ExtractionJob]:
+        """Claim the next runnable job (queued and due, or with an expired lease)."""
+        ...
+
+    async def heartbeat(self, job: ExtractionJob, worker_id: str, visibility_timeout: float) -> bool:
+        """Extend the lease; False if the job is no longer held by this worker."""
+        ...
+
+    async def complete(self, job: ExtractionJob, worker_id: str) -> bool:
+        """Mark the job done; False (and nothing changes) if this worker no longer holds it."""
+        ...
+
+    async def fail(self, job: ExtractionJob, worker_id: str, error: str) -> Optional[bool]:
+        """Record a failed attempt; True if the job will be retried, None if this worker no longer holds it."""
+        ...
+
+    async def stats(self) -> dict:
+        ...
+
+
+def retry_delay(attempts: int) -> float:
+    return get_settings().job_retry_backoff_seconds * (2 ** max(0, attempts - 1))
+
+
+def _paths(raw) -> List[Tuple[str, str]]:
+    data = json.loads(raw) if isinstance(raw, str) else raw
+    return [(p, e) for p, e in data]
+
+
+class SqliteJobQueue:
+    """File-backed queue; safe across processes on one host (BEGIN IMMEDIATE)."""
+
+    def __init__(self, path: str, max_attempts: int) -> None:
+        self._path = path
+        self._max_attempts = max_attempts
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS extraction_jobs (
+                    id TEXT PRIMARY KEY,
+                    batch_id TEXT NOT NULL,
+                    org_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    storage_paths TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL,
+                    lease_until REAL,
+                    worker_id TEXT,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_extraction_jobs_runnable ON extraction_jobs(status, available_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _enqueue(self, batch_id: str, org_id: str, user_id: str, storage_paths: List[Tuple[str, str]]) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO extraction_jobs (id, batch_id, org_id, user_id, storage_paths, max_attempts, available_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, batch_id, org_id, user_id, json.dumps(storage_paths), self._max_attempts, now, now),
+            )
+        return job_id
+
+    def _lease(self, worker_id: str, visibility_timeout: float) -> Optional[ExtractionJob]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM extraction_jobs"
+                " WHERE (status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_until < ?)"
+                " ORDER BY available_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job = conn.execute(
+                "UPDATE extraction_jobs SET status = 'leased', worker_id = ?, lease_until = ?, attempts = attempts + 1"
+                " WHERE id = ? RETURNING *",
+                (worker_id, now + visibility_timeout, row["id"]),
+            ).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return ExtractionJob(
+            id=job["id"], batch_id=job["batch_id"], org_id=job["org_id"], user_id=job["user_id"],
+            storage_paths=_paths(job["storage_paths"]), attempts=job["attempts"], max_attempts=job["max_attempts"],
+        )
+
+    def _update_held(self, job_id: str, worker_id: str, sql: str, params: tuple) -> bool:
+        with self._connection() as conn:
+            cur = conn.execute(
+                f"UPDATE extraction_jobs SET {sql} WHERE id = ? AND worker_id = ? AND status = 'leased'",
+                (*params, job_id, worker_id),
+            )
+            return cur.rowcount > 0
+
+    def _stats(self) -> dict:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM extraction_jobs GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    async def enqueue(self, batch_id: str, org_id: str, user_id: str, storage_paths: List[Tuple[str, str]]) -> str:
+        return await asyncio.to_thread(self._enqueue, batch_id, org_id, user_id, storage_paths)
+
+    async def lease(self, worker_id: str, visibility_timeout: float) -> Optional[ExtractionJob]:
+        return await asyncio.to_thread(self._lease, worker_id, visibility_timeout)
+
+    async def heartbeat(self, job: ExtractionJob, worker_id: str, visibility_timeout: float) -> bool:
+        return await asyncio.to_thread(
+            self._update_held, job.id, worker_id, "lease_until = ?", (time.time() + visibility_timeout,)
+        )
+
+    async def complete(self, job: ExtractionJob, worker_id: str) -> bool:
+        return await asyncio.to_thread(
+            self._update_held, job.id, worker_id, "status = 'done', lease_until = NULL", ()
+        )
+
+    async def fail(self, job: ExtractionJob, worker_id: str, error: str) -> Optional[bool]:
+        retry = job.attempts < job.max_attempts
+        if retry:
+            sql, params = (
+                "status = 'queued', lease_until = NULL, worker_id = NULL, available_at = ?, last_error = ?",
+                (time.time() + retry_delay(job.attempts), error[:500]),
+            )
+        else:
+            sql, params = "status = 'dead', lease_until = NULL, last_error = ?", (error[:500],)
+        # worker_id is cleared on retry, so match on the current holder first.
+        if not await asyncio.to_thread(self._update_held, job.id, worker_id, sql, params):
+            return None
+        return retry
+
+    async def stats(self) -> dict:
+        return await asyncio.to_thread(self._stats)
+
+
+class SupabaseJobQueue:
+    """Postgres-table queue; lease_extraction_job uses FOR UPDATE SKIP LOCKED."""
+
+    def __init__(self, max_attempts: int) -> None:
+        self._max_attempts = max_attempts
+
+    @staticmethod
+    def _table():
+        return get_supabase().table("extraction_jobs")
+
+    @staticmethod
+    def _at(seconds_from_now: float) -> str:
+        return (datetime.now(timezone.utc) + timedelta(seconds=seconds_from_now)).isoformat()
+
+    async def enqueue(self, batch_id: str, org_id: str, user_id: str, storage_paths: List[Tuple[str, str]]) -> str:
+        job_id = str(uuid.uuid4())
+        await execute(self._table().insert({
+            "id": job_id,
+            "batch_id": batch_id,
+            "org_id": org_id,
+            "user_id": user_id,
+            "storage_paths": [list(p) for p in storage_paths],
+            "max_attempts": self._max_attempts,
+        }))
+        return job_id
+
+    async def lease(self, worker_id: str, visibility_timeout: float) -> Optional[ExtractionJob]:
+        r = await execute(get_supabase().rpc(
+            "lease_extraction_job",
+            {"p_worker_id": worker_id, "p_visibility_seconds": int(visibility_timeout)},
+        ))
+        if not r.data:
+            return None
+        job = r.data[0]
+        return ExtractionJob(
+            id=job["id"], batch_id=job["batch_id"], org_id=job["org_id"], user_id=job["user_id"],
+            storage_paths=_paths(job["storage_paths"]), attempts=job["attempts"], max_attempts=job["max_attempts"],
+        )
+
+    async def _update_held(self, job: ExtractionJob, worker_id: str, fields: dict) -> bool:
+        fields["updated_at"] = self._at(0)
+        r = await execute(
+            self._table().update(fields).eq("id", job.id).eq("worker_id", worker_id).eq("status", "leased")
+        )
+        return bool(r.data)
+
+    async def heartbeat(self, job: ExtractionJob, worker_id: str, visibility_timeout: float) -> bool:
+        return await self._update_held(job, worker_id, {"lease_until": self._at(visibility_timeout)})
+
+    async def complete(self, job: ExtractionJob, worker_id: str) -> bool:
+        return await self._update_held(job, worker_id, {"status": "done", "lease_until": None})
+
+    async def fail(self, job: ExtractionJob, worker_id: str, error: str) -> Optional[bool]:
+        retry = job.attempts < job.max_attempts
+        if retry:
+            fields = {
+                "status": "queued", "lease_until": None, "worker_id": None,
+                "available_at": self._at(retry_delay(job.attempts)), "last_error": error[:500],
+            }
+        else:
+            fields = {"status": "dead", "lease_until": None, "last_error": error[:500]}
+        if not await self._update_held(job, worker_id, fields):
+            return None
+        return retry
+
+    async def stats(self) -> dict:
+        out = {}
+        for status in ("queued", "leased", "done", "dead"):
+            r = await execute(self._table().select("id", count="exact").eq("status", status).limit(1))
+            out[status] = r.count or 0
+        return out
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Configured queue, or None when JOB_QUEUE_BACKEND=inline."""
+    global _queue
+    if _queue is None:
+        settings = get_settings()
+        backend = settings.job_queue_backend.lower()
+        if backend == "inline":
+            return None
+        if backend == "sqlite":
+            _queue = SqliteJobQueue(settings.job_queue_sqlite_path, settings.job_max_attempts)
+        elif backend == "supabase":
+            _queue = SupabaseJobQueue(settings.job_max_attempts)
+        else:
+            raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {settings.job_queue_backend}")
+    return _queue
+
+
+__all__ = ["ExtractionJob", "JobQueue", "SqliteJobQueue", "SupabaseJobQueue", "get_job_queue", "retry_delay"]
@@ -0,0 +1,113 @@
+"""Local verification of Supabase access tokens (HS256 secret or RS256/ES256 JWKS).
+
+Avoids a round-trip to /auth/v1/user on every request. Callers fall back to
+the remote check when LocalVerificationUnavailable is raised.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+
+from app.config import get_settings
+from app.services.http_clients import get_http_client
+
+logger = logging.getLogger(__name__)
+
+AUDIENCE = "authenticated"
+ASYMMETRIC_ALGS = {"RS256", "ES256"}
+# Do not hammer the JWKS endpoint when a token carries an unknown kid.
+MIN_REFRESH_INTERVAL_S = 30.0
+
+
+class LocalVerificationUnavailable(Exception):
+    """Token could not be checked locally (unknown alg, JWKS unreachable)."""
+
+
+class JwksCache:
+    """In-process JWKS set that refreshes on TTL expiry or an unknown kid."""
+
+    def __init__(self, url: str, ttl_seconds: float) -> None:
+        self._url = url
+        self._ttl = ttl_seconds
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return bool(self._keys) and time.monotonic() - self._fetched_at < self._ttl
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            # Another coroutine may have refreshed while we waited on the lock.
+            if time.monotonic() - self._fetched_at < MIN_REFRESH_INTERVAL_S and self._keys:
+                return
+            settings = get_settings()
+            try:
+                resp = await get_http_client().get(
+                    self._url, headers={"apikey": settings.supabase_service_role_key}, timeout=5.0
+                )
+                resp.raise_for_status()
+                jwk_set = jwt.PyJWKSet.from_dict(resp.json())
+            except Exception as e:
+                logger.warning("Auth: JWKS refresh failed", extra={"error": type(e).__name__})
+                if not self._keys:
+                    raise LocalVerificationUnavailable("JWKS unavailable") from e
+                return
+            self._keys = {k.key_id: k for k in jwk_set.keys if k.key_id}
+            self._fetched_at = time.monotonic()
+
+    async def get_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        if not self._fresh():
+            await self._refresh()
+        key = self._keys.get(kid or "")
+        if key is None:
+            # Key rotation: refetch once (rate-limited) before giving up.
+            await self._refresh()
+            key = self._keys.get(kid or "")
+        if key is None:
+            raise LocalVerificationUnavailable(f"Unknown signing key: {kid}")
+        return key
+
+
+_jwks_cache: JwksCache | None = None
+
+
+def _get_jwks_cache() -> JwksCache:
+    global _jwks_cache
+    if _jwks_cache is None:
+        settings = get_settings()
+        url = f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json"
+        _jwks_cache = JwksCache(url, ttl_seconds=settings.auth_jwks_ttl_seconds)
+    return _jwks_cache
+
+
+async def verify_token_locally(token: str) -> Dict[str, Any]:
+    """Return verified claims.
+
+    Raises jwt.InvalidTokenError for bad/expired tokens and
+    LocalVerificationUnavailable when the token must be checked remotely.
+    """
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+    settings = get_settings()
+    if alg == "HS256":
+        key: Any = settings.supabase_jwt_secret
+    elif alg in ASYMMETRIC_ALGS:
+        key = (await _get_jwks_cache().get_key(header.get("kid"))).key
+    else:
+        raise LocalVerificationUnavailable(f"Unsupported alg: {alg}")
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[alg],
+        audience=AUDIENCE,
+        options={"require": ["exp", "sub"]},
+        leeway=settings.auth_clock_skew_seconds,
+    )
+
+
+__all__ = ["LocalVerificationUnavailable", "JwksCache", "verify_token_locally"]
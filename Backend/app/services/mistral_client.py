@@ -3,21 +3,14 @@ from __future__ import annotations
 
 from typing import List, Dict
 
-from mistralai import Mistral
+from app.services.http_clients import get_mistral_client
+from app.services.mistral_limiter import call_mistral
+from app.services.scheduler import MISTRAL_LLM
 
-from app.config import get_settings
 
-
-def _client() -> Mistral:
-    settings = get_settings()
-    if not settings.mistral_api_key:
-        raise RuntimeError("MISTRAL_API_KEY is not configured")
-    return Mistral(api_key=settings.mistral_api_key)
-
-
-def chat_completion(model: str, messages: List[Dict], tools: List[Dict] | None = None) -> dict:
-    """Synchronous chat completion wrapper (tools are optional)."""
-    client = _client()
+async def chat_completion(model: str, messages: List[Dict], tools: List[Dict] | None = None) -> dict:
+    """Async chat completion on the pooled client, under the shared Mistral rate limit (tools are optional)."""
+    client = get_mistral_client()
     kwargs = {
         "model": model,
         "messages": messages,
@@ -25,7 +18,7 @@ def chat_completion(model: str, messages: List[Dict], tools: List[Dict] | None =
     }
     if tools:
         kwargs["tools"] = tools
-    resp = client.chat.complete(**kwargs)
+    resp = await call_mistral(lambda: client.chat.complete_async(**kwargs), MISTRAL_LLM)
     return resp.model_dump() if hasattr(resp, "model_dump") else resp
 
 
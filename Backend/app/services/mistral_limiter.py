@@ -0,0 +1,176 @@
+"""Process-wide rate limiting and retry policy for Mistral API calls.
+
+Every structuring / vision call goes through call_mistral(), which:
+- holds a fair-share scheduler slot for the call's resource (vision or LLM);
+- takes a slot from a token bucket sized to our Mistral tier
+  (MISTRAL_REQUESTS_PER_SECOND, MISTRAL_BURST), so concurrent batches queue
+  instead of stampeding the API;
+- retries 429, 408, 5xx, timeouts/connection errors and invalid model output
+  with exponential backoff and full jitter (MISTRAL_BACKOFF_*);
+- honours Retry-After on 429/503 and pauses the whole bucket for that long,
+  so other callers back off too instead of failing together.
+Other 4xx errors (bad key, bad request) are raised immediately.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from app.config import get_settings
+from app.services.scheduler import scheduled
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Reservation-style token bucket; callers wait for their reserved slot."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.throttled = 0
+
+    def _reserve(self) -> float:
+        """Take one token (possibly going negative) and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = max(0.0, -self._tokens / self._rate) + max(0.0, self._paused_until - now)
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+
+    async def acquire(self) -> None:
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for `seconds` (server asked us to slow down)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.throttled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_second": self._rate,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+                "throttled": self.throttled,
+            }
+
+
+def _status_and_headers(exc: BaseException) -> tuple[Optional[int], Optional[httpx.Headers]]:
+    raw = getattr(exc, "raw_response", None)
+    status = getattr(exc, "status_code", None) or getattr(raw, "status_code", None)
+    return status, getattr(raw, "headers", None)
+
+
+def retry_after_seconds(headers: Optional[httpx.Headers]) -> Optional[float]:
+    """Parse Retry-After as seconds or an HTTP date."""
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    s = get_settings()
+    return random.uniform(0, min(s.mistral_backoff_max_seconds, s.mistral_backoff_base_seconds * (2 ** attempt)))
+
+
+def _is_retryable(status: Optional[int]) -> bool:
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # No HTTP status: network errors or output that failed to parse/validate.
+    return True
+
+
+_bucket: Optional[TokenBucket] = None
+_bucket_lock = threading.Lock()
+
+
+def get_mistral_bucket() -> TokenBucket:
+    global _bucket
+    if _bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                s = get_settings()
+                _bucket = TokenBucket(s.mistral_requests_per_second, s.mistral_burst)
+    return _bucket
+
+
+async def call_mistral(fn: Callable[[], Awaitable[T]], resource: str, max_retries: int = 3) -> T:
+    """Run an async Mistral call under the shared rate limit, retrying transient failures.
+
+    Each attempt first takes a fair-share slot of `resource` from the scheduler
+    (app.services.scheduler); backoff sleeps happen outside the slot.
+    """
+    bucket = get_mistral_bucket()
+    for attempt in range(max_retries):
+        async with scheduled(resource):
+            await bucket.acquire()
+            try:
+                return await fn()
+            except Exception as e:
+                status, headers = _status_and_headers(e)
+                if attempt == max_retries - 1 or not _is_retryable(status):
+                    raise
+                error_type = type(e).__name__
+        retry_after = retry_after_seconds(headers) if status in (429, 503) else None
+        if retry_after is not None:
+            # The next acquire() (ours and everyone else's) waits the pause out.
+            bucket.pause(retry_after)
+            delay = 0.0
+        else:
+            delay = backoff_delay(attempt)
+        logger.warning(
+            "Mistral call failed, retrying",
+            extra={"status": status, "attempt": attempt + 1, "delay_s": round(delay, 2), "error_type": error_type},
+        )
+        if delay:
+            await asyncio.sleep(delay)
+    raise RuntimeError("max_retries must be at least 1")
+
+
+def mistral_limiter_stats() -> dict:
+    return _bucket.stats() if _bucket is not None else {}
+
+
+__all__ = [
+    "TokenBucket",
+    "backoff_delay",
+    "call_mistral",
+    "get_mistral_bucket",
+    "mistral_limiter_stats",
+    "retry_after_seconds",
+]
@@ -1,40 +1,220 @@
-"""Org and monthly usage for quota enforcement. Uses Supabase service role."""
+"""Org and monthly usage for quota enforcement. Uses Supabase service role.
+
+user→org_id and org→plan lookups are cached (TTL + LRU) because auth, quota
+and several routes resolve them on every request. Writers that change a
+profile or organization must await invalidate_user / invalidate_org.
+Set CACHE_REDIS_URL to share the cache between uvicorn workers.
+"""
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import get_settings
+from app.services.db import execute
 from app.services.supabase_client import get_supabase
 
+logger = logging.getLogger(__name__)
 
-def get_org(org_id: str) -> dict:
-    r = get_supabase().table("organizations").select("id, plan").eq("id", org_id).execute()
-    if not r.data or len(r.data) == 0:
+
+class LocalTtlCache:
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self._ttl = ttl_seconds
+        self._max = max_entries
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self._ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisTtlCache:
+    """Shared cache so invalidations are seen by every worker. Needs the redis package (redis.asyncio).
+
+    Keys are also indexed in a sorted set by expiry time, so size() is a ZCOUNT rather than a keyspace scan.
+    """
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "vaultslip:orgcache:") -> None:
+        import redis.asyncio as redis  # optional dependency, only when CACHE_REDIS_URL is set
+
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = max(1, int(ttl_seconds))
+        self._prefix = prefix
+        self._index = prefix + "_keys"
+
+    async def get(self, key: str) -> Any:
+        raw = await self._redis.get(self._prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(self._prefix + key, json.dumps(value), ex=self._ttl)
+            pipe.zadd(self._index, {key: time.time() + self._ttl})
+            await pipe.execute()
+
+    async def delete(self, key: str) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.delete(self._prefix + key)
+            pipe.zrem(self._index, key)
+            await pipe.execute()
+
+    async def clear(self) -> None:
+        keys = await self._redis.zrange(self._index, 0, -1)
+        await self._redis.delete(self._index, *(self._prefix + k.decode() for k in keys))
+
+    async def size(self) -> int:
+        now = time.time()
+        await self._redis.zremrangebyscore(self._index, "-inf", now)
+        return await self._redis.zcard(self._index)
+
+
+_cache: LocalTtlCache | RedisTtlCache | None = None
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _get_cache() -> LocalTtlCache | RedisTtlCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        if settings.cache_redis_url:
+            _cache = RedisTtlCache(settings.cache_redis_url, settings.org_cache_ttl_seconds)
+        else:
+            _cache = LocalTtlCache(settings.org_cache_ttl_seconds, settings.org_cache_max_entries)
+    return _cache
+
+
+async def _resolve(result: Any) -> Any:
+    # LocalTtlCache answers directly; RedisTtlCache returns awaitables.
+    return await result if inspect.isawaitable(result) else result
+
+
+async def _cached(key: str, load: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+    cache = _get_cache()
+    try:
+        value = await _resolve(cache.get(key))
+    except Exception as e:  # shared backend down: degrade to the DB
+        logger.warning("Org cache read failed", extra={"error": type(e).__name__})
+        value = None
+    if value is not None:
+        _stats["hits"] += 1
+        return value
+    _stats["misses"] += 1
+    value = await load()
+    if value is not None:
+        try:
+            await _resolve(cache.set(key, value))
+        except Exception as e:
+            logger.warning("Org cache write failed", extra={"error": type(e).__name__})
+    return value
+
+
+async def _load_org(org_id: str) -> Optional[dict]:
+    r = await execute(get_supabase().table("organizations").select("id, plan").eq("id", org_id))
+    return r.data[0] if r.data else None
+
+
+async def _load_user_org_id(user_id: str) -> Optional[str]:
+    r = await execute(get_supabase().table("profiles").select("org_id").eq("id", user_id))
+    return str(r.data[0]["org_id"]) if r.data else None
+
+
+async def get_org(org_id: str) -> dict:
+    org = await _cached(f"org:{org_id}", lambda: _load_org(org_id))
+    if not org:
         raise ValueError("Org not found")
-    return r.data[0]
+    return org
+
+
+async def get_user_org_id(user_id: str) -> Optional[str]:
+    """org_id for a user's profile, or None if the profile does not exist."""
+    return await _cached(f"user:{user_id}", lambda: _load_user_org_id(user_id))
+
+
+async def invalidate_org(org_id: str) -> None:
+    _stats["invalidations"] += 1
+    await _resolve(_get_cache().delete(f"org:{org_id}"))
+
+
+async def invalidate_user(user_id: str) -> None:
+    _stats["invalidations"] += 1
+    await _resolve(_get_cache().delete(f"user:{user_id}"))
+
+
+async def cache_stats() -> dict:
+    total = _stats["hits"] + _stats["misses"]
+    cache = _get_cache()
+    try:
+        size: Optional[int] = await cache.size() if isinstance(cache, RedisTtlCache) else len(cache)
+    except Exception:
+        size = None
+    return {
+        **_stats,
+        "hit_ratio": round(_stats["hits"] / total, 4) if total else 0.0,
+        "size": size,
+        "backend": type(cache).__name__,
+    }
 
 
-def get_monthly_usage(org_id: str) -> int:
+async def get_monthly_usage(org_id: str) -> int:
     now = datetime.utcnow()
-    r = get_supabase().table("usage_tracking").select("receipts_processed").eq(
+    r = await execute(get_supabase().table("usage_tracking").select("receipts_processed").eq(
         "org_id", org_id
-    ).eq("year", now.year).eq("month", now.month).execute()
+    ).eq("year", now.year).eq("month", now.month))
     if not r.data or len(r.data) == 0:
         return 0
     return int(r.data[0].get("receipts_processed", 0) or 0)
 
 
-def increment_usage(org_id: str, count: int) -> None:
+async def increment_usage(org_id: str, count: int) -> None:
     now = datetime.utcnow()
     supabase = get_supabase()
-    r = supabase.table("usage_tracking").select("receipts_processed").eq(
+    r = await execute(supabase.table("usage_tracking").select("receipts_processed").eq(
         "org_id", org_id
-    ).eq("year", now.year).eq("month", now.month).execute()
+    ).eq("year", now.year).eq("month", now.month))
     if r.data and len(r.data) > 0:
         current = int(r.data[0].get("receipts_processed", 0) or 0)
-        supabase.table("usage_tracking").update({
+        await execute(supabase.table("usage_tracking").update({
             "receipts_processed": current + count
-        }).eq("org_id", org_id).eq("year", now.year).eq("month", now.month).execute()
+        }).eq("org_id", org_id).eq("year", now.year).eq("month", now.month))
     else:
-        supabase.table("usage_tracking").insert({
+        await execute(supabase.table("usage_tracking").insert({
             "org_id": org_id,
             "year": now.year,
             "month": now.month,
             "receipts_processed": count,
-        }).execute()
+        }))
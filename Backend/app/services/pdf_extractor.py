@@ -1,25 +1,135 @@
-"""Extract page images from PDF for receipt digitization pipeline."""
+"""Extract receipt pages from PDFs for the digitization pipeline.
+
+iter_pdf_pages() is an async generator: pages are rendered in chunks on the
+OCR executor (process pool) and yielded as each chunk finishes, so a long PDF
+neither blocks the event loop nor sits in memory as one list of images. The
+chunks rendered ahead of the consumer are capped so that no more than
+BATCH_QUEUE_DEPTH pages are held at once (the batch pipeline's own bound).
+
+Per page:
+- text layer (digital invoices, e-receipts): the text is extracted directly
+  and the page skips OCR entirely;
+- blank (no content, or a near-white scan): skipped;
+- otherwise rendered in grayscale at the org's DPI (PdfPolicy) and handed on
+  as a binary PGM, i.e. the raw 8-bit buffer behind a tiny header, which
+  Pillow reads without a PNG encode/decode round-trip.
+
+Pages beyond the policy's max_pages are not rendered.
+"""
 from __future__ import annotations
 
-import io
-from typing import List
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
 
 from PIL import Image
 import fitz  # pymupdf
 
+from app.config import get_settings
+from app.ocr.executor import ocr_worker_count, run_ocr
+from app.services.scheduler import OCR_CPU, scheduled
+
+logger = logging.getLogger(__name__)
+
+PLAN_PDF_DPI = {"pro": 200, "enterprise": 300}  # other plans use PDF_DPI
+CHUNK_PAGES = 4  # pages per executor call: amortises shipping the PDF to the worker
+TEXT_LAYER_MIN_CHARS = 32  # alphanumeric characters needed to trust a page's text layer
+BLANK_INK_RATIO = 0.001  # share of dark pixels below which a rendered page counts as blank
+
+
+@dataclass(frozen=True)
+class PdfPolicy:
+    dpi: int
+    max_pages: int
+
 
-def pdf_to_images(pdf_bytes: bytes) -> List[bytes]:
-    """Render each PDF page as PNG image bytes for OCR pipeline."""
-    out: List[bytes] = []
+@dataclass
+class PdfPage:
+    index: int
+    kind: str  # "text" | "image" | "blank"
+    text: str = ""
+    image: bytes = b""  # binary PGM (grayscale) when kind == "image"
+
+
+def pdf_policy_for_plan(plan: Optional[str]) -> PdfPolicy:
+    settings = get_settings()
+    return PdfPolicy(dpi=PLAN_PDF_DPI.get(plan or "free", settings.pdf_dpi), max_pages=settings.pdf_max_pages)
+
+
+def _page_count(pdf_bytes: bytes) -> int:
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     try:
-        for i in range(len(doc)):
-            page = doc.load_page(i)
-            pix = page.get_pixmap(dpi=150, alpha=False)
-            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
-            buf = io.BytesIO()
-            img.save(buf, "PNG")
-            out.append(buf.getvalue())
+        return len(doc)
     finally:
         doc.close()
-    return out
+
+
+def _is_blank_render(width: int, height: int, samples: bytes) -> bool:
+    img = Image.frombuffer("L", (width, height), samples, "raw", "L", 0, 1).reduce(4)
+    dark = sum(img.histogram()[:160])
+    return dark < BLANK_INK_RATIO * img.width * img.height
+
+
+def _render_page(page: "fitz.Page", index: int, dpi: int) -> PdfPage:
+    text = page.get_text("text")
+    if sum(c.isalnum() for c in text) >= TEXT_LAYER_MIN_CHARS:
+        return PdfPage(index=index, kind="text", text=text)
+    if not text.strip() and not page.get_images() and not page.get_drawings():
+        return PdfPage(index=index, kind="blank")
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    samples = pix.samples
+    if pix.stride != pix.width:
+        samples = b"".join(samples[r * pix.stride:r * pix.stride + pix.width] for r in range(pix.height))
+    if _is_blank_render(pix.width, pix.height, samples):
+        return PdfPage(index=index, kind="blank")
+    header = b"P5\n%d %d\n255\n" % (pix.width, pix.height)
+    return PdfPage(index=index, kind="image", image=header + samples)
+
+
+def _render_chunk(pdf_bytes: bytes, start: int, stop: int, dpi: int) -> List[PdfPage]:
+    """Classify and render pages [start, stop). Runs in the OCR executor (top-level, picklable)."""
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        return [_render_page(doc.load_page(i), i, dpi) for i in range(start, stop)]
+    finally:
+        doc.close()
+
+
+async def _render_scheduled(pdf_bytes: bytes, start: int, stop: int, dpi: int) -> List[PdfPage]:
+    async with scheduled(OCR_CPU):
+        return await run_ocr(_render_chunk, pdf_bytes, start, stop, dpi)
+
+
+async def iter_pdf_pages(pdf_bytes: bytes, policy: PdfPolicy) -> AsyncIterator[PdfPage]:
+    """Yield non-blank pages in order as they are rendered.
+
+    At most one chunk per OCR worker is in flight, and never more than BATCH_QUEUE_DEPTH pages.
+    """
+    total = await asyncio.to_thread(_page_count, pdf_bytes)
+    pages = min(total, policy.max_pages)
+    if total > pages:
+        logger.warning("PDF has %s pages; processing the first %s", total, pages)
+    window = max(1, min(ocr_worker_count(), get_settings().batch_queue_depth // CHUNK_PAGES))
+    pending: List[asyncio.Task] = []
+    next_start = 0
+    blank = 0
+    try:
+        while next_start < pages or pending:
+            while next_start < pages and len(pending) < window:
+                stop = min(next_start + CHUNK_PAGES, pages)
+                pending.append(asyncio.create_task(_render_scheduled(pdf_bytes, next_start, stop, policy.dpi)))
+                next_start = stop
+            for page in await pending.pop(0):
+                if page.kind == "blank":
+                    blank += 1
+                else:
+                    yield page
+    finally:
+        for task in pending:
+            task.cancel()
+    if blank:
+        logger.info("Skipped %s blank PDF pages", blank)
+
+
+__all__ = ["PdfPage", "PdfPolicy", "iter_pdf_pages", "pdf_policy_for_plan"]
@@ -0,0 +1,124 @@
+"""Receipt export (GET /receipts/export): CSV or XLSX, optionally one row per line item.
+
+Receipts are read in keyset chunks (app.services.receipt_query), newest first, so
+memory stays flat however many receipts an org has:
+- CSV is streamed: bytes are yielded as each chunk is formatted.
+- XLSX is spooled, not streamed: openpyxl's write-only mode writes rows to a temp
+  file (in a worker thread), and nothing is sent until the whole workbook (a zip,
+  whose index comes last) has been saved to disk; that file is then sent in chunks.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from typing import Any, AsyncIterator, Dict, List
+
+from openpyxl import Workbook
+
+from app.services.db import execute
+from app.services.receipt_query import ReceiptFilters, apply_filters, apply_keyset
+from app.services.supabase_client import get_supabase
+
+RECEIPT_COLUMNS = ["id", "vendor", "date", "total", "tax", "currency", "category", "confidence", "needs_review", "created_at"]
+ITEM_COLUMNS = ["item_description", "item_quantity", "item_unit_price", "item_subtotal"]
+CHUNK_SIZE = 1000  # PostgREST's default max rows per request
+ITEMS_CHUNK_SIZE = 200  # receipt ids per items query (keeps the in.(...) URL short)
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+def export_columns(include_items: bool) -> List[str]:
+    return RECEIPT_COLUMNS + ITEM_COLUMNS if include_items else list(RECEIPT_COLUMNS)
+
+
+async def _items_by_receipt(receipt_ids: List[str]) -> Dict[str, List[Dict]]:
+    by_receipt: Dict[str, List[Dict]] = {}
+    start = 0
+    while True:
+        r = await execute(
+            get_supabase().table("receipt_items").select("receipt_id, description, quantity, unit_price, subtotal")
+            .in_("receipt_id", receipt_ids).order("receipt_id").order("id").range(start, start + CHUNK_SIZE - 1)
+        )
+        rows = r.data or []
+        for item in rows:
+            by_receipt.setdefault(item["receipt_id"], []).append(item)
+        if len(rows) < CHUNK_SIZE:
+            return by_receipt
+        start += CHUNK_SIZE
+
+
+async def iter_export_rows(
+    org_id: str, filters: ReceiptFilters, include_items: bool = False
+) -> AsyncIterator[List[List[Any]]]:
+    """Chunks of export rows (lists in export_columns order), newest receipt first."""
+    chunk_size = ITEMS_CHUNK_SIZE if include_items else CHUNK_SIZE
+    after = None
+    while True:
+        query = get_supabase().table("receipts").select(", ".join(RECEIPT_COLUMNS)).eq("org_id", org_id).eq(
+            "is_deleted", False
+        )
+        query = apply_keyset(apply_filters(query, filters), "created_at", True, after)
+        r = await execute(query.limit(chunk_size))
+        receipts = r.data or []
+        if not receipts:
+            return
+        items = await _items_by_receipt([x["id"] for x in receipts]) if include_items else {}
+        out: List[List[Any]] = []
+        for x in receipts:
+            base = [x.get(c) for c in RECEIPT_COLUMNS]
+            if not include_items:
+                out.append(base)
+                continue
+            for it in items.get(x["id"]) or [{}]:
+                out.append(base + [it.get("description"), it.get("quantity"), it.get("unit_price"), it.get("subtotal")])
+        yield out
+        if len(receipts) < chunk_size:
+            return
+        after = (receipts[-1]["created_at"], receipts[-1]["id"])
+
+
+async def stream_csv(org_id: str, filters: ReceiptFilters, include_items: bool = False) -> AsyncIterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(export_columns(include_items))
+    yield buf.getvalue().encode("utf-8")
+    async for rows in iter_export_rows(org_id, filters, include_items):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+
+
+def _cell(value: Any) -> Any:
+    # PostgREST returns numerics as numbers and dates/timestamps as ISO strings; keep them as-is.
+    return "" if value is None else value
+
+
+def _append_rows(ws: Any, rows: List[List[Any]]) -> None:
+    for row in rows:
+        ws.append([_cell(v) for v in row])
+
+
+async def stream_xlsx(org_id: str, filters: ReceiptFilters, include_items: bool = False) -> AsyncIterator[bytes]:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Receipts")
+    ws.append(export_columns(include_items))
+    async for rows in iter_export_rows(org_id, filters, include_items):
+        await asyncio.to_thread(_append_rows, ws, rows)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(wb.save, path)
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, FILE_CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+    finally:
+        os.unlink(path)
+
+
+__all__ = ["export_columns", "iter_export_rows", "stream_csv", "stream_xlsx"]
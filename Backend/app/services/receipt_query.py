@@ -0,0 +1,94 @@
+"""Filters and keyset paging over receipts (GET /receipts, export).
+
+Pages are ordered by (sort column, id) and continue from the last row seen, so
+every page costs the same however deep it is (indexes in migration 016).
+Descending sorts put rows without a value last, ascending ones first, which is
+exactly the reverse order and lets one index serve both directions.
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.receipt_search import like_literal
+from app.utils.cursor import decode_cursor, encode_cursor
+
+SORT_COLUMNS = ("created_at", "date", "total")
+
+
+@dataclass(frozen=True)
+class ReceiptFilters:
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    category: Optional[str] = None
+    vendor: Optional[str] = None  # substring, case-insensitive
+    min_total: Optional[float] = None
+    max_total: Optional[float] = None
+    needs_review: Optional[bool] = None
+
+
+def apply_filters(query, filters: ReceiptFilters):
+    if filters.date_from:
+        query = query.gte("date", filters.date_from)
+    if filters.date_to:
+        query = query.lte("date", filters.date_to)
+    if filters.category:
+        query = query.ilike("category", like_literal(filters.category))
+    if filters.vendor:
+        query = query.ilike("vendor", f"%{like_literal(filters.vendor)}%")
+    if filters.min_total is not None:
+        query = query.gte("total", filters.min_total)
+    if filters.max_total is not None:
+        query = query.lte("total", filters.max_total)
+    if filters.needs_review is not None:
+        query = query.eq("needs_review", filters.needs_review)
+    return query
+
+
+def _quoted(value: Any) -> str:
+    # Double quotes keep ':' / ',' / '.' in timestamps and decimals intact inside or=(...).
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def apply_keyset(query, sort: str, descending: bool, after: Optional[Tuple[Any, str]] = None):
+    """Order by (sort, id) and, given the previous page's last (value, id), continue after it."""
+    if after is not None:
+        value, last_id = after
+        op = "lt" if descending else "gt"
+        if value is None:
+            # Nulls come last when descending (only more nulls follow) and first when ascending.
+            branches = [f"and({sort}.is.null,id.{op}.{last_id})"]
+            if not descending:
+                branches.insert(0, f"{sort}.not.is.null")
+        else:
+            branches = [f"{sort}.{op}.{_quoted(value)}", f"and({sort}.eq.{_quoted(value)},id.{op}.{last_id})"]
+            if descending:
+                branches.append(f"{sort}.is.null")
+        query = query.or_(",".join(branches))
+    return query.order(sort, desc=descending, nullsfirst=not descending).order("id", desc=descending)
+
+
+def page_cursor(row: Dict[str, Any], sort: str, descending: bool) -> str:
+    return encode_cursor({"k": sort, "d": descending, "v": row.get(sort), "id": row["id"]})
+
+
+def parse_cursor(token: str, sort: str, descending: bool) -> Tuple[Any, str]:
+    """(value, id) from page_cursor; ValueError if malformed or made for another sort order."""
+    values = decode_cursor(token)
+    try:
+        if values["k"] != sort or values["d"] != descending:
+            raise ValueError("Cursor belongs to a different sort order")
+        return values["v"], str(uuid.UUID(values["id"]))
+    except (KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+__all__ = [
+    "ReceiptFilters",
+    "SORT_COLUMNS",
+    "apply_filters",
+    "apply_keyset",
+    "page_cursor",
+    "parse_cursor",
+]
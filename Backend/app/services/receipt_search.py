@@ -0,0 +1,61 @@
+"""Ranked receipt search (search_receipts_ranked, migration 015), shared by GET /receipts/search and the chat agent.
+
+Full-text over vendor, category, notes and line-item descriptions (last word matched as a prefix),
+plus trigram similarity on vendor so "starbuks" still finds Starbucks. Pages are keyset-based on
+(score, id) and handed out as opaque cursors.
+"""
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict, Optional
+
+from app.services.db import execute
+from app.services.supabase_client import get_supabase
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+def like_literal(text: str) -> str:
+    """Escape LIKE wildcards so user text matches literally."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_ranked(
+    org_id: str,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    category: Optional[str] = None,
+    min_total: Optional[float] = None,
+    max_total: Optional[float] = None,
+) -> Dict[str, Any]:
+    """{"items": [...], "next_cursor": str | None}; ValueError for a malformed cursor."""
+    after_score = after_id = None
+    if cursor:
+        values = decode_cursor(cursor)
+        try:
+            after_score, after_id = float(values["s"]), str(uuid.UUID(values["id"]))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
+    r = await execute(get_supabase().rpc("search_receipts_ranked", {
+        "p_org_id": org_id,
+        "p_query": query,
+        "p_limit": limit,
+        "p_after_score": after_score,
+        "p_after_id": after_id,
+        "p_date_from": date_from,
+        "p_date_to": date_to,
+        "p_category": like_literal(category) if category else None,
+        "p_min_total": min_total,
+        "p_max_total": max_total,
+    }))
+    items = r.data or []
+    next_cursor = None
+    if len(items) == limit:
+        last = items[-1]
+        next_cursor = encode_cursor({"s": last["score"], "id": last["id"]})
+    return {"items": items, "next_cursor": next_cursor}
+
+
+__all__ = ["like_literal", "search_ranked"]
@@ -1,28 +1,64 @@
-"""Save receipts and items to Supabase; create/update batches; increment usage."""
+"""Save receipts and items to Supabase; create/update batches; increment usage.
+
+save_receipts_bulk writes many receipts and their items in a few multi-row
+inserts. A chunk that fails is retried row by row so one bad receipt is
+reported instead of aborting the rest of the batch.
+"""
+import logging
 import uuid
+from typing import Dict, List, Optional, TypedDict
+
+from app.services.db import execute
+from app.services.duplicate_index import forget_org_receipts
 from app.services.supabase_client import get_supabase
 from app.services.org_quota import increment_usage
 
+logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 500
+
+
+class ReceiptInput(TypedDict, total=False):
+    """One receipt for save_receipts_bulk. image_url is "" for imports."""
+
+    image_url: str
+    data: dict
+    needs_review: bool
+    confidence: Optional[float]
+    image_phash: Optional[str]  # with duplicate_of: only sent when present (migration 012)
+    duplicate_of: Optional[str]
 
-def create_batch(org_id: str, user_id: str, batch_id: str, total_files: int) -> None:
-    get_supabase().table("batches").insert({
+
+class BulkSaveResult(TypedDict):
+    saved: List[Dict]  # {"index": i, "receipt_id": id}
+    failed: List[Dict]  # {"index": i, "error": msg}
+
+
+async def create_batch(org_id: str, user_id: str, batch_id: str, total_files: int, status: str = "pending") -> None:
+    await execute(get_supabase().table("batches").insert({
         "id": batch_id,
         "org_id": org_id,
         "user_id": user_id,
-        "status": "pending",
+        "status": status,
         "total_files": total_files,
-    }).execute()
+    }))
 
 
-def update_batch(batch_id: str, **kwargs) -> None:
-    get_supabase().table("batches").update(kwargs).eq("id", batch_id).execute()
+async def update_batch(batch_id: str, **kwargs) -> None:
+    await execute(get_supabase().table("batches").update(kwargs).eq("id", batch_id))
 
 
-def save_receipt(org_id: str, batch_id: str, image_url: str, data: dict, needs_review: bool) -> str:
-    supabase = get_supabase()
-    receipt_id = str(uuid.uuid4())
-    items = data.get("items", [])
-    supabase.table("receipts").insert({
+async def discard_batch_receipts(org_id: str, batch_id: str) -> None:
+    """Remove receipts saved by an earlier, failed attempt at a batch (items cascade)."""
+    await execute(get_supabase().table("receipts").delete().eq("batch_id", batch_id))
+    forget_org_receipts(org_id)
+
+
+def _receipt_row(
+    receipt_id: str, org_id: str, batch_id: str, image_url: str, data: dict,
+    needs_review: bool, confidence: Optional[float],
+) -> dict:
+    return {
         "id": receipt_id,
         "org_id": org_id,
         "batch_id": batch_id,
@@ -32,29 +68,30 @@ def save_receipt(org_id: str, batch_id: str, image_url: str, data: dict, needs_r
         "date": data.get("date"),
         "total": data.get("total"),
         "tax": data.get("tax"),
-        "currency": data.get("currency", "USD"),
+        "currency": data.get("currency") or "USD",
         "category": data.get("category"),
-        "confidence": data.get("confidence"),
+        "confidence": confidence,
         "needs_review": needs_review,
         "is_deleted": False,
-    }).execute()
-    for it in items:
-        supabase.table("receipt_items").insert({
+    }
+
+
+def _item_rows(receipt_id: str, items: List[dict]) -> List[dict]:
+    return [
+        {
             "receipt_id": receipt_id,
             "description": it.get("description", ""),
             "quantity": it.get("quantity"),
             "unit_price": it.get("unit_price"),
             "subtotal": it.get("subtotal"),
             "confidence": it.get("confidence"),
-        }).execute()
-    return receipt_id
+        }
+        for it in items
+    ]
 
 
-def save_receipt_from_import(org_id: str, batch_id: str, row: dict) -> str:
-    """Save one receipt from bulk import (CSV/XLSX); no image, no OCR."""
-    supabase = get_supabase()
-    receipt_id = str(uuid.uuid4())
-    data = {
+def _import_data(row: dict) -> dict:
+    return {
         "vendor": row.get("vendor"),
         "date": row.get("date"),
         "total": row.get("total"),
@@ -63,28 +100,74 @@ def save_receipt_from_import(org_id: str, batch_id: str, row: dict) -> str:
         "category": row.get("category"),
         "items": row.get("items", []),
     }
-    supabase.table("receipts").insert({
-        "id": receipt_id,
-        "org_id": org_id,
-        "batch_id": batch_id,
-        "image_url": "",
-        "raw_json": data,
-        "vendor": data["vendor"],
-        "date": data["date"],
-        "total": data["total"],
-        "tax": data.get("tax"),
-        "currency": data["currency"],
-        "category": data["category"],
-        "confidence": 1.0,
-        "needs_review": False,
-        "is_deleted": False,
-    }).execute()
-    for it in data.get("items", []):
-        supabase.table("receipt_items").insert({
-            "receipt_id": receipt_id,
-            "description": it.get("description", ""),
-            "quantity": it.get("quantity"),
-            "unit_price": it.get("unit_price"),
-            "subtotal": it.get("subtotal"),
-        }).execute()
-    return receipt_id
+
+
+async def _insert_rows(table: str, rows: List[dict]) -> None:
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        await execute(get_supabase().table(table).insert(rows[start:start + BULK_CHUNK_SIZE]))
+
+
+async def _insert_receipts_chunk(chunk: List[tuple[int, dict, List[dict]]], result: BulkSaveResult) -> None:
+    """Insert one chunk of (index, receipt_row, item_rows); isolate failures per receipt."""
+    supabase = get_supabase()
+    try:
+        await execute(supabase.table("receipts").insert([row for _, row, _ in chunk]))
+        await _insert_rows("receipt_items", [it for _, _, items in chunk for it in items])
+        result["saved"].extend({"index": i, "receipt_id": row["id"]} for i, row, _ in chunk)
+        return
+    except Exception as e:
+        if len(chunk) == 1:
+            i, row, _ = chunk[0]
+            await _discard_receipts([row["id"]])
+            result["failed"].append({"index": i, "error": str(e)})
+            return
+        logger.warning("Bulk receipt insert failed, retrying row by row", extra={"rows": len(chunk), "error": str(e)})
+        # Items may have failed after the receipts landed; start clean before retrying.
+        await _discard_receipts([row["id"] for _, row, _ in chunk])
+    for entry in chunk:
+        await _insert_receipts_chunk([entry], result)
+
+
+async def _discard_receipts(receipt_ids: List[str]) -> None:
+    try:
+        await execute(get_supabase().table("receipts").delete().in_("id", receipt_ids))
+    except Exception as e:
+        logger.error("Failed to discard partially saved receipts", extra={"error": str(e)})
+
+
+async def save_receipts_bulk(org_id: str, batch_id: str, receipts: List[ReceiptInput]) -> BulkSaveResult:
+    """Persist many receipts (+ items) in multi-row inserts; returns per-index outcome."""
+    result: BulkSaveResult = {"saved": [], "failed": []}
+    prepared: List[tuple[int, dict, List[dict]]] = []
+    for i, rec in enumerate(receipts):
+        data = rec.get("data") or {}
+        receipt_id = str(uuid.uuid4())
+        confidence = rec["confidence"] if "confidence" in rec else data.get("confidence")
+        row = _receipt_row(
+            receipt_id, org_id, batch_id, rec.get("image_url", ""), data,
+            bool(rec.get("needs_review", False)), confidence,
+        )
+        row.update({k: rec[k] for k in ("image_phash", "duplicate_of") if k in rec})
+        prepared.append((i, row, _item_rows(receipt_id, data.get("items") or [])))
+    for start in range(0, len(prepared), BULK_CHUNK_SIZE):
+        await _insert_receipts_chunk(prepared[start:start + BULK_CHUNK_SIZE], result)
+    if result["failed"]:
+        logger.error(
+            "Some receipts failed to save",
+            extra={"org_id": org_id, "batch_id": batch_id, "failed": len(result["failed"])},
+        )
+    return result
+
+
+async def rebuild_spend_rollups(org_id: Optional[str] = None) -> int:
+    """Recompute receipt_spend_rollups from receipts (one org or all); returns the number of rollup rows.
+
+    Normal writes keep rollups current through a trigger (migration 014); this is for backfill and repair.
+    """
+    r = await execute(get_supabase().rpc("rebuild_receipt_spend_rollups", {"p_org_id": org_id}))
+    return int(r.data or 0)
+
+
+def import_inputs(rows: List[dict]) -> List[ReceiptInput]:
+    """Map parsed CSV/XLSX rows to save_receipts_bulk inputs."""
+    return [{"image_url": "", "data": _import_data(r), "needs_review": False, "confidence": 1.0} for r in rows]
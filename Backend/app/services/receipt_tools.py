@@ -2,8 +2,12 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List
+import math
+from datetime import date
+from typing import Any, Dict
 
+from app.services.db import execute
+from app.services.receipt_search import like_literal, search_ranked
 from app.services.supabase_client import get_supabase
 
 
@@ -11,57 +15,74 @@ def _table():
     return get_supabase().table("receipts")
 
 
-def search_receipts(org_id: str, query: str) -> str:
-    q = (query or "").lower()
-    r = (
-        _table()
-        .select("id, vendor, date, total, category")
-        .eq("org_id", org_id)
-        .eq("is_deleted", False)
-        .execute()
-    )
+async def search_receipts(
+    org_id: str,
+    query: str,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    category: str | None = None,
+    min_total: float | None = None,
+    max_total: float | None = None,
+) -> str:
+    """Ranked text search (app.services.receipt_search) or, without a query, filters only; at most 50 rows."""
+    if (query or "").strip():
+        found = await search_ranked(
+            org_id, query.strip(), limit=50, date_from=date_from, date_to=date_to,
+            category=category, min_total=min_total, max_total=max_total,
+        )
+        rows = found["items"]
+        return json.dumps(rows) if rows else "No receipts matched."
+    r = await execute(get_supabase().rpc("search_receipts_filtered", {
+        "p_org_id": org_id,
+        "p_query": None,
+        "p_date_from": date_from,
+        "p_date_to": date_to,
+        "p_category": like_literal(category) if category else None,
+        "p_min_total": min_total,
+        "p_max_total": max_total,
+        "p_limit": 50,
+    }))
     rows = r.data or []
-    if q:
-        rows = [
-            x
-            for x in rows
-            if q in (x.get("vendor") or "").lower() or q in (x.get("category") or "").lower()
-        ]
-    return json.dumps(rows[:50]) if rows else "No receipts matched."
-
-
-def get_spending_summary(org_id: str) -> str:
-    r = (
-        _table()
-        .select("category, total")
-        .eq("org_id", org_id)
-        .eq("is_deleted", False)
-        .execute()
-    )
-    rows = r.data or []
-    by_cat: Dict[str, float] = {}
-    total = 0.0
-    for x in rows:
-        c = x.get("category") or "Other"
-        amount = float(x.get("total") or 0)
-        by_cat[c] = by_cat.get(c, 0.0) + amount
-        total += amount
-    return json.dumps({"total_spend": total, "by_category": by_cat})
-
-
-def get_flagged_receipts(org_id: str) -> str:
-    r = (
+    return json.dumps(rows) if rows else "No receipts matched."
+
+
+async def get_spending_summary(org_id: str, date_from: str | None = None, date_to: str | None = None) -> str:
+    """Totals by category, top vendors, month and currency (receipt_spend_summary).
+
+    Exact for any range: whole calendar months come from the spend rollups, other ranges from
+    receipts. With a date range, receipts without a date are left out.
+    """
+    r = await execute(get_supabase().rpc("receipt_spend_summary", {
+        "p_org_id": org_id,
+        "p_date_from": date_from,
+        "p_date_to": date_to,
+    }))
+    summary = r.data or {}
+    return json.dumps({
+        "total_spend": float(summary.get("total_spend") or 0),
+        "total_tax": float(summary.get("total_tax") or 0),
+        "receipt_count": summary.get("receipt_count") or 0,
+        "by_category": summary.get("by_category") or {},
+        "by_vendor": summary.get("by_vendor") or {},
+        "by_month": summary.get("by_month") or {},
+        "by_currency": summary.get("by_currency") or {},
+        "date_from": summary.get("date_from"),
+        "date_to": summary.get("date_to"),
+    })
+
+
+async def get_flagged_receipts(org_id: str) -> str:
+    r = await execute(
         _table()
         .select("id, vendor, total, confidence, needs_review, category")
         .eq("org_id", org_id)
         .eq("is_deleted", False)
         .or_("needs_review.eq.true,confidence.lt.0.85")
-        .execute()
     )
     return json.dumps(r.data or []) if r.data else "No receipts need review."
 
 
-def audit_high_spend(org_id: str, min_total: float, category: str | None = None) -> str:
+async def audit_high_spend(org_id: str, min_total: float, category: str | None = None) -> str:
     base = (
         _table()
         .select("id, vendor, date, total, category, confidence, needs_review")
@@ -71,22 +92,52 @@ def audit_high_spend(org_id: str, min_total: float, category: str | None = None)
     )
     if category:
         base = base.eq("category", category)
-    r = base.order("total", desc=True).limit(100).execute()
+    r = await execute(base.order("total", desc=True).limit(100))
     rows = r.data or []
     return json.dumps(rows) if rows else "No receipts exceeded that threshold."
 
 
-def run_tool(org_id: str, name: str, args: Dict[str, Any]) -> str:
+def _number(value: Any) -> float | None:
+    """Finite number from tool args; ValueError for anything else (e.g. "$50")."""
+    if value in (None, ""):
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+def _date(value: Any) -> str | None:
+    """ISO date from tool args; ValueError for anything else."""
+    return date.fromisoformat(str(value)).isoformat() if value else None
+
+
+async def run_tool(org_id: str, name: str, args: Dict[str, Any]) -> str:
+    try:
+        date_from, date_to = _date(args.get("date_from")), _date(args.get("date_to"))
+    except ValueError:
+        return "Invalid date; use YYYY-MM-DD."
+    try:
+        min_total, max_total = _number(args.get("min_total")), _number(args.get("max_total"))
+    except (TypeError, ValueError):
+        return "Invalid amount; use a plain number such as 50 or 49.99."
     if name == "search_receipts":
-        return search_receipts(org_id, args.get("query") or "")
+        return await search_receipts(
+            org_id,
+            args.get("query") or "",
+            date_from=date_from,
+            date_to=date_to,
+            category=args.get("category") or None,
+            min_total=min_total,
+            max_total=max_total,
+        )
     if name == "get_spending_summary":
-        return get_spending_summary(org_id)
+        return await get_spending_summary(org_id, date_from=date_from, date_to=date_to)
     if name == "get_flagged_receipts":
-        return get_flagged_receipts(org_id)
+        return await get_flagged_receipts(org_id)
     if name == "audit_high_spend":
-        min_total = float(args.get("min_total") or 0)
         category = args.get("category") or None
-        return audit_high_spend(org_id, min_total, category)
+        return await audit_high_spend(org_id, min_total or 0.0, category)
     return "Unknown tool"
 
 
@@ -0,0 +1,213 @@
+"""Process-wide scheduler for OCR and LLM work with per-org fair sharing.
+
+Each resource (CPU OCR slots, Mistral vision slots, Mistral LLM slots) has
+a global concurrency cap. When it is saturated, waiting requests are granted
+by weighted fair queuing across orgs: each org's requests get virtual start
+tags spaced 1/weight apart, and the lowest tag goes next. An org that
+submits 200 receipts therefore cannot starve an org that submits 2, and a
+higher plan (PLAN_WEIGHTS) gets a proportionally larger share.
+
+The org is taken from a context variable set once per extraction
+(`org_context`), so engines and LLM clients only name the resource:
+
+    async with scheduled(MISTRAL_LLM):
+        resp = await client.chat.complete_async(...)
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from app.config import get_settings
+
+OCR_CPU = "ocr_cpu"
+MISTRAL_VISION = "mistral_vision"
+MISTRAL_LLM = "mistral_llm"
+
+PLAN_WEIGHTS = {"free": 1.0, "pro": 2.0, "enterprise": 4.0}
+_SYSTEM_ORG = "-"
+
+_current_org: contextvars.ContextVar[Tuple[str, float]] = contextvars.ContextVar(
+    "scheduler_org", default=(_SYSTEM_ORG, 1.0)
+)
+
+
+@contextmanager
+def org_context(org_id: Optional[str], plan: Optional[str]) -> Iterator[None]:
+    """Attribute scheduled work in this context (and tasks it spawns) to an org."""
+    token = _current_org.set((org_id or _SYSTEM_ORG, PLAN_WEIGHTS.get(plan or "free", 1.0)))
+    try:
+        yield
+    finally:
+        _current_org.reset(token)
+
+
+@dataclass
+class _OrgStats:
+    queued: int = 0
+    running: int = 0
+    granted: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+@dataclass(order=True)
+class _Waiter:
+    tag: float
+    seq: int
+    org_id: str = field(compare=False)
+    enqueued: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    granted: bool = field(default=False, compare=False)
+
+
+class FairScheduler:
+    """Concurrency cap for one resource with weighted fair queuing across orgs."""
+
+    def __init__(self, name: str, slots: int) -> None:
+        self.name = name
+        self.slots = max(1, slots)
+        self._in_use = 0
+        self._vtime = 0.0
+        self._org_tag: Dict[str, float] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._stats: Dict[str, _OrgStats] = defaultdict(_OrgStats)
+        self._lock = threading.Lock()
+
+    def _tag(self, org_id: str, weight: float) -> float:
+        tag = max(self._vtime, self._org_tag.get(org_id, 0.0))
+        self._org_tag[org_id] = tag + 1.0 / weight
+        return tag
+
+    async def acquire(self, org_id: str, weight: float) -> None:
+        with self._lock:
+            stats = self._stats[org_id]
+            if self._in_use < self.slots and not self._waiters:
+                self._in_use += 1
+                self._vtime = max(self._vtime, self._tag(org_id, weight))
+                stats.running += 1
+                stats.granted += 1
+                return
+            waiter = _Waiter(
+                self._tag(org_id, weight), next(self._seq), org_id, time.monotonic(),
+                asyncio.get_running_loop().create_future(),
+            )
+            heapq.heappush(self._waiters, waiter)
+            stats.queued += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    # Granted and cancelled in the same tick: pass the slot on.
+                    self._stats[org_id].running -= 1
+                    self._release_locked()
+                else:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                    self._stats[org_id].queued -= 1
+            raise
+
+    def release(self, org_id: str) -> None:
+        with self._lock:
+            self._stats[org_id].running -= 1
+            self._release_locked()
+
+    def _release_locked(self) -> None:
+        if self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            waiter.granted = True
+            self._vtime = max(self._vtime, waiter.tag)
+            wait = time.monotonic() - waiter.enqueued
+            stats = self._stats[waiter.org_id]
+            stats.queued -= 1
+            stats.running += 1
+            stats.granted += 1
+            stats.wait_total += wait
+            stats.wait_max = max(stats.wait_max, wait)
+            waiter.future.get_loop().call_soon_threadsafe(_grant, waiter.future)
+            return
+        self._in_use -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "in_use": self._in_use,
+                "queued": len(self._waiters),
+                "orgs": {
+                    org: {
+                        "queued": s.queued,
+                        "running": s.running,
+                        "granted": s.granted,
+                        "avg_wait_s": round(s.wait_total / s.granted, 4) if s.granted else 0.0,
+                        "max_wait_s": round(s.wait_max, 4),
+                    }
+                    for org, s in self._stats.items()
+                    if s.queued or s.running or s.granted
+                },
+            }
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_schedulers: Dict[str, FairScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(resource: str) -> FairScheduler:
+    with _schedulers_lock:
+        if resource not in _schedulers:
+            from app.ocr.executor import ocr_worker_count
+
+            s = get_settings()
+            slots = {
+                OCR_CPU: ocr_worker_count(),
+                MISTRAL_VISION: s.scheduler_vision_slots,
+                MISTRAL_LLM: s.scheduler_llm_slots,
+            }[resource]
+            _schedulers[resource] = FairScheduler(resource, slots)
+        return _schedulers[resource]
+
+
+@asynccontextmanager
+async def scheduled(resource: str) -> AsyncIterator[None]:
+    """Hold one slot of `resource` for the current org while the block runs."""
+    org_id, weight = _current_org.get()
+    scheduler = get_scheduler(resource)
+    await scheduler.acquire(org_id, weight)
+    try:
+        yield
+    finally:
+        scheduler.release(org_id)
+
+
+def scheduler_stats() -> dict:
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {s.name: s.stats() for s in schedulers}
+
+
+__all__ = [
+    "MISTRAL_LLM",
+    "MISTRAL_VISION",
+    "OCR_CPU",
+    "PLAN_WEIGHTS",
+    "FairScheduler",
+    "get_scheduler",
+    "org_context",
+    "scheduled",
+    "scheduler_stats",
+]
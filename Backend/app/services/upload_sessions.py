@@ -0,0 +1,284 @@
+"""Resumable upload sessions: state in Postgres, part bytes in the receipts bucket.
+
+A session collects files uploaded as independent parts; the client picks each
+file_id, and (file_id, part_number) identifies a part, so retrying a request
+never stores anything twice:
+- re-declaring a file with the same size/hash/part count is a no-op;
+- re-sending a part whose hash matches the stored one is a no-op;
+- a different file or part under an existing id is a conflict.
+
+Part objects live under {org_id}/sessions/{session_id}/{file_id}/ and are
+assembled into the final object when the session is committed. A commit holds
+the session until its commit_deadline, so one that died mid-way does not block
+the session for good; parts are only recorded while the session is open.
+Expired sessions are removed, parts and all, by sweep_expired_sessions
+(scripts/sweep_upload_sessions.py).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from app.config import get_settings
+from app.services.db import execute, run_sync
+from app.services.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionConflict(Exception):
+    """An id was reused for different content, or the session is in the wrong state."""
+
+
+class UploadSessionClosed(UploadSessionConflict):
+    """The session started committing (or was committed) while a part was being stored."""
+
+
+def _bucket():
+    return get_supabase().storage.from_("receipts")
+
+
+def part_path(org_id: str, session_id: str, file_id: str, part_number: int) -> str:
+    return f"{org_id}/sessions/{session_id}/{file_id}/{part_number:05d}"
+
+
+def is_expired(session: Dict) -> bool:
+    expires = datetime.fromisoformat(session["expires_at"].replace("Z", "+00:00"))
+    return session["status"] != "committed" and expires < datetime.now(timezone.utc)
+
+
+async def create_session(org_id: str, user_id: str) -> Dict:
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=get_settings().upload_session_ttl_hours)
+    r = await execute(get_supabase().table("upload_sessions").insert({
+        "org_id": org_id,
+        "user_id": user_id,
+        "expires_at": expires_at.isoformat(),
+    }))
+    return r.data[0]
+
+
+async def get_session(org_id: str, session_id: str) -> Optional[Dict]:
+    r = await execute(
+        get_supabase().table("upload_sessions").select("*").eq("id", session_id).eq("org_id", org_id)
+    )
+    return r.data[0] if r.data else None
+
+
+async def list_files(session_id: str) -> List[Dict]:
+    """Declared files, each with the sorted part numbers already stored."""
+    sb = get_supabase()
+    files = await execute(sb.table("upload_session_files").select("*").eq("session_id", session_id).order("created_at"))
+    parts = await execute(
+        sb.table("upload_session_parts").select("file_id, part_number, size_bytes, sha256, storage_path")
+        .eq("session_id", session_id)
+    )
+    by_file: Dict[str, List[Dict]] = {}
+    for part in parts.data or []:
+        by_file.setdefault(part["file_id"], []).append(part)
+    out = []
+    for f in files.data or []:
+        received = sorted(by_file.get(f["file_id"], []), key=lambda p: p["part_number"])
+        out.append({**f, "parts": received, "received_parts": [p["part_number"] for p in received]})
+    return out
+
+
+async def declare_file(
+    session_id: str, file_id: str, filename: str, ext: str, size_bytes: int, sha256: str, part_count: int
+) -> Dict:
+    row = {
+        "session_id": session_id,
+        "file_id": file_id,
+        "filename": filename,
+        "ext": ext,
+        "size_bytes": size_bytes,
+        "sha256": sha256.lower(),
+        "part_count": part_count,
+    }
+    await execute(
+        get_supabase().table("upload_session_files").upsert(row, on_conflict="session_id,file_id", ignore_duplicates=True)
+    )
+    r = await execute(
+        get_supabase().table("upload_session_files").select("*").eq("session_id", session_id).eq("file_id", file_id)
+    )
+    existing = r.data[0]
+    if (existing["size_bytes"], existing["sha256"], existing["part_count"]) != (size_bytes, row["sha256"], part_count):
+        raise UploadSessionConflict(f"File {file_id} was already declared with different content")
+    return existing
+
+
+async def put_part(
+    org_id: str, session_id: str, file_id: str, part_number: int, data: bytes, sha256: str
+) -> bool:
+    """Store one verified part; returns False if the identical part was already stored."""
+    def stored_hash():
+        return execute(
+            get_supabase().table("upload_session_parts").select("sha256")
+            .eq("session_id", session_id).eq("file_id", file_id).eq("part_number", part_number)
+        )
+
+    r = await stored_hash()
+    if r.data:
+        if r.data[0]["sha256"] != sha256:
+            raise UploadSessionConflict(f"Part {part_number} of {file_id} was already stored with different content")
+        return False
+    path = part_path(org_id, session_id, file_id, part_number)
+    # upsert: an earlier attempt may have written the object but not its row.
+    await run_sync(_bucket().upload, path, data, {"content-type": "application/octet-stream", "upsert": "true"})
+    # Recorded only while the session is open, atomically with a commit starting (migration 011).
+    r = await execute(get_supabase().rpc("put_upload_session_part", {
+        "p_session_id": session_id,
+        "p_file_id": file_id,
+        "p_part_number": part_number,
+        "p_size_bytes": len(data),
+        "p_sha256": sha256,
+        "p_storage_path": path,
+    }))
+    if r.data is None:
+        if not (await stored_hash()).data:
+            await run_sync(_bucket().remove, [path])
+        raise UploadSessionClosed("Upload session is no longer open")
+    if r.data != sha256:
+        raise UploadSessionConflict(f"Part {part_number} of {file_id} was already stored with different content")
+    return True
+
+
+async def assemble_file(file: Dict) -> Optional[bytes]:
+    """Concatenate a file's stored parts; None if the result does not match the declared size/hash."""
+    bucket = _bucket()
+    chunks = [await run_sync(bucket.download, p["storage_path"]) for p in file["parts"]]
+    content = b"".join(chunks)
+    if len(content) != file["size_bytes"] or hashlib.sha256(content).hexdigest() != file["sha256"]:
+        return None
+    return content
+
+
+async def discard_parts(session_id: str, file: Dict) -> None:
+    """Delete a file's parts (objects and rows) so the client can send them again."""
+    paths = [p["storage_path"] for p in file["parts"]]
+    if paths:
+        try:
+            await run_sync(_bucket().remove, paths)
+        except Exception as e:
+            logger.warning("Failed to remove upload parts", extra={"session_id": session_id, "error": str(e)})
+    await execute(
+        get_supabase().table("upload_session_parts").delete().eq("session_id", session_id).eq("file_id", file["file_id"])
+    )
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _quoted(ts: datetime) -> str:
+    # Double quotes keep the ':' / '+' of the timestamp intact inside or=(...).
+    return f'"{ts.isoformat()}"'
+
+
+async def begin_commit(session_id: str) -> Optional[str]:
+    """Take the session for a commit: open, or committing past its deadline (the committer died).
+
+    Returns the new commit_deadline, which finish_commit needs; None if another commit holds the session.
+    """
+    now = _now()
+    deadline = (now + timedelta(seconds=get_settings().upload_session_commit_timeout_seconds)).isoformat()
+    r = await execute(
+        get_supabase().table("upload_sessions")
+        .update({"status": "committing", "commit_deadline": deadline, "updated_at": now.isoformat()})
+        .eq("id", session_id)
+        .or_(f"status.eq.open,and(status.eq.committing,or(commit_deadline.is.null,commit_deadline.lt.{_quoted(now)}))")
+    )
+    return r.data[0]["commit_deadline"] if r.data else None
+
+
+async def renew_commit(session_id: str, deadline: str) -> Optional[str]:
+    """Push this commit's deadline out again; None if another commit has taken the session over."""
+    now = _now()
+    renewed = (now + timedelta(seconds=get_settings().upload_session_commit_timeout_seconds)).isoformat()
+    r = await execute(
+        get_supabase().table("upload_sessions")
+        .update({"commit_deadline": renewed, "updated_at": now.isoformat()})
+        .eq("id", session_id).eq("status", "committing").eq("commit_deadline", deadline)
+    )
+    return r.data[0]["commit_deadline"] if r.data else None
+
+
+async def finish_commit(session_id: str, deadline: str, batch_id: Optional[str]) -> bool:
+    """committed with the batch, or back to open (batch_id None) after a failed commit.
+
+    False if the session was taken over after this commit's deadline passed.
+    """
+    update = {"status": "committed", "batch_id": batch_id} if batch_id else {"status": "open"}
+    update.update(commit_deadline=None, updated_at=_now().isoformat())
+    r = await execute(
+        get_supabase().table("upload_sessions").update(update)
+        .eq("id", session_id).eq("status", "committing").eq("commit_deadline", deadline)
+    )
+    return bool(r.data)
+
+
+async def _remove_session_objects(session: Dict) -> None:
+    """Delete every object under the session's folder, including parts whose row was never written."""
+    bucket = _bucket()
+    files = await execute(get_supabase().table("upload_session_files").select("file_id").eq("session_id", session["id"]))
+    for f in files.data or []:
+        folder = f"{session['org_id']}/sessions/{session['id']}/{f['file_id']}"
+        while True:
+            # Removing shrinks the listing, so always read from the start.
+            entries = await run_sync(bucket.list, folder, {"limit": 1000})
+            paths = [f"{folder}/{e['name']}" for e in entries or []]
+            if not paths:
+                break
+            await run_sync(bucket.remove, paths)
+
+
+async def sweep_expired_sessions(page_size: int = 100) -> int:
+    """Delete sessions past expires_at, objects then rows, except commits still within their deadline.
+
+    Committed sessions go too (with any parts left behind), so a commit can be retried idempotently
+    until the session expires. Sessions whose objects could not be removed are kept for the next
+    sweep and skipped over here. Returns how many sessions were deleted.
+    """
+    swept = failed = 0
+    while True:
+        now = _now()
+        r = await execute(
+            get_supabase().table("upload_sessions").select("id, org_id")
+            .lt("expires_at", now.isoformat())
+            .or_(f"status.neq.committing,commit_deadline.is.null,commit_deadline.lt.{_quoted(now)}")
+            .order("expires_at").order("id").range(failed, failed + page_size - 1)
+        )
+        rows = r.data or []
+        for session in rows:
+            try:
+                await _remove_session_objects(session)
+            except Exception as e:
+                logger.warning(
+                    "Failed to remove upload session objects", extra={"session_id": session["id"], "error": str(e)}
+                )
+                failed += 1
+                continue
+            await execute(get_supabase().table("upload_sessions").delete().eq("id", session["id"]))
+            swept += 1
+        if len(rows) < page_size:
+            return swept
+
+
+__all__ = [
+    "UploadSessionClosed",
+    "UploadSessionConflict",
+    "assemble_file",
+    "begin_commit",
+    "create_session",
+    "declare_file",
+    "discard_parts",
+    "finish_commit",
+    "get_session",
+    "is_expired",
+    "list_files",
+    "part_path",
+    "put_part",
+    "renew_commit",
+    "sweep_expired_sessions",
+]
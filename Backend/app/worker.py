@@ -0,0 +1,140 @@
+"""Extraction worker: leases batch jobs from the queue and runs process_batch_bg.
+
+Run one or more of these alongside the API (scaled independently):
+
+    python -m app.worker
+
+Each worker runs up to WORKER_CONCURRENCY jobs and keeps their leases alive
+with heartbeats. SIGTERM/SIGINT stop leasing and let in-flight jobs finish.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+
+from app.config import get_settings
+from app.logging_config import configure_logging
+from app.ocr.executor import shutdown_ocr_executor
+from app.services.batch_processor import process_batch_bg
+from app.services.db import shutdown_executor
+from app.services.http_clients import close_clients
+from app.services.job_queue import ExtractionJob, JobQueue, get_job_queue
+from app.services.receipt_store import discard_batch_receipts, update_batch
+from app.utils.redaction import sanitize_failure_reason
+
+logger = logging.getLogger(__name__)
+
+
+async def _heartbeat(
+    queue: JobQueue, job: ExtractionJob, worker_id: str, visibility: float, work: asyncio.Task, lost: asyncio.Event
+) -> None:
+    while True:
+        await asyncio.sleep(max(1.0, visibility / 3))
+        if not await queue.heartbeat(job, worker_id, visibility):
+            # Another worker may already be re-running the batch; stop ours rather than race it.
+            logger.warning("Lost lease on job, cancelling it", extra={"job_id": job.id, "batch_id": job.batch_id})
+            lost.set()
+            work.cancel()
+            return
+
+
+async def _attempt(job: ExtractionJob) -> None:
+    if job.attempts > 1:
+        # A previous attempt may have saved some receipts before failing.
+        await discard_batch_receipts(job.org_id, job.batch_id)
+    await process_batch_bg(job.org_id, job.user_id, job.batch_id, job.storage_paths)
+
+
+async def run_job(queue: JobQueue, job: ExtractionJob, worker_id: str) -> None:
+    visibility = get_settings().job_visibility_timeout_seconds
+    if job.attempts > job.max_attempts:
+        # Lease expired on the final attempt (worker crash); do not run it again.
+        if await queue.fail(job, worker_id, "Lease expired after final attempt") is not None:
+            await update_batch(job.batch_id, status="failed")
+        return
+    logger.info(
+        "Leased extraction job",
+        extra={"job_id": job.id, "batch_id": job.batch_id, "attempt": job.attempts},
+    )
+    lost = asyncio.Event()
+    work = asyncio.create_task(_attempt(job))
+    beat = asyncio.create_task(_heartbeat(queue, job, worker_id, visibility, work, lost))
+    try:
+        await work
+    except asyncio.CancelledError:
+        if not lost.is_set():
+            raise
+        # The job and its batch belong to whichever worker holds the lease now.
+    except Exception as e:
+        logger.exception("Extraction job failed", extra={"job_id": job.id, "batch_id": job.batch_id})
+        retry = await queue.fail(job, worker_id, sanitize_failure_reason(str(e)))
+        if retry is None:
+            logger.warning("Lost lease before recording failure", extra={"job_id": job.id, "batch_id": job.batch_id})
+        else:
+            await update_batch(job.batch_id, status="queued" if retry else "failed")
+    else:
+        if not await queue.complete(job, worker_id):
+            logger.warning("Lost lease before completing job", extra={"job_id": job.id, "batch_id": job.batch_id})
+    finally:
+        beat.cancel()
+
+
+async def run_worker(queue: JobQueue, stop: asyncio.Event, worker_id: str | None = None) -> None:
+    settings = get_settings()
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    slots = asyncio.Semaphore(settings.worker_concurrency)
+    running: set[asyncio.Task] = set()
+    logger.info("Extraction worker started", extra={"worker_id": worker_id})
+    while not stop.is_set():
+        await slots.acquire()
+        try:
+            job = await queue.lease(worker_id, settings.job_visibility_timeout_seconds)
+        except Exception as e:
+            logger.error("Failed to lease job", extra={"error": str(e)})
+            job = None
+        if job is None:
+            slots.release()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.worker_poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        task = asyncio.create_task(run_job(queue, job, worker_id))
+        running.add(task)
+        task.add_done_callback(lambda t: (running.discard(t), slots.release()))
+    if running:
+        logger.info("Waiting for in-flight jobs", extra={"jobs": len(running)})
+        await asyncio.gather(*running, return_exceptions=True)
+    logger.info("Extraction worker stopped", extra={"worker_id": worker_id})
+
+
+async def _main() -> None:
+    queue = get_job_queue()
+    if queue is None:
+        raise SystemExit("JOB_QUEUE_BACKEND=inline: extraction runs in the API process, no worker needed")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+    try:
+        await run_worker(queue, stop)
+    finally:
+        await close_clients()
+        shutdown_executor()
+        shutdown_ocr_executor()
+
+
+def main() -> None:
+    configure_logging()
+    asyncio.run(_main())
+
+
+if __name__ == "__main__":
+    main()
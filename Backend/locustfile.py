@@ -1,9 +1,17 @@
 """
-Locust load test: health and receipts list.
+Locust load test: health and receipts list, plus a 200-file bulk upload.
 Run: locust -f locustfile.py --host=http://localhost:8000
 Optional: LOAD_TEST_TOKEN env for authenticated /receipts.
+
+Bulk upload (needs LOAD_TEST_TOKEN and LOAD_TEST_BULK_UPLOAD=1; creates real batches and storage objects):
+    LOAD_TEST_BULK_UPLOAD=1 locust -f locustfile.py BulkUploadUser --host=http://localhost:8000 -u 1 -r 1 -t 2m
+Compare the POST /upload [200 files] response times with the server started with
+UPLOAD_CONCURRENCY=1 (files handled one by one) and with the default (8).
 """
 import os
+import random
+from io import BytesIO
+
 from locust import HttpUser, task, between
 
 
@@ -26,3 +34,41 @@ class ApiUser(HttpUser):
             )
         else:
             self.client.get("/receipts?skip=0&limit=50")
+
+
+def _receipt_jpeg(seed: int) -> bytes:
+    """Small text-like receipt photo that passes the upload receipt detector."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    img = Image.new("L", (600, 900), color=245)
+    draw = ImageDraw.Draw(img)
+    for i in range(20):
+        draw.text((40, 40 + 40 * i), f"ITEM {rng.randint(100, 999)}        {rng.uniform(1, 50):6.2f}", fill=10)
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+class BulkUploadUser(HttpUser):
+    wait_time = between(5, 10)
+    files_per_upload = 200
+
+    def on_start(self):
+        self.token = os.environ.get("LOAD_TEST_TOKEN", "")
+        # Opt-in: this writes to storage and creates batches.
+        self.enabled = bool(self.token) and os.environ.get("LOAD_TEST_BULK_UPLOAD") == "1"
+        self.images = [_receipt_jpeg(i) for i in range(self.files_per_upload)] if self.enabled else []
+
+    @task
+    def upload_batch(self):
+        if not self.enabled:
+            return
+        files = [("files", (f"receipt_{i}.jpg", img, "image/jpeg")) for i, img in enumerate(self.images)]
+        self.client.post(
+            "/upload",
+            files=files,
+            headers={"Authorization": f"Bearer {self.token}"},
+            name=f"/upload [{self.files_per_upload} files]",
+            timeout=300,
+        )
@@ -0,0 +1,88 @@
+"""
+Benchmark auth overhead: remote /auth/v1/user check vs local JWT verification.
+Prints p50/p99 per mode. Profile lookup is excluded (same in both modes).
+
+Default: remote calls go through the shared pooled httpx.AsyncClient, whose transport
+is replaced by an in-process mock (httpx.MockTransport) that waits --remote-latency-ms
+per request (network round trip to Supabase Auth on a warm connection). With --live, BENCH_TOKEN is verified
+against the real SUPABASE_URL instead; set SUPABASE_JWT_SECRET to match.
+
+Run: python scripts/bench_auth.py [-n 500] [--remote-latency-ms 60] [--live]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret-bench-secret-bench-secret")
+
+import httpx
+import jwt
+
+from app.config import get_settings
+from app.middleware import auth
+from app.services import http_clients
+
+
+def _make_token(user_id: str) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, get_settings().supabase_jwt_secret, algorithm="HS256")
+
+
+def _install_mock_remote(latency_ms: float, user_id: str) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_ms / 1000.0)
+        return httpx.Response(200, json={"id": user_id})
+
+    http_clients._http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _pct(samples: list[float], p: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+async def _run(mode: str, token: str, n: int) -> list[float]:
+    os.environ["AUTH_MODE"] = mode
+    get_settings.cache_clear()
+    out: list[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await auth.verify_token(token)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=500)
+    parser.add_argument("--remote-latency-ms", type=float, default=60.0)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+    if args.live:
+        token = os.environ.get("BENCH_TOKEN", "")
+        if not token:
+            print("Set BENCH_TOKEN (see scripts/get_test_token.py)")
+            sys.exit(1)
+    else:
+        user_id = str(uuid.uuid4())
+        token = _make_token(user_id)
+        _install_mock_remote(args.remote_latency_ms, user_id)
+    print(f"{'mode':<8}{'n':>6}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for mode in ("remote", "local"):
+        samples = await _run(mode, token, args.n)
+        print(
+            f"{mode:<8}{len(samples):>6}{_pct(samples, 50):>10.3f}{_pct(samples, 99):>10.3f}"
+            f"{statistics.fmean(samples):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark: Tesseract OCR throughput vs. number of OCR workers.
+
+Runs TesseractOcrEngine over a fixed image corpus with OCR_EXECUTOR set to
+--mode and OCR_WORKERS = 1, 2, 4, ... up to the core count, and prints images/s
+for each. With --corpus DIR the *.jpg/*.png files in DIR are used; otherwise a
+deterministic set of synthetic receipt images is generated.
+
+Needs the tesseract binary on PATH.
+
+Run: python scripts/bench_ocr.py [--corpus DIR] [--images 32] [--mode process|thread]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+from PIL import Image, ImageDraw
+
+from app.config import get_settings
+from app.ocr import executor
+from app.ocr.tesseract_engine import TesseractOcrEngine
+
+ITEMS = ["Milk 2L", "Bread", "Eggs x12", "Coffee beans", "Bananas", "Olive oil", "Cheddar", "Pasta", "Tomatoes"]
+
+
+def synthetic_receipt(seed: int) -> bytes:
+    rng = random.Random(seed)
+    img = Image.new("L", (900, 1400), color=255)
+    draw = ImageDraw.Draw(img)
+    y = 40
+    lines = [f"CORNER MARKET #{rng.randint(10, 99)}", f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}", ""]
+    subtotal = 0.0
+    for _ in range(rng.randint(6, 14)):
+        price = round(rng.uniform(0.5, 25), 2)
+        subtotal += price
+        lines.append(f"{rng.choice(ITEMS):<24}{price:>8.2f}")
+    tax = round(subtotal * 0.08, 2)
+    lines += ["", f"{'SUBTOTAL':<24}{subtotal:>8.2f}", f"{'TAX':<24}{tax:>8.2f}", f"{'TOTAL':<24}{subtotal + tax:>8.2f}"]
+    for line in lines:
+        draw.text((60, y), line, fill=0)
+        y += 36
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def load_corpus(corpus: str | None, count: int) -> list[bytes]:
+    if corpus:
+        files = sorted(p for p in Path(corpus).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        if not files:
+            raise SystemExit(f"No .jpg/.png files in {corpus}")
+        return [files[i % len(files)].read_bytes() for i in range(count)]
+    return [synthetic_receipt(i) for i in range(count)]
+
+
+async def run(images: list[bytes], workers: int, mode: str) -> float:
+    os.environ["OCR_EXECUTOR"] = mode
+    os.environ["OCR_WORKERS"] = str(workers)
+    get_settings.cache_clear()
+    executor.shutdown_ocr_executor()
+    engine = TesseractOcrEngine()
+    await engine.extract_text(images[0])  # start the pool outside the timed section
+    start = time.perf_counter()
+    await asyncio.gather(*(engine.extract_text(img) for img in images))
+    elapsed = time.perf_counter() - start
+    executor.shutdown_ocr_executor()
+    return len(images) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--mode", choices=("process", "thread"), default="process")
+    args = parser.parse_args()
+
+    images = load_corpus(args.corpus, args.images)
+    cores = os.cpu_count() or 1
+    counts = sorted({1, *(n for n in (2, 4, 8, 16, 32) if n < cores), cores})
+    print(f"{len(images)} images, mode={args.mode}, {cores} cores")
+    base = None
+    for workers in counts:
+        rate = asyncio.run(run(images, workers, args.mode))
+        base = base or rate
+        print(f"  workers={workers:<3} {rate:7.2f} images/s  ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
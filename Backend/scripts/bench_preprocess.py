@@ -0,0 +1,114 @@
+"""
+Benchmark: OCR latency and accuracy with and without image preprocessing.
+
+Builds "phone photo" versions of synthetic receipts (large, colour, dark
+background, a few degrees of skew, JPEG) and OCRs each one twice: raw, and
+through app.ocr.preprocess with the configured settings. Accuracy is the share
+of ground-truth receipt tokens found in the OCR text. Also reports the
+preprocessing time alone and the Pixtral payload size before/after
+prepare_for_vision. With --corpus DIR, images in DIR are used and accuracy is
+skipped (no ground truth).
+
+OCR needs the tesseract binary on PATH; without it only the preprocessing
+and payload numbers are printed.
+
+Run: python scripts/bench_preprocess.py [--corpus DIR] [--images 12]
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.config import get_settings
+from app.ocr.preprocess import default_config, prepare_for_vision, preprocess_bytes
+from app.ocr.tesseract_engine import _image_to_text
+
+ITEMS = ["Milk 2L", "Bread", "Eggs x12", "Coffee beans", "Bananas", "Olive oil", "Cheddar", "Pasta", "Tomatoes"]
+
+
+def synthetic_photo(seed: int) -> tuple[bytes, list[str]]:
+    rng = random.Random(seed)
+    lines = [f"CORNER MARKET #{rng.randint(10, 99)}", f"2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"]
+    subtotal = 0.0
+    for _ in range(rng.randint(6, 12)):
+        price = round(rng.uniform(0.5, 25), 2)
+        subtotal += price
+        lines.append(f"{rng.choice(ITEMS):<20}{price:>8.2f}")
+    lines.append(f"{'TOTAL':<20}{subtotal:>8.2f}")
+    font = ImageFont.load_default(size=28)
+    paper = Image.new("L", (620, 110 + 44 * len(lines)), color=245)
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(lines):
+        draw.text((40, 50 + 44 * i), line, fill=20, font=font)
+    paper = paper.rotate(rng.uniform(-4, 4), resample=Image.BICUBIC, expand=True, fillcolor=60)
+    photo = Image.new("RGB", (paper.width + 500, paper.height + 500), color=(70, 55, 40))
+    photo.paste(paper.convert("RGB"), (rng.randint(120, 380), rng.randint(120, 380)))
+    photo = photo.resize((photo.width * 3, photo.height * 3), Image.BICUBIC)
+    buf = BytesIO()
+    photo.save(buf, format="JPEG", quality=90)
+    tokens = [tok for line in lines for tok in line.split()]
+    return buf.getvalue(), tokens
+
+
+def accuracy(text: str, expected: list[str]) -> float:
+    found = set(text.split())
+    return sum(tok in found for tok in expected) / len(expected)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--images", type=int, default=12)
+    args = parser.parse_args()
+
+    if args.corpus:
+        files = sorted(p for p in Path(args.corpus).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        samples = [(f.read_bytes(), None) for f in files[: args.images]]
+    else:
+        samples = [synthetic_photo(i) for i in range(args.images)]
+    cfg = default_config()
+    if cfg is None:
+        raise SystemExit("OCR_PREPROCESS is disabled")
+    language = "eng"
+    settings = get_settings()
+
+    prep_ms, raw_kb, vision_kb = [], [], []
+    for image, _ in samples:
+        start = time.perf_counter()
+        preprocess_bytes(image, cfg)
+        prep_ms.append((time.perf_counter() - start) * 1000)
+        raw_kb.append(len(image) / 1024)
+        vision_kb.append(len(prepare_for_vision(image, settings.ocr_vision_max_side)[0]) / 1024)
+    print(f"{len(samples)} images")
+    print(f"  preprocess         median {statistics.median(prep_ms):7.1f} ms")
+    print(f"  vision payload     median {statistics.median(raw_kb):7.0f} KB -> {statistics.median(vision_kb):.0f} KB")
+
+    if shutil.which("tesseract") is None:
+        print("  tesseract not on PATH; skipping OCR latency/accuracy")
+        return
+    for label, variant in (("raw", None), ("preprocessed", cfg)):
+        times, scores = [], []
+        for image, expected in samples:
+            start = time.perf_counter()
+            text, _ = _image_to_text(image, language, variant)
+            times.append((time.perf_counter() - start) * 1000)
+            if expected:
+                scores.append(accuracy(text, expected))
+        acc = f"  accuracy {statistics.mean(scores):.1%}" if scores else ""
+        print(f"  ocr {label:<14} median {statistics.median(times):7.1f} ms{acc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark: per-image cost of the upload receipt detector.
+
+Compares the previous implementation (full decode, convert("L"), resize to
+64x64, Python loops over the histogram) with validate_receipt_image (reduced
+JPEG decode via Image.draft, NumPy stats) on synthetic phone photos at common
+camera resolutions. With --corpus DIR the *.jpg/*.png files in DIR are used.
+
+Run: python scripts/bench_receipt_detector.py [--corpus DIR] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.services.receipt_detector import validate_receipt_image
+
+
+def legacy_validate(content: bytes) -> bool:
+    img = Image.open(BytesIO(content))
+    if min(img.size) < 300:
+        return False
+    hist = img.convert("L").resize((64, 64)).histogram()
+    total = sum(hist)
+    mean = sum(i * c for i, c in enumerate(hist)) / total
+    return sum(((i - mean) ** 2) * c for i, c in enumerate(hist)) / total >= 15.0
+
+
+def phone_photo(width: int, height: int) -> bytes:
+    img = Image.new("RGB", (width, height), (90, 80, 70))
+    draw = ImageDraw.Draw(img)
+    left, right = int(width * 0.3), int(width * 0.7)
+    draw.rectangle((left, int(height * 0.05), right, int(height * 0.95)), fill=(240, 238, 230))
+    step = max(12, height // 70)
+    for i, y in enumerate(range(int(height * 0.08), int(height * 0.92), step)):
+        draw.text((left + 40, y), f"ITEM {i:02d}        {i * 1.37:6.2f}", fill=(20, 20, 20))
+    buf = BytesIO()
+    img.filter(ImageFilter.GaussianBlur(1)).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def time_ms(fn, content: bytes, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(content)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.corpus:
+        files = sorted(p for p in Path(args.corpus).iterdir() if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        images = [(f.name, f.read_bytes()) for f in files]
+    else:
+        images = [(f"{w}x{h} jpeg", phone_photo(w, h)) for w, h in ((4032, 3024), (3264, 2448), (1600, 1200))]
+    print(f"{'image':<24}{'KB':>7}{'legacy ms':>12}{'new ms':>10}{'speedup':>9}")
+    for name, content in images:
+        old = time_ms(legacy_validate, content, args.repeat)
+        new = time_ms(lambda c: validate_receipt_image(c, name), content, args.repeat)
+        print(f"{name:<24}{len(content) // 1024:>7}{old:>12.2f}{new:>10.2f}{old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: rule-based fast-path structurer on a labelled OCR corpus.
+
+For each receipt in the corpus (JSONL: {"id", "lines", "expected": {vendor, date,
+total, tax, items}}) runs structure_with_rules and reports:
+- LLM-skip rate (receipts the fast path accepted),
+- field accuracy on accepted receipts (a wrong accept is worse than a fallback),
+- parse latency, and LLM latency saved at --llm-latency-ms per skipped call.
+
+Run: python scripts/bench_structuring.py [--corpus scripts/data/structuring_corpus.jsonl]
+     [--min-confidence 0.9] [--llm-latency-ms 2500]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ocr.base_engine import RawOcrResult
+from app.pipeline.structuring_rules import structure_with_rules
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "structuring_corpus.jsonl")
+FIELDS = ("vendor", "date", "total", "tax", "items")
+
+
+def _matches(ext, expected: dict) -> dict:
+    actual = {
+        "vendor": ext.vendor,
+        "date": ext.date.isoformat() if ext.date else None,
+        "total": ext.total,
+        "tax": ext.tax,
+        "items": len(ext.items),
+    }
+    return {
+        f: (abs(actual[f] - expected[f]) < 0.005 if isinstance(expected[f], float) else actual[f] == expected[f])
+        for f in FIELDS
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--min-confidence", type=float, default=0.9)
+    parser.add_argument("--llm-latency-ms", type=float, default=2500.0)
+    parser.add_argument("--repeat", type=int, default=200, help="parse passes for the latency figure")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    ocrs = [RawOcrResult(full_text="\n".join(c["lines"]), lines=c["lines"], engine="tesseract") for c in corpus]
+
+    accepted = 0
+    field_hits = {f: 0 for f in FIELDS}
+    wrong = []
+    for case, ocr in zip(corpus, ocrs):
+        ext = structure_with_rules(ocr, args.min_confidence)
+        if ext is None:
+            continue
+        accepted += 1
+        result = _matches(ext, case["expected"])
+        for f, ok in result.items():
+            field_hits[f] += ok
+        if not all(result.values()):
+            wrong.append(case["id"])
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        for ocr in ocrs:
+            structure_with_rules(ocr, args.min_confidence)
+        timings.append((time.perf_counter() - start) / len(ocrs))
+
+    n = len(corpus)
+    parse_ms = statistics.median(timings) * 1000
+    print(f"corpus: {n} receipts ({args.corpus})")
+    print(f"LLM skipped: {accepted}/{n} ({accepted / n:.0%})")
+    if accepted:
+        print("field accuracy on skipped: " + ", ".join(f"{f}={field_hits[f] / accepted:.0%}" for f in FIELDS))
+    print(f"wrong accepts: {wrong or 'none'}")
+    print(f"fast-path parse: {parse_ms:.3f} ms/receipt (median)")
+    saved = accepted * args.llm_latency_ms - n * parse_ms
+    print(f"latency saved: {saved / 1000:.1f} s over the corpus ({saved / n:.0f} ms/receipt at {args.llm_latency_ms:.0f} ms/LLM call)")
+
+
+if __name__ == "__main__":
+    main()
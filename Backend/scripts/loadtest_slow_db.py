@@ -0,0 +1,106 @@
+"""
+Load test: concurrent request throughput when every DB call is slow.
+
+Swaps the Supabase client for a fake whose `.execute()` blocks for --db-latency-ms
+(like a slow PostgREST round-trip) and fires --concurrency simultaneous
+GET /batches/{id} requests through the ASGI app. Mode "inline" runs `.execute()`
+on the event loop (the old behaviour); mode "pool" uses app.services.db.
+
+Run: python scripts/loadtest_slow_db.py [--requests 200] [--concurrency 50] [--db-latency-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SUPABASE_URL", "https://loadtest.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "loadtest")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "loadtest-secret-loadtest-secret-loadtest")
+
+import httpx
+import jwt
+
+from app.config import get_settings
+from app.main import app
+from app.services import db, org_quota, supabase_client
+
+ORG_ID = str(uuid.uuid4())
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data)
+
+
+class _SlowQuery:
+    """Accepts any builder call; execute() blocks like a real HTTP round-trip."""
+
+    def __init__(self, latency_s: float) -> None:
+        self._latency = latency_s
+
+    def __getattr__(self, name):
+        return lambda *a, **kw: self
+
+    def execute(self):
+        time.sleep(self._latency)
+        return _Result([{"id": ORG_ID, "org_id": ORG_ID, "plan": "free", "status": "done"}])
+
+
+class _SlowClient:
+    def __init__(self, latency_s: float) -> None:
+        self._latency = latency_s
+
+    def table(self, name):
+        return _SlowQuery(self._latency)
+
+
+async def _run(mode: str, n: int, concurrency: int, token: str) -> float:
+    real_run_sync = db.run_sync
+
+    async def inline(fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    db.run_sync = inline if mode == "inline" else real_run_sync  # type: ignore[assignment]
+    org_quota._get_cache().clear()
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+
+        async def one() -> None:
+            async with sem:
+                r = await client.get(f"/batches/{uuid.uuid4()}", headers=headers)
+                r.raise_for_status()
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(n)])
+        elapsed = time.perf_counter() - t0
+    db.run_sync = real_run_sync  # type: ignore[assignment]
+    return elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    supabase_client._cached_client = _SlowClient(args.db_latency_ms / 1000.0)
+    now = int(time.time())
+    token = jwt.encode(
+        {"sub": str(uuid.uuid4()), "aud": "authenticated", "iat": now, "exp": now + 3600},
+        get_settings().supabase_jwt_secret,
+        algorithm="HS256",
+    )
+    print(f"{'mode':<8}{'requests':>10}{'seconds':>10}{'req/s':>10}")
+    for mode in ("inline", "pool"):
+        elapsed = await _run(mode, args.requests, args.concurrency, token)
+        print(f"{mode:<8}{args.requests:>10}{elapsed:>10.2f}{args.requests / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+"""
+Rebuild receipt_spend_rollups from receipts (migration 014): backfill or repair after manual edits.
+
+Uses SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (same settings as the API).
+Run: python scripts/rebuild_spend_rollups.py [--org ORG_ID]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.receipt_store import rebuild_spend_rollups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--org", help="only this organization (default: all)")
+    args = parser.parse_args()
+    rows = asyncio.run(rebuild_spend_rollups(args.org))
+    print(f"Rebuilt {rows} rollup rows" + (f" for org {args.org}" if args.org else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Delete expired upload sessions: their objects ({org_id}/sessions/{session_id}/ in the
+receipts bucket) and their rows, including parts left on committed sessions. Run it from cron.
+
+Uses SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (same settings as the API).
+Run: python scripts/sweep_upload_sessions.py [--page-size N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.upload_sessions import sweep_expired_sessions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=100, help="sessions per query (default: 100)")
+    args = parser.parse_args()
+    print(f"Removed {asyncio.run(sweep_expired_sessions(args.page_size))} expired upload sessions")
+
+
+if __name__ == "__main__":
+    main()
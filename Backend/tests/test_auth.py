@@ -0,0 +1,38 @@
+"""Local JWT verification: HS256 accepted, bad tokens rejected, unknown algs deferred to Supabase."""
+import asyncio
+import time
+
+import jwt
+import pytest
+
+from app.config import get_settings
+from app.services.jwt_verifier import LocalVerificationUnavailable, verify_token_locally
+
+
+def _token(exp_offset: int = 3600, aud: str = "authenticated", secret: str | None = None) -> str:
+    now = int(time.time())
+    claims = {"sub": "user-1", "aud": aud, "iat": now, "exp": now + exp_offset}
+    return jwt.encode(claims, secret or get_settings().supabase_jwt_secret, algorithm="HS256")
+
+
+def test_valid_hs256_token_returns_claims() -> None:
+    claims = asyncio.run(verify_token_locally(_token()))
+    assert claims["sub"] == "user-1"
+
+
+def test_expired_token_is_rejected() -> None:
+    with pytest.raises(jwt.ExpiredSignatureError):
+        asyncio.run(verify_token_locally(_token(exp_offset=-3600)))
+
+
+def test_wrong_secret_or_audience_is_rejected() -> None:
+    with pytest.raises(jwt.InvalidTokenError):
+        asyncio.run(verify_token_locally(_token(secret="not-the-secret-not-the-secret-123")))
+    with pytest.raises(jwt.InvalidTokenError):
+        asyncio.run(verify_token_locally(_token(aud="anon")))
+
+
+def test_unsupported_alg_defers_to_remote() -> None:
+    token = jwt.encode({"sub": "user-1"}, "k" * 64, algorithm="HS512")
+    with pytest.raises(LocalVerificationUnavailable):
+        asyncio.run(verify_token_locally(token))
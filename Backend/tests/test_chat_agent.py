@@ -0,0 +1,38 @@
+"""Chat agent: Mistral is awaited on the async client, tool calls are run in between."""
+import asyncio
+import json
+
+from app.services import chat_agent, mistral_client
+
+
+class _Chat:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def complete(self, **kwargs):
+        raise AssertionError("the blocking client must not be used")
+
+    async def complete_async(self, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            call = {"id": "c1", "function": {"name": "get_flagged_receipts", "arguments": "{}"}}
+            return {"choices": [{"finish_reason": "tool_calls", "message": {"role": "assistant", "tool_calls": [call]}}]}
+        assert kwargs["messages"][-1] == {"role": "tool", "tool_call_id": "c1", "content": json.dumps([])}
+        return {"choices": [{"finish_reason": "stop", "message": {"content": " Nothing flagged. "}}]}
+
+
+def test_agent_awaits_async_client_and_runs_tools(monkeypatch) -> None:
+    chat = _Chat()
+    monkeypatch.setattr(mistral_client, "get_mistral_client", lambda: type("M", (), {"chat": chat})())
+
+    async def get_org(org_id):
+        return {"plan": "pro"}
+
+    async def run_tool(org_id, name, args):
+        assert (org_id, name) == ("org-1", "get_flagged_receipts")
+        return json.dumps([])
+
+    monkeypatch.setattr(chat_agent, "get_org", get_org)
+    monkeypatch.setattr(chat_agent, "run_tool", run_tool)
+    reply = asyncio.run(chat_agent.run_agent("org-1", [{"role": "user", "content": "anything flagged?"}]))
+    assert reply == "Nothing flagged." and chat.calls == 2
@@ -0,0 +1,142 @@
+"""Perceptual duplicate detection: retakes hash close, other receipts far apart, stale hits ignored."""
+import asyncio
+import random
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.services import supabase_client
+from app.services.duplicate_index import BKTree, DuplicateIndex, hamming, image_phash, to_hex
+
+
+def _receipt(lines: list[str]) -> Image.Image:
+    font = ImageFont.load_default(size=28)
+    paper = Image.new("L", (600, 60 + 50 * len(lines)), color=245)
+    draw = ImageDraw.Draw(paper)
+    for i, line in enumerate(lines):
+        draw.text((40, 40 + 50 * i), line, fill=20, font=font)
+    return paper
+
+
+def _photo(paper: Image.Image, angle: float, offset: tuple[int, int], quality: int) -> bytes:
+    photo = Image.new("L", (900, paper.height + 300), color=60)
+    photo.paste(paper.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=60), offset)
+    buf = BytesIO()
+    photo.convert("RGB").save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_retake_is_close_and_other_receipt_is_far() -> None:
+    first = _receipt(["GROCERY MART", "Milk        3.49", "Bread       2.99", "Eggs        4.19", "TOTAL      10.67"])
+    other = _receipt(["HARDWARE CO", "Screws      6.00", "Hammer     18.50", "Tape        3.25", "TOTAL      27.75"])
+    original = image_phash(_photo(first, 0, (150, 150), 90))
+    retake = image_phash(_photo(first, 2.5, (120, 170), 60))
+    different = image_phash(_photo(other, 0, (150, 150), 90))
+    assert hamming(original, retake) <= 24
+    assert hamming(original, different) > 40
+
+
+def test_bk_tree_search_matches_brute_force() -> None:
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(256) for _ in range(300)]
+    tree = BKTree()
+    for i, h in enumerate(hashes):
+        tree.add(h, str(i))
+    probe = hashes[42] ^ (1 << 3) ^ (1 << 200)
+    expected = sorted((hamming(probe, h), str(i)) for i, h in enumerate(hashes) if hamming(probe, h) <= 110)
+    assert sorted(tree.search(probe, 110)) == expected
+    assert tree.search(probe, 2)[0] == (2, "42")
+
+
+class _Query:
+    """Just enough of the PostgREST builder for DuplicateIndex: filters on equality and id lists."""
+
+    def __init__(self, rows: list) -> None:
+        self._rows, self._filters = rows, []
+
+    def select(self, *_):
+        return self
+
+    def eq(self, col, value):
+        self._filters.append(lambda r: r.get(col) == value)
+        return self
+
+    def in_(self, col, values):
+        self._filters.append(lambda r: r.get(col) in set(values))
+        return self
+
+    @property
+    def not_(self):
+        return self
+
+    def is_(self, col, _):
+        self._filters.append(lambda r: r.get(col) is not None)
+        return self
+
+    def order(self, *_):
+        return self
+
+    def range(self, *_):
+        return self
+
+    def execute(self):
+        return type("R", (), {"data": [r for r in self._rows if all(f(r) for f in self._filters)]})
+
+
+class _FakeDb:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def table(self, name: str) -> _Query:
+        return _Query(self.rows)
+
+
+def test_retry_and_deleted_receipts_do_not_count_as_duplicates(monkeypatch) -> None:
+    phash = image_phash(_photo(_receipt(["GROCERY MART", "TOTAL 10.67"]), 0, (150, 150), 90))
+    db = _FakeDb([{"id": "r1", "org_id": "org", "batch_id": "b1", "is_deleted": False, "image_phash": to_hex(phash)}])
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    index = DuplicateIndex(ttl_seconds=300)
+    # Retry of b1: its own receipt from the failed attempt is not a duplicate.
+    assert asyncio.run(index.find("org", phash, 8, exclude_batch="b1")) is None
+    assert asyncio.run(index.find("org", phash, 8, exclude_batch="b2")).receipt_id == "r1"
+    # Deleted elsewhere (another worker's retry, soft delete) while the tree still has it.
+    db.rows[0]["is_deleted"] = True
+    assert asyncio.run(index.find("org", phash, 8)) is None
+    assert index.stats()["stale_hits"] == 1 and index.stats()["orgs_loaded"] == 0
+    assert asyncio.run(index.find("org", phash, 8)) is None and index.loads == 2
+
+
+def test_batch_retry_extracts_images_its_failed_attempt_saved(monkeypatch) -> None:
+    from app.config import get_settings
+    from app.services import batch_processor as bp
+
+    content = _photo(_receipt(["GROCERY MART", "TOTAL 10.67"]), 0, (150, 150), 90)
+    phash = image_phash(content)
+    db = _FakeDb([{"id": "r1", "org_id": "org", "batch_id": "b1", "is_deleted": False, "image_phash": to_hex(phash)}])
+    db.storage = type("S", (), {"from_": staticmethod(lambda _: type("B", (), {
+        "download": staticmethod(lambda path: content), "get_public_url": staticmethod(lambda path: path),
+    })())})
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    monkeypatch.setattr(get_settings(), "duplicate_skip_distance", 8)
+    index = DuplicateIndex(ttl_seconds=300)
+    monkeypatch.setattr(bp, "get_duplicate_index", lambda: index)
+    monkeypatch.setattr(bp, "new_structuring_batcher", lambda: None)
+
+    async def inline(fn, *args):
+        return fn(*args)
+
+    async def extract(unit, content, **_):
+        return unit, {"confidence": 0.9}
+
+    async def save(org_id, batch_id, receipts):
+        return {"saved": [{"index": i, "receipt_id": f"new{i}"} for i in range(len(receipts))], "failed": []}
+
+    monkeypatch.setattr(bp, "run_ocr", inline)
+    monkeypatch.setattr(bp, "extract_one", extract)
+    monkeypatch.setattr(bp, "save_receipts_bulk", save)
+    retry = bp._BatchState()
+    asyncio.run(bp._run_pipeline("org", "b1", [("a.jpg", ".jpg")], retry, None))
+    assert retry.saved == 1 and not retry.skipped_duplicates
+    other = bp._BatchState()
+    asyncio.run(bp._run_pipeline("org", "b2", [("a.jpg", ".jpg")], other, None))
+    assert other.saved == 0 and other.skipped_duplicates == [{"index": 0, "duplicate_of": "r1", "distance": 0}]
@@ -0,0 +1,90 @@
+"""Extraction cache: per-org isolation, pipeline versioning and LRU size bound."""
+import asyncio
+import json
+import sqlite3
+from dataclasses import asdict, replace
+
+from app.ocr.base_engine import RawOcrResult
+from app.services.extraction_cache import CacheKey, CachedExtraction, ExtractionCache
+
+
+def _key(org_id: str, image_hash: str) -> CacheKey:
+    return CacheKey(
+        org_id=org_id, image_hash=image_hash, engine="tesseract", language="eng", model="m:v1", pipeline="v3"
+    )
+
+
+def _value(vendor: str) -> CachedExtraction:
+    return CachedExtraction(
+        ocr=RawOcrResult(full_text=vendor, lines=[vendor], engine="tesseract", language="eng"),
+        extraction={"vendor": vendor, "total": 1.5},
+    )
+
+
+def test_hit_is_scoped_to_org(tmp_path) -> None:
+    async def run() -> None:
+        cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=1_000_000)
+        await cache.put(_key("org-a", "h1"), _value("Cafe"))
+        hit = await cache.get(_key("org-a", "h1"))
+        assert hit is not None and hit.extraction["vendor"] == "Cafe" and hit.ocr.lines == ["Cafe"]
+        assert await cache.get(_key("org-b", "h1")) is None
+        await cache.purge_org("org-a")
+        assert await cache.get(_key("org-a", "h1")) is None
+        assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 0}
+
+    asyncio.run(run())
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path) -> None:
+    async def run() -> None:
+        v0 = _value("v0")
+        entry_size = len(json.dumps(asdict(v0.ocr))) + len(json.dumps(v0.extraction))
+        cache = ExtractionCache(str(tmp_path / "cache.db"), max_bytes=entry_size * 2)
+        await cache.put(_key("o", "h0"), _value("v0"))
+        await cache.put(_key("o", "h1"), _value("v1"))
+        await cache.get(_key("o", "h0"))  # h1 is now least recently used
+        await cache.put(_key("o", "h2"), _value("v2"))
+        assert await cache.get(_key("o", "h1")) is None
+        assert await cache.get(_key("o", "h0")) is not None
+        assert await cache.get(_key("o", "h2")) is not None
+
+    asyncio.run(run())
+
+
+def test_pipeline_change_misses_and_size_counter_stays_exact(tmp_path) -> None:
+    path = str(tmp_path / "cache.db")
+
+    def sizes() -> tuple:
+        with sqlite3.connect(path) as conn:
+            return (
+                conn.execute("SELECT total FROM extraction_cache_size").fetchone()[0],
+                conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0],
+            )
+
+    async def run() -> None:
+        cache = ExtractionCache(path, max_bytes=1_000_000)
+        await cache.put(_key("o", "h0"), _value("v0"))
+        assert await cache.get(replace(_key("o", "h0"), pipeline="v4")) is None
+        await cache.put(_key("o", "h0"), _value("a much longer vendor name"))  # overwrite
+        await cache.put(_key("o", "h1"), _value("v1"))
+        total, summed = sizes()
+        assert total == summed > 0
+        await cache.purge_org("o")
+        assert sizes() == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_older_cache_file_is_recreated(tmp_path) -> None:
+    path = str(tmp_path / "cache.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE extraction_cache (org_id TEXT, image_hash TEXT)")
+        conn.execute("INSERT INTO extraction_cache VALUES ('o', 'h0')")
+
+    async def run() -> None:
+        cache = ExtractionCache(path, max_bytes=1_000_000)
+        assert await cache.get(_key("o", "h0")) is None
+        await cache.put(_key("o", "h0"), _value("v0"))
+        assert await cache.get(_key("o", "h0")) is not None
+
+    asyncio.run(run())
@@ -0,0 +1,95 @@
+"""SQLite job queue: leasing, visibility timeout, retries."""
+import asyncio
+
+from app.services.job_queue import SqliteJobQueue
+
+
+def test_lease_is_exclusive_until_completed(tmp_path) -> None:
+    async def run() -> None:
+        q = SqliteJobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+        await q.enqueue("b1", "o1", "u1", [("o1/b1/a.jpg", ".jpg")])
+        job = await q.lease("w1", visibility_timeout=60)
+        assert job is not None and job.batch_id == "b1" and job.attempts == 1
+        assert job.storage_paths == [("o1/b1/a.jpg", ".jpg")]
+        assert await q.lease("w2", visibility_timeout=60) is None
+        await q.complete(job, "w1")
+        assert (await q.stats()) == {"done": 1}
+
+    asyncio.run(run())
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(tmp_path) -> None:
+    async def run() -> None:
+        q = SqliteJobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+        await q.enqueue("b1", "o1", "u1", [])
+        first = await q.lease("w1", visibility_timeout=-1)
+        second = await q.lease("w2", visibility_timeout=60)
+        assert second is not None and second.id == first.id and second.attempts == 2
+        assert not await q.heartbeat(first, "w1", 60)
+
+    asyncio.run(run())
+
+
+def test_failed_job_is_retried_then_dead(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr("app.services.job_queue.retry_delay", lambda attempts: 0)
+
+    async def run() -> None:
+        q = SqliteJobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+        await q.enqueue("b1", "o1", "u1", [])
+        job = await q.lease("w1", visibility_timeout=60)
+        assert await q.fail(job, "w1", "boom") is True
+        job = await q.lease("w1", visibility_timeout=60)
+        assert job.attempts == 2
+        assert await q.fail(job, "w1", "boom") is False
+        assert await q.lease("w1", visibility_timeout=60) is None
+        assert (await q.stats()) == {"dead": 1}
+
+    asyncio.run(run())
+
+
+def test_stale_holder_cannot_complete_or_fail(tmp_path) -> None:
+    async def run() -> None:
+        q = SqliteJobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+        await q.enqueue("b1", "o1", "u1", [])
+        first = await q.lease("w1", visibility_timeout=-1)
+        await q.lease("w2", visibility_timeout=60)
+        assert await q.complete(first, "w1") is False
+        assert await q.fail(first, "w1", "boom") is None
+        assert (await q.stats()) == {"leased": 1}
+
+    asyncio.run(run())
+
+
+def test_worker_cancels_job_when_lease_is_lost(tmp_path, monkeypatch) -> None:
+    from app import worker
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "job_visibility_timeout_seconds", 1)
+    cancelled, batch_updates = [], []
+
+    async def process_batch_bg(*args) -> None:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(args[2])
+            raise
+
+    async def update_batch(batch_id, **kwargs) -> None:
+        batch_updates.append((batch_id, kwargs))
+
+    monkeypatch.setattr(worker, "process_batch_bg", process_batch_bg)
+    monkeypatch.setattr(worker, "update_batch", update_batch)
+
+    async def run() -> None:
+        q = SqliteJobQueue(str(tmp_path / "jobs.db"), max_attempts=3)
+        await q.enqueue("b1", "o1", "u1", [])
+        first = await q.lease("w1", visibility_timeout=60)
+        # Lease expires (e.g. a long GC pause) and another worker takes the job over.
+        await asyncio.to_thread(q._update_held, first.id, "w1", "lease_until = 0", ())
+        await q.lease("w2", visibility_timeout=60)
+        await asyncio.wait_for(worker.run_job(q, first, "w1"), timeout=5)
+        assert cancelled == ["b1"]
+        assert batch_updates == []
+        assert (await q.stats()) == {"leased": 1}
+
+    asyncio.run(run())
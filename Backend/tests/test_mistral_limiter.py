@@ -0,0 +1,72 @@
+"""Mistral call policy: Retry-After, non-retryable errors, token bucket pacing."""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services import mistral_limiter
+from app.services.mistral_limiter import TokenBucket, call_mistral, retry_after_seconds
+
+
+class _ApiError(Exception):
+    def __init__(self, status: int, headers: dict | None = None) -> None:
+        super().__init__(f"HTTP {status}")
+        self.raw_response = httpx.Response(status, headers=headers or {})
+
+
+@pytest.fixture(autouse=True)
+def _fast_bucket(monkeypatch) -> None:
+    monkeypatch.setattr(mistral_limiter, "_bucket", TokenBucket(rate=1000, capacity=1000))
+
+
+def test_429_honours_retry_after_then_succeeds(monkeypatch) -> None:
+    sleeps: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(mistral_limiter.asyncio, "sleep", fake_sleep)
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise _ApiError(429, {"Retry-After": "7"})
+        return "ok"
+
+    assert asyncio.run(call_mistral(call, "mistral_llm")) == "ok"
+    assert calls == 2
+    assert sum(sleeps) == pytest.approx(7, abs=0.1)  # waited once, not backoff + pause
+    assert mistral_limiter._bucket.stats()["throttled"] == 1
+
+
+def test_client_errors_are_not_retried() -> None:
+    calls = 0
+
+    async def call() -> str:
+        nonlocal calls
+        calls += 1
+        raise _ApiError(401)
+
+    with pytest.raises(_ApiError):
+        asyncio.run(call_mistral(call, "mistral_llm"))
+    assert calls == 1
+
+
+def test_retry_after_http_date() -> None:
+    assert retry_after_seconds(httpx.Headers({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(httpx.Headers({})) is None
+
+
+def test_bucket_spaces_requests_beyond_burst() -> None:
+    bucket = TokenBucket(rate=50, capacity=2)
+
+    async def run() -> float:
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(7)))
+        return time.monotonic() - start
+
+    # 2 immediate, then 5 more at 50/s.
+    assert asyncio.run(run()) >= 0.09
@@ -0,0 +1,49 @@
+"""OCR router: accept good Tesseract output, escalate garbage to the fallback."""
+import asyncio
+
+from app.ocr.base_engine import RawOcrResult
+from app.ocr.fallback_engine import FallbackOcrEngine
+from app.ocr.quality import score_ocr
+
+GOOD = RawOcrResult(
+    full_text="CORNER MARKET\nMilk 3.49\nBread 2.99\nTOTAL 6.48",
+    lines=["CORNER MARKET", "Milk 3.49", "Bread 2.99", "TOTAL 6.48"],
+    engine="tesseract",
+    word_confidences=[92, 95, 90, 91, 93, 96, 94],
+)
+GARBAGE = RawOcrResult(
+    full_text="~ |l1 ;;x\n%^ ~~ Zxq",
+    lines=["~ |l1 ;;x", "%^ ~~ Zxq"],
+    engine="tesseract",
+    word_confidences=[12, 20, 8, 15, 10],
+)
+
+
+class _Fixed:
+    def __init__(self, result: RawOcrResult) -> None:
+        self.result = result
+        self.calls = 0
+
+    async def extract_text(self, image_bytes, filename=None) -> RawOcrResult:
+        self.calls += 1
+        return self.result
+
+
+def test_quality_score_separates_clean_text_from_garbage() -> None:
+    assert score_ocr(GOOD).score > 0.8
+    assert score_ocr(GARBAGE).score < 0.4
+
+
+def test_router_accepts_good_output_without_escalating() -> None:
+    fallback = _Fixed(RawOcrResult(full_text="vision", lines=["vision"], engine="mistral_vision"))
+    router = FallbackOcrEngine(_Fixed(GOOD), fallback=fallback, retry=_Fixed(GOOD), accept_score=0.7, escalate_score=0.55)
+    assert asyncio.run(router.extract_text(b"img")) is GOOD
+    assert fallback.calls == 0
+
+
+def test_router_retries_then_escalates_garbage() -> None:
+    retry = _Fixed(GARBAGE)
+    fallback = _Fixed(RawOcrResult(full_text="vision", lines=["vision"], engine="mistral_vision"))
+    router = FallbackOcrEngine(_Fixed(GARBAGE), fallback=fallback, retry=retry, accept_score=0.7, escalate_score=0.55)
+    assert asyncio.run(router.extract_text(b"img")).engine == "mistral_vision"
+    assert retry.calls == 1 and fallback.calls == 1
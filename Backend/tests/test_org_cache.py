@@ -0,0 +1,42 @@
+"""Org lookup cache: TTL expiry, LRU eviction, hit/miss accounting."""
+import asyncio
+import time
+
+from app.services import org_quota
+from app.services.org_quota import LocalTtlCache
+
+
+def test_entries_expire_after_ttl() -> None:
+    cache = LocalTtlCache(ttl_seconds=0.01, max_entries=10)
+    cache.set("org:1", {"id": "1", "plan": "pro"})
+    assert cache.get("org:1") == {"id": "1", "plan": "pro"}
+    time.sleep(0.02)
+    assert cache.get("org:1") is None
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = LocalTtlCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_get_org_hits_cache_until_invalidated(monkeypatch) -> None:
+    calls = []
+
+    async def load(org_id: str) -> dict:
+        calls.append(org_id)
+        return {"id": org_id, "plan": "free"}
+
+    monkeypatch.setattr(org_quota, "_cache", LocalTtlCache(60, 100))
+    monkeypatch.setattr(org_quota, "_load_org", load)
+    asyncio.run(org_quota.get_org("o1"))
+    asyncio.run(org_quota.get_org("o1"))
+    assert calls == ["o1"]
+    asyncio.run(org_quota.invalidate_org("o1"))
+    asyncio.run(org_quota.get_org("o1"))
+    assert calls == ["o1", "o1"]
+    assert asyncio.run(org_quota.cache_stats())["hits"] >= 1
@@ -0,0 +1,70 @@
+"""PDF pages: text layers skip OCR, blank pages are dropped, scans render as raw grayscale."""
+import asyncio
+from io import BytesIO
+
+import fitz
+from PIL import Image, ImageDraw
+
+from app.config import get_settings
+from app.ocr.executor import shutdown_ocr_executor
+from app.services import pdf_extractor
+from app.services.pdf_extractor import PdfPage, PdfPolicy, _render_chunk, iter_pdf_pages
+
+
+def _pdf() -> bytes:
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "CORNER MARKET  Milk 3.49  Bread 2.99  TOTAL 6.48")
+    doc.new_page()  # blank
+    scan = Image.new("L", (400, 300), color=250)
+    ImageDraw.Draw(scan).rectangle((40, 40, 360, 120), fill=10)
+    buf = BytesIO()
+    scan.save(buf, format="PNG")
+    doc.new_page().insert_image(fitz.Rect(0, 0, 400, 300), stream=buf.getvalue())
+    return doc.tobytes()
+
+
+def test_pages_are_classified() -> None:
+    text, blank, image = _render_chunk(_pdf(), 0, 3, dpi=72)
+    assert text.kind == "text" and "TOTAL 6.48" in text.text
+    assert blank.kind == "blank"
+    assert image.kind == "image"
+    decoded = Image.open(BytesIO(image.image))
+    assert decoded.mode == "L" and decoded.size == (595, 842)  # A4 at 72 DPI
+
+
+def test_iterator_skips_blank_pages_and_honours_max_pages() -> None:
+    async def collect(max_pages: int) -> list:
+        return [(p.index, p.kind) async for p in iter_pdf_pages(_pdf(), PdfPolicy(dpi=72, max_pages=max_pages))]
+
+    try:
+        assert asyncio.run(collect(10)) == [(0, "text"), (2, "image")]
+        assert asyncio.run(collect(1)) == [(0, "text")]
+    finally:
+        shutdown_ocr_executor()
+
+
+def test_pages_in_flight_are_bounded_by_queue_depth(monkeypatch) -> None:
+    rendered = consumed = peak = 0
+
+    async def fake_render(pdf_bytes: bytes, start: int, stop: int, dpi: int) -> list:
+        nonlocal rendered, peak
+        rendered += stop - start
+        peak = max(peak, rendered - consumed)
+        await asyncio.sleep(0)
+        return [PdfPage(index=i, kind="text", text="x") for i in range(start, stop)]
+
+    monkeypatch.setattr(pdf_extractor, "_render_scheduled", fake_render)
+    monkeypatch.setattr(pdf_extractor, "_page_count", lambda pdf_bytes: 40)
+    monkeypatch.setattr(pdf_extractor, "ocr_worker_count", lambda: 8)
+    monkeypatch.setattr(get_settings(), "batch_queue_depth", 8)
+
+    async def collect() -> list:
+        nonlocal consumed
+        indexes = []
+        async for page in iter_pdf_pages(b"", PdfPolicy(dpi=72, max_pages=40)):
+            consumed += 1
+            indexes.append(page.index)
+        return indexes
+
+    assert asyncio.run(collect()) == list(range(40))
+    assert 0 < peak <= 8
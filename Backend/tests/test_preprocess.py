@@ -0,0 +1,38 @@
+"""Image preprocessing: crop the background, undo skew, shrink vision payloads."""
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+from app.ocr.preprocess import PreprocessConfig, autocrop_box, estimate_skew, prepare_for_vision, preprocess_image
+
+
+def _paper() -> Image.Image:
+    font = ImageFont.load_default(size=28)
+    paper = Image.new("L", (600, 700), color=245)
+    draw = ImageDraw.Draw(paper)
+    for i in range(12):
+        draw.text((40, 40 + 50 * i), "Coffee beans      12.99", fill=20, font=font)
+    return paper
+
+
+def test_skew_estimate_undoes_rotation() -> None:
+    skewed = _paper().rotate(-3, resample=Image.BICUBIC, expand=True, fillcolor=245)
+    assert estimate_skew(skewed, max_degrees=5) == 3.0
+
+
+def test_autocrop_removes_background_around_receipt() -> None:
+    photo = Image.new("L", (1000, 1100), color=50)
+    photo.paste(_paper(), (150, 220))
+    left, top, right, bottom = autocrop_box(photo)
+    assert abs(left - 150) < 20 and abs(top - 220) < 20
+    assert abs(right - 750) < 20 and abs(bottom - 920) < 20
+    out = preprocess_image(photo.convert("RGB"), PreprocessConfig(target_width=800))
+    assert out.mode == "L" and out.width < 800
+
+
+def test_vision_payload_is_downscaled_jpeg() -> None:
+    buf = BytesIO()
+    Image.new("RGB", (4000, 3000), color=(200, 180, 160)).save(buf, format="PNG")
+    data, mime = prepare_for_vision(buf.getvalue(), max_side=1600)
+    assert mime == "image/jpeg"
+    assert max(Image.open(BytesIO(data)).size) == 1600
@@ -0,0 +1,31 @@
+"""Upload receipt detector: accept text photos, reject blank, smooth and oddly shaped images."""
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from app.services.receipt_detector import validate_receipt_image
+
+
+def _jpeg(img: Image.Image) -> bytes:
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+def test_receipt_photo_is_accepted() -> None:
+    img = Image.new("RGB", (3024, 4032), (90, 80, 70))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((900, 200, 2100, 3800), fill=(240, 238, 230))
+    for i in range(80):
+        draw.text((1000, 260 + 44 * i), f"ITEM {i}      {i * 1.25:.2f}", fill=(20, 20, 20))
+    assert validate_receipt_image(_jpeg(img), "r.jpg") == {"is_receipt": True, "reason": ""}
+
+
+def test_junk_images_are_rejected() -> None:
+    blank = _jpeg(Image.new("RGB", (1000, 1000), (200, 10, 10)))
+    smooth = _jpeg(Image.linear_gradient("L").resize((1000, 1000)))
+    sliver = _jpeg(Image.new("RGB", (300, 4000), (255, 255, 255)))
+    assert "blank" in validate_receipt_image(blank, "a.jpg")["reason"]
+    assert "blurry" in validate_receipt_image(smooth, "b.jpg")["reason"]
+    assert "shape" in validate_receipt_image(sliver, "c.jpg")["reason"]
+    assert not validate_receipt_image(b"not an image", "d.jpg")["is_receipt"]
@@ -0,0 +1,82 @@
+"""Streaming export: keyset chunks from the DB, CSV rows as they come, write-only XLSX."""
+import asyncio
+import io
+import re
+import uuid
+
+from openpyxl import load_workbook
+
+from app.services import receipt_export, supabase_client
+from app.services.receipt_query import ReceiptFilters
+
+
+class _Query:
+    def __init__(self, db: "_FakeDb", table: str) -> None:
+        self._db, self._table, self._after = db, table, None
+
+    def select(self, *_):
+        return self
+
+    def eq(self, *_):
+        return self
+
+    def in_(self, *_):
+        return self
+
+    def order(self, *_, **__):
+        return self
+
+    def range(self, *_):
+        return self
+
+    def or_(self, expr):
+        self._after = re.search(r"id\.lt\.([0-9a-f-]+)", expr).group(1)
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def execute(self):
+        self._db.queries.append(self._table)
+        if self._table == "receipt_items":
+            return type("R", (), {"data": [{"receipt_id": r["id"], "description": "item"} for r in self._db.rows]})
+        rows = self._db.rows
+        if self._after is not None:
+            rows = rows[[r["id"] for r in rows].index(self._after) + 1:]
+        return type("R", (), {"data": rows[: self._limit]})
+
+
+class _FakeDb:
+    def __init__(self, n: int) -> None:
+        self.rows = [
+            {"id": str(uuid.UUID(int=n - i)), "vendor": f"v{i}", "total": i, "created_at": f"2026-01-01T00:00:{i:02d}"}
+            for i in range(n)
+        ]
+        self.queries: list = []
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+
+async def _collect(gen) -> list:
+    return [chunk async for chunk in gen]
+
+
+def test_csv_is_streamed_in_keyset_chunks(monkeypatch) -> None:
+    db = _FakeDb(5)
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    monkeypatch.setattr(receipt_export, "CHUNK_SIZE", 2)
+    chunks = asyncio.run(_collect(receipt_export.stream_csv("org", ReceiptFilters())))
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[0].startswith("id,vendor,date,total") and len(lines) == 6
+    assert [line.split(",")[1] for line in lines[1:]] == ["v0", "v1", "v2", "v3", "v4"]
+    assert len(chunks) == 4 and db.queries == ["receipts"] * 3
+
+
+def test_xlsx_with_items(monkeypatch) -> None:
+    monkeypatch.setattr(supabase_client, "_cached_client", _FakeDb(3))
+    data = b"".join(asyncio.run(_collect(receipt_export.stream_xlsx("org", ReceiptFilters(), include_items=True))))
+    rows = list(load_workbook(io.BytesIO(data), read_only=True).active.iter_rows(values_only=True))
+    assert rows[0][-4:] == ("item_description", "item_quantity", "item_unit_price", "item_subtotal")
+    assert [(r[1], r[-4]) for r in rows[1:]] == [("v0", "item"), ("v1", "item"), ("v2", "item")]
@@ -0,0 +1,44 @@
+"""Keyset paging over receipts: continuation filters, null handling, cursor checks."""
+import uuid
+
+import pytest
+
+from app.services.receipt_query import apply_keyset, page_cursor, parse_cursor
+
+
+class _Query:
+    def __init__(self) -> None:
+        self.calls: list = []
+
+    def or_(self, expr):
+        self.calls.append(("or", expr))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        self.calls.append(("order", column, desc, nullsfirst))
+        return self
+
+
+def test_descending_continues_after_last_row_then_nulls() -> None:
+    q = apply_keyset(_Query(), "total", True, ("12.50", "abc"))
+    assert q.calls == [
+        ("or", 'total.lt."12.50",and(total.eq."12.50",id.lt.abc),total.is.null'),
+        ("order", "total", True, False),
+        ("order", "id", True, None),
+    ]
+    q = apply_keyset(_Query(), "date", True, (None, "abc"))
+    assert q.calls[0] == ("or", "and(date.is.null,id.lt.abc)")
+
+
+def test_ascending_starts_with_nulls() -> None:
+    q = apply_keyset(_Query(), "date", False, (None, "abc"))
+    assert q.calls[0] == ("or", "date.not.is.null,and(date.is.null,id.gt.abc)")
+    assert q.calls[1] == ("order", "date", False, True)
+
+
+def test_cursor_round_trip_and_sort_mismatch() -> None:
+    row = {"id": str(uuid.uuid4()), "created_at": "2026-10-01T12:00:00+00:00"}
+    token = page_cursor(row, "created_at", True)
+    assert parse_cursor(token, "created_at", True) == (row["created_at"], row["id"])
+    with pytest.raises(ValueError):
+        parse_cursor(token, "total", True)
@@ -0,0 +1,45 @@
+"""Ranked receipt search: keyset cursor round-trip through the RPC."""
+import asyncio
+import uuid
+
+import pytest
+
+from app.services import receipt_search, supabase_client
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+class _FakeDb:
+    def __init__(self, rows) -> None:
+        self.rows = rows
+        self.calls: list = []
+
+    def rpc(self, name: str, params: dict):
+        self.calls.append(params)
+        rows = self.rows
+
+        class _Result:
+            data = rows
+
+            def execute(self):
+                return self
+
+        return _Result()
+
+
+def test_full_page_returns_cursor_for_last_row(monkeypatch) -> None:
+    ids = [str(uuid.uuid4()) for _ in range(2)]
+    db = _FakeDb([{"id": ids[0], "score": 0.9}, {"id": ids[1], "score": 0.5}])
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    page = asyncio.run(receipt_search.search_ranked("org", "coffee", limit=2))
+    assert decode_cursor(page["next_cursor"]) == {"s": 0.5, "id": ids[1]}
+    asyncio.run(receipt_search.search_ranked("org", "coffee", limit=2, cursor=page["next_cursor"]))
+    assert (db.calls[1]["p_after_score"], db.calls[1]["p_after_id"]) == (0.5, ids[1])
+    db.rows = db.rows[:1]
+    assert asyncio.run(receipt_search.search_ranked("org", "coffee", limit=2))["next_cursor"] is None
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", encode_cursor({"s": 1}), encode_cursor({"s": 1, "id": "x"})])
+def test_malformed_cursor_is_rejected(monkeypatch, token: str) -> None:
+    monkeypatch.setattr(supabase_client, "_cached_client", _FakeDb([]))
+    with pytest.raises(ValueError):
+        asyncio.run(receipt_search.search_ranked("org", "coffee", cursor=token))
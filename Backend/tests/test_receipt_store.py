@@ -0,0 +1,65 @@
+"""Bulk receipt persistence: few multi-row inserts, per-row failure isolation."""
+import asyncio
+
+from app.services import receipt_store, supabase_client
+
+
+class _Query:
+    def __init__(self, db: "_FakeDb", table: str) -> None:
+        self._db, self._table, self._op = db, table, None
+
+    def insert(self, rows):
+        self._op = ("insert", rows if isinstance(rows, list) else [rows])
+        return self
+
+    def delete(self):
+        self._op = ("delete", None)
+        return self
+
+    def in_(self, col, values):
+        self._op = ("delete", set(values))
+        return self
+
+    def execute(self):
+        kind, payload = self._op
+        self._db.calls.append((self._table, kind, len(payload)))
+        if kind == "insert":
+            if any(r.get("vendor") == "BAD" for r in payload):
+                raise ValueError("invalid input syntax")
+            self._db.rows.setdefault(self._table, []).extend(payload)
+        else:
+            self._db.rows[self._table] = [r for r in self._db.rows.get(self._table, []) if r["id"] not in payload]
+        return None
+
+
+class _FakeDb:
+    def __init__(self) -> None:
+        self.calls: list = []
+        self.rows: dict = {}
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+
+def _receipt(vendor: str) -> dict:
+    items = [{"description": f"item {n}", "quantity": 1, "unit_price": 1, "subtotal": 1} for n in range(3)]
+    return {"image_url": "", "data": {"vendor": vendor, "total": 3, "items": items}, "needs_review": False}
+
+
+def test_bulk_save_uses_multi_row_inserts(monkeypatch) -> None:
+    db = _FakeDb()
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    result = asyncio.run(receipt_store.save_receipts_bulk("org", "batch", [_receipt(f"v{i}") for i in range(20)]))
+    assert len(result["saved"]) == 20 and not result["failed"]
+    assert db.calls == [("receipts", "insert", 20), ("receipt_items", "insert", 60)]
+
+
+def test_bulk_save_reports_bad_row_without_aborting(monkeypatch) -> None:
+    db = _FakeDb()
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    batch = [_receipt("a"), _receipt("BAD"), _receipt("c")]
+    result = asyncio.run(receipt_store.save_receipts_bulk("org", "batch", batch))
+    assert [s["index"] for s in result["saved"]] == [0, 2]
+    assert [f["index"] for f in result["failed"]] == [1]
+    assert {r["vendor"] for r in db.rows["receipts"]} == {"a", "c"}
+    assert len(db.rows["receipt_items"]) == 6
@@ -0,0 +1,62 @@
+"""Chat agent tools: one RPC per call, aggregation and filtering done in Postgres."""
+import asyncio
+import json
+
+from app.services import receipt_tools, supabase_client
+
+
+class _Rpc:
+    def __init__(self, data) -> None:
+        self.data = data
+
+    def execute(self):
+        return self
+
+
+class _FakeDb:
+    def __init__(self, data) -> None:
+        self.data = data
+        self.calls: list = []
+
+    def rpc(self, name: str, params: dict) -> _Rpc:
+        self.calls.append((name, params))
+        return _Rpc(self.data)
+
+    def table(self, name: str):
+        raise AssertionError("tools must not select raw receipt rows")
+
+
+def test_spending_summary_is_one_rpc(monkeypatch) -> None:
+    db = _FakeDb({
+        "total_spend": "42.50", "receipt_count": 3, "by_category": {"Meals": 42.5},
+        "date_from": "2026-01-01", "date_to": None,
+    })
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    out = json.loads(asyncio.run(receipt_tools.run_tool("org", "get_spending_summary", {"date_from": "2026-01-01"})))
+    assert out["total_spend"] == 42.5 and out["by_category"] == {"Meals": 42.5} and out["by_vendor"] == {}
+    assert out["total_tax"] == 0.0 and out["by_currency"] == {}
+    assert (out["date_from"], out["date_to"]) == ("2026-01-01", None)
+    assert db.calls == [("receipt_spend_summary", {"p_org_id": "org", "p_date_from": "2026-01-01", "p_date_to": None})]
+
+
+def test_text_search_uses_ranked_engine_with_filters(monkeypatch) -> None:
+    db = _FakeDb([])
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    args = {"query": " starbuks ", "min_total": "20", "category": "50%"}
+    assert asyncio.run(receipt_tools.run_tool("org", "search_receipts", args)) == "No receipts matched."
+    name, params = db.calls[0]
+    assert name == "search_receipts_ranked"
+    assert params["p_query"] == "starbuks" and params["p_min_total"] == 20.0 and params["p_category"] == "50\\%"
+    bad = asyncio.run(receipt_tools.run_tool("org", "search_receipts", {"query": "x", "date_from": "last month"}))
+    assert bad == "Invalid date; use YYYY-MM-DD." and len(db.calls) == 1
+    for name, amount in (("search_receipts", "$50"), ("audit_high_spend", "nan")):
+        bad = asyncio.run(receipt_tools.run_tool("org", name, {"min_total": amount}))
+        assert bad.startswith("Invalid amount") and len(db.calls) == 1
+
+
+def test_filter_only_search_skips_text_ranking(monkeypatch) -> None:
+    db = _FakeDb([{"id": "r1"}])
+    monkeypatch.setattr(supabase_client, "_cached_client", db)
+    out = asyncio.run(receipt_tools.run_tool("org", "search_receipts", {"query": "", "max_total": 5}))
+    assert json.loads(out) == [{"id": "r1"}]
+    assert db.calls[0][0] == "search_receipts_filtered" and db.calls[0][1]["p_max_total"] == 5.0
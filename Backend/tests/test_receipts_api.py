@@ -16,3 +16,8 @@ def test_receipts_list_with_invalid_token_returns_401(client: TestClient) -> Non
 def test_receipts_list_with_empty_bearer_returns_401(client: TestClient) -> None:
     r = client.get("/receipts", headers={"Authorization": "Bearer "})
     assert r.status_code == 401
+
+
+def test_receipts_search_without_auth_returns_401(client: TestClient) -> None:
+    r = client.get("/receipts/search", params={"q": "coffee"})
+    assert r.status_code == 401
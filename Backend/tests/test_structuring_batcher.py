@@ -0,0 +1,53 @@
+"""Structuring batcher: one request per group, single-call fallback for bad items."""
+import asyncio
+
+from app.models.receipt import ReceiptExtraction
+from app.ocr.base_engine import RawOcrResult
+from app.pipeline import structuring_batcher
+from app.pipeline.structuring_batcher import StructuringBatcher
+
+
+def _ocr(text: str) -> RawOcrResult:
+    return RawOcrResult(full_text=text, lines=[text], engine="tesseract")
+
+
+def _ext(vendor: str) -> ReceiptExtraction:
+    return ReceiptExtraction(vendor=vendor, items=[], subtotal=1, tax=0, total=1, category="Other", confidence=0.9)
+
+
+def test_group_is_sent_once_and_invalid_items_fall_back(monkeypatch) -> None:
+    batched: list[list[str]] = []
+    singles: list[str] = []
+
+    async def fake_many(ocrs):
+        batched.append([o.full_text for o in ocrs])
+        return [None if o.full_text == "bad" else _ext(o.full_text) for o in ocrs]
+
+    async def fake_single(ocr):
+        singles.append(ocr.full_text)
+        return _ext(ocr.full_text + "!")
+
+    monkeypatch.setattr(structuring_batcher, "structure_many_with_mistral", fake_many)
+    monkeypatch.setattr(structuring_batcher, "structure_with_mistral", fake_single)
+
+    async def run() -> list[str]:
+        batcher = StructuringBatcher(max_items=3, token_budget=10_000, linger_seconds=5)
+        out = await asyncio.gather(*(batcher.structure(_ocr(t)) for t in ("a", "bad", "c")))
+        assert batcher.stats() == {"requests": 1, "receipts": 3, "fallbacks": 1}
+        return [e.vendor for e in out]
+
+    assert asyncio.run(run()) == ["a", "bad!", "c"]
+    assert batched == [["a", "bad", "c"]] and singles == ["bad"]
+
+
+def test_partial_group_is_flushed_after_linger(monkeypatch) -> None:
+    async def fake_single(ocr):
+        return _ext(ocr.full_text)
+
+    monkeypatch.setattr(structuring_batcher, "structure_with_mistral", fake_single)
+
+    async def run() -> str:
+        batcher = StructuringBatcher(max_items=8, token_budget=10_000, linger_seconds=0.01)
+        return (await asyncio.wait_for(batcher.structure(_ocr("solo")), timeout=1)).vendor
+
+    assert asyncio.run(run()) == "solo"
@@ -0,0 +1,42 @@
+"""Rule-based fast-path structurer: accept only receipts whose arithmetic reconciles."""
+from datetime import date
+
+from app.ocr.base_engine import RawOcrResult
+from app.pipeline.structuring_rules import parse_receipt, structure_with_rules
+
+
+def _ocr(lines: list[str]) -> RawOcrResult:
+    return RawOcrResult(full_text="\n".join(lines), lines=lines, engine="tesseract")
+
+
+def test_clean_receipt_is_parsed_without_llm() -> None:
+    ext = structure_with_rules(
+        _ocr([
+            "BLUE BOTTLE CAFE",
+            "03/22/2024",
+            "2 x 4.50 Latte     9.00",
+            "Croissant          3.75",
+            "Subtotal          12.75",
+            "Sales Tax          1.02",
+            "Total             13.77",
+            "Cash              20.00",
+        ]),
+        min_confidence=0.9,
+    )
+    assert ext is not None
+    assert (ext.vendor, ext.date, ext.total, ext.tax, ext.category) == ("BLUE BOTTLE CAFE", date(2024, 3, 22), 13.77, 1.02, "Dining")
+    assert [(i.description, i.quantity, i.unit_price) for i in ext.items] == [("Latte", 2.0, 4.5), ("Croissant", 1.0, 3.75)]
+
+
+def test_totals_that_do_not_reconcile_fall_back() -> None:
+    lines = ["SUPER MART", "2024-03-01", "Apples  3.20", "Oranges  4.10", "TOTAL  9.99"]
+    assert parse_receipt(_ocr(lines)) is None
+
+
+def test_ambiguous_date_falls_back() -> None:
+    lines = ["SUPER MART", "03/04/2025", "Apples  3.20", "Oranges  4.10", "TOTAL  7.30"]
+    ext = parse_receipt(_ocr(lines))
+    assert ext is not None and ext.confidence < 0.9
+    assert structure_with_rules(_ocr(lines), min_confidence=0.9) is None
+    unambiguous = ["SUPER MART", "2025-03-04", "Apples  3.20", "Oranges  4.10", "TOTAL  7.30"]
+    assert structure_with_rules(_ocr(unambiguous), min_confidence=0.9) is not None
@@ -5,3 +5,9 @@ from fastapi.testclient import TestClient
 def test_upload_without_auth_returns_401(client: TestClient) -> None:
     r = client.post("/upload", files=[("files", ("x.jpg", b"fake", "image/jpeg"))])
     assert r.status_code == 401
+
+
+def test_upload_session_endpoints_require_auth(client: TestClient) -> None:
+    assert client.post("/upload/sessions").status_code == 401
+    r = client.put("/upload/sessions/abc/files/f1/parts/1", content=b"x", headers={"X-Content-SHA256": "0" * 64})
+    assert r.status_code == 401
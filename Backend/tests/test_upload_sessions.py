@@ -0,0 +1,384 @@
+"""Resumable upload sessions against an in-memory table/bucket: idempotency, conflicts, commit, sweeping."""
+import asyncio
+import hashlib
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.middleware import auth, quota
+from app.routes import upload_sessions as routes
+from app.services import supabase_client
+from app.services.upload_sessions import sweep_expired_sessions
+
+ORG = "org-1"
+AUTH = {"Authorization": "Bearer test"}
+
+
+def _split(expr: str) -> list:
+    parts, depth, cur = [], 0, ""
+    for ch in expr:
+        depth += ch == "("
+        depth -= ch == ")"
+        if ch == "," and depth == 0:
+            parts.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    return parts + [cur]
+
+
+def _matches(row: dict, cond: str) -> bool:
+    """Tiny evaluator for the PostgREST or=(...) expressions the service builds."""
+    group = re.fullmatch(r"(and|or)\((.*)\)", cond)
+    if group:
+        results = [_matches(row, c) for c in _split(group.group(2))]
+        return all(results) if group.group(1) == "and" else any(results)
+    col, op, value = cond.split(".", 2)
+    value = value.strip('"')
+    if op == "is":
+        return row.get(col) is None
+    if op in ("eq", "neq"):
+        return (str(row.get(col)) == value) == (op == "eq")
+    return row.get(col) is not None and row[col] < value
+
+
+class _Query:
+    def __init__(self, db: "_FakeDb", table: str) -> None:
+        self._db, self._table = db, table
+        self._filters: list = []
+        self._op, self._payload, self._limit, self._offset = "select", None, None, 0
+
+    def select(self, *_, **__):
+        return self
+
+    def insert(self, row):
+        self._op, self._payload = "insert", row
+        return self
+
+    def upsert(self, row, on_conflict: str, ignore_duplicates: bool = False):
+        self._op, self._payload, self._keys = "upsert", row, on_conflict.split(",")
+        return self
+
+    def update(self, fields):
+        self._op, self._payload = "update", fields
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def eq(self, col, value):
+        self._filters.append(lambda r: r.get(col) == value)
+        return self
+
+    def neq(self, col, value):
+        self._filters.append(lambda r: r.get(col) != value)
+        return self
+
+    def lt(self, col, value):
+        self._filters.append(lambda r: r.get(col) is not None and r[col] < value)
+        return self
+
+    def or_(self, expr):
+        self._filters.append(lambda r: any(_matches(r, c) for c in _split(expr)))
+        return self
+
+    def order(self, *_, **__):
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def range(self, start, end):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def execute(self):
+        rows = self._db.tables.setdefault(self._table, [])
+        if self._op == "insert":
+            row = {"id": str(uuid.uuid4()), "status": "open", "batch_id": None, "commit_deadline": None, **self._payload}
+            rows.append(row)
+            return type("R", (), {"data": [dict(row)]})
+        if self._op == "upsert":
+            key = tuple(self._payload[k] for k in self._keys)
+            if any(tuple(r[k] for k in self._keys) == key for r in rows):
+                return type("R", (), {"data": []})
+            rows.append({"created_at": datetime.now(timezone.utc).isoformat(), **self._payload})
+            return type("R", (), {"data": [dict(self._payload)]})
+        hits = [r for r in rows if all(f(r) for f in self._filters)]
+        hits = hits[self._offset:][: self._limit]
+        if self._op == "update":
+            for r in hits:
+                r.update(self._payload)
+        elif self._op == "delete":
+            self._db.tables[self._table] = [r for r in rows if r not in hits]
+            if self._table == "upload_sessions":
+                gone = {r["id"] for r in hits}
+                for child in ("upload_session_files", "upload_session_parts"):
+                    self._db.tables[child] = [r for r in self._db.tables.get(child, []) if r["session_id"] not in gone]
+        return type("R", (), {"data": [dict(r) for r in hits]})
+
+
+class _Bucket:
+    def __init__(self) -> None:
+        self.objects: dict = {}
+        self.broken: set = set()
+
+    def upload(self, path, data, options=None):
+        self.objects[path] = bytes(data)
+
+    def download(self, path):
+        return self.objects[path]
+
+    def remove(self, paths):
+        if any(p in self.broken for p in paths):
+            raise RuntimeError("storage unavailable")
+        for p in paths:
+            self.objects.pop(p, None)
+
+    def list(self, folder, options=None):
+        prefix = folder.rstrip("/") + "/"
+        return [{"name": p[len(prefix):]} for p in sorted(self.objects) if p.startswith(prefix)][: options["limit"]]
+
+
+class _FakeDb:
+    def __init__(self) -> None:
+        self.tables: dict = {}
+        self.bucket = _Bucket()
+        self.storage = type("S", (), {"from_": lambda _, name: self.bucket})()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict):
+        assert name == "put_upload_session_part"
+        db = self
+
+        class _Call:
+            def execute(self):
+                if db.session(params["p_session_id"])["status"] != "open":
+                    return type("R", (), {"data": None})
+                row = {k[2:]: v for k, v in params.items()}
+                db.table("upload_session_parts").upsert(row, on_conflict="session_id,file_id,part_number").execute()
+                stored = next(
+                    p for p in db.tables["upload_session_parts"]
+                    if (p["session_id"], p["file_id"], p["part_number"]) == (row["session_id"], row["file_id"], row["part_number"])
+                )
+                return type("R", (), {"data": stored["sha256"]})
+
+        return _Call()
+
+    def session(self, session_id: str) -> dict:
+        return next(r for r in self.tables["upload_sessions"] if r["id"] == session_id)
+
+    def session_objects(self) -> list:
+        return [p for p in self.bucket.objects if "/sessions/" in p]
+
+
+@pytest.fixture
+def db(monkeypatch) -> _FakeDb:
+    fake = _FakeDb()
+    monkeypatch.setattr(supabase_client, "_cached_client", fake)
+
+    async def verify_token(token):
+        return "user-1"
+
+    async def get_user_org_id(user_id):
+        return ORG
+
+    async def get_org(org_id):
+        return {"plan": "free"}
+
+    monkeypatch.setattr(auth, "verify_token", verify_token)
+    monkeypatch.setattr(auth, "get_user_org_id", get_user_org_id)
+    monkeypatch.setattr(quota, "get_org", get_org)
+    return fake
+
+
+@pytest.fixture
+def batches(monkeypatch) -> list:
+    started = []
+
+    async def check_content(content, filename, ext):
+        return None
+
+    async def start_batch(background_tasks, org_id, user_id, batch_id, storage_paths, total_files):
+        started.append((batch_id, storage_paths))
+        return "queued"
+
+    monkeypatch.setattr(routes, "check_content", check_content)
+    monkeypatch.setattr(routes, "start_batch", start_batch)
+    return started
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _declare(client: TestClient, session_id: str, content: bytes, parts: int, file_id: str = "f1"):
+    body = {"filename": "r.jpg", "size_bytes": len(content), "sha256": _sha(content), "part_count": parts}
+    return client.put(f"/upload/sessions/{session_id}/files/{file_id}", json=body, headers=AUTH)
+
+
+def _put(client: TestClient, session_id: str, n: int, data: bytes, file_id: str = "f1"):
+    headers = {**AUTH, "X-Content-SHA256": _sha(data)}
+    return client.put(f"/upload/sessions/{session_id}/files/{file_id}/parts/{n}", content=data, headers=headers)
+
+
+def _upload(client: TestClient, parts: list) -> str:
+    session_id = client.post("/upload/sessions", headers=AUTH).json()["session_id"]
+    assert _declare(client, session_id, b"".join(parts), len(parts)).status_code == 200
+    for n, data in enumerate(parts, start=1):
+        assert _put(client, session_id, n, data).json()["status"] == "stored"
+    return session_id
+
+
+def test_declare_and_parts_are_idempotent(client: TestClient, db: _FakeDb) -> None:
+    session_id = client.post("/upload/sessions", headers=AUTH).json()["session_id"]
+    assert _declare(client, session_id, b"abcdef", 2).status_code == 200
+    assert _declare(client, session_id, b"abcdef", 2).status_code == 200
+    assert _declare(client, session_id, b"abcxyz", 2).status_code == 409
+
+    assert _put(client, session_id, 1, b"abc").json()["status"] == "stored"
+    assert _put(client, session_id, 1, b"abc").json()["status"] == "exists"
+    assert _put(client, session_id, 1, b"xyz").status_code == 409
+    assert len(db.session_objects()) == 1
+
+    state = client.get(f"/upload/sessions/{session_id}", headers=AUTH).json()
+    assert state["files"][0]["received_parts"] == [1] and not state["files"][0]["complete"]
+
+
+def test_commit_with_missing_parts_returns_409(client: TestClient, db: _FakeDb, batches: list) -> None:
+    session_id = client.post("/upload/sessions", headers=AUTH).json()["session_id"]
+    _declare(client, session_id, b"abcdef", 3)
+    _put(client, session_id, 2, b"cd")
+    r = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH)
+    assert r.status_code == 409
+    assert r.json()["detail"]["missing_parts"] == {"f1": [1, 3]}
+    assert db.session(session_id)["status"] == "open" and batches == []
+
+
+def test_commit_discards_file_whose_parts_do_not_match(client: TestClient, db: _FakeDb, batches: list) -> None:
+    session_id = client.post("/upload/sessions", headers=AUTH).json()["session_id"]
+    _declare(client, session_id, b"abcdef", 2)
+    _put(client, session_id, 1, b"abc")
+    _put(client, session_id, 2, b"xyz")  # each part checks out, the assembled file does not
+    r = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH)
+    assert r.status_code == 422
+    assert db.session_objects() == [] and batches == []
+    assert db.session(session_id)["status"] == "open"
+    assert client.get(f"/upload/sessions/{session_id}", headers=AUTH).json()["files"][0]["received_parts"] == []
+    # The client re-sends the parts and commits again.
+    _put(client, session_id, 2, b"def")
+    _put(client, session_id, 1, b"abc")
+    assert client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH).status_code == 200
+
+
+def test_commit_is_idempotent(client: TestClient, db: _FakeDb, batches: list) -> None:
+    session_id = _upload(client, [b"abc", b"def"])
+    first = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH).json()
+    again = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH).json()
+    assert first["status"] == "queued" and again["status"] == "committed"
+    assert again["batch_id"] == first["batch_id"] == batches[0][0] and len(batches) == 1
+    (path, ext), = batches[0][1]
+    assert db.bucket.objects[path] == b"abcdef" and ext == ".jpg"
+    assert db.session_objects() == []
+
+
+def test_stale_commit_can_be_taken_over(client: TestClient, db: _FakeDb, batches: list) -> None:
+    session_id = _upload(client, [b"abc"])
+    row = db.session(session_id)
+    row["status"] = "committing"
+    row["commit_deadline"] = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+    assert client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH).status_code == 409
+
+    row["commit_deadline"] = (datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()
+    r = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH)
+    assert r.status_code == 200 and len(batches) == 1
+    assert db.session(session_id)["status"] == "committed"
+
+
+def _take_over(db: _FakeDb, session_id: str) -> None:
+    db.session(session_id)["commit_deadline"] = (datetime.now(timezone.utc) + timedelta(minutes=10)).isoformat() + "x"
+
+
+def test_commit_taken_over_before_its_batch_is_created(client, db, batches, monkeypatch) -> None:
+    session_id = _upload(client, [b"abc"])
+
+    async def slow_check(content, filename, ext):
+        _take_over(db, session_id)  # assembly outlived the deadline and another commit took over
+        return None
+
+    monkeypatch.setattr(routes, "check_content", slow_check)
+    r = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH)
+    assert r.status_code == 409 and batches == []
+    assert list(db.bucket.objects) == db.session_objects() == [f"{ORG}/sessions/{session_id}/f1/00001"]
+    assert db.session(session_id)["status"] == "committing"
+
+
+def test_commit_taken_over_after_its_batch_was_started(client, db, batches, monkeypatch) -> None:
+    session_id = _upload(client, [b"abc"])
+    failed = []
+
+    async def start_batch(background_tasks, org_id, user_id, batch_id, storage_paths, total_files):
+        batches.append((batch_id, storage_paths))
+        _take_over(db, session_id)
+        return "queued"
+
+    async def update_batch(batch_id, **kwargs):
+        failed.append((batch_id, kwargs))
+
+    monkeypatch.setattr(routes, "start_batch", start_batch)
+    monkeypatch.setattr(routes, "update_batch", update_batch)
+    r = client.post(f"/upload/sessions/{session_id}/commit", headers=AUTH)
+    assert r.status_code == 409
+    assert failed == [(batches[0][0], {"status": "failed"})]
+    # Its stored file is removed; the parts stay for the commit that owns the session now.
+    assert list(db.bucket.objects) == db.session_objects() == [f"{ORG}/sessions/{session_id}/f1/00001"]
+
+
+def test_part_sent_once_a_commit_started_is_rejected(client: TestClient, db: _FakeDb) -> None:
+    session_id = client.post("/upload/sessions", headers=AUTH).json()["session_id"]
+    _declare(client, session_id, b"abcdef", 2)
+
+    async def run() -> None:
+        from app.services import upload_sessions as sessions
+
+        # The route saw the session open, then a commit started before the part was recorded.
+        db.session(session_id)["status"] = "committing"
+        await sessions.put_part(ORG, session_id, "f1", 1, b"abc", _sha(b"abc"))
+
+    with pytest.raises(Exception, match="no longer open"):
+        asyncio.run(run())
+    assert db.session_objects() == [] and not db.tables.get("upload_session_parts")
+
+
+def test_sweep_removes_expired_sessions_and_their_objects(client: TestClient, db: _FakeDb, batches: list) -> None:
+    expired = _upload(client, [b"abc", b"def"])
+    live = _upload(client, [b"ghi"])
+    committed = _upload(client, [b"jkl"])
+    client.post(f"/upload/sessions/{committed}/commit", headers=AUTH)
+    # A part whose object was written but whose row was not, and one left on the committed session.
+    db.bucket.upload(f"{ORG}/sessions/{expired}/f1/00003", b"orphan")
+    db.bucket.upload(f"{ORG}/sessions/{committed}/f1/00001", b"jkl")
+    past = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    db.session(expired)["expires_at"] = db.session(committed)["expires_at"] = past
+
+    assert asyncio.run(sweep_expired_sessions()) == 2
+    assert {r["id"] for r in db.tables["upload_sessions"]} == {live}
+    assert {r["session_id"] for r in db.tables["upload_session_parts"]} == {live}
+    assert db.session_objects() == [f"{ORG}/sessions/{live}/f1/00001"]
+
+
+def test_sweep_continues_past_sessions_it_cannot_remove(client: TestClient, db: _FakeDb) -> None:
+    ids = [_upload(client, [bytes([65 + i])]) for i in range(3)]
+    for sid in ids:
+        db.session(sid)["expires_at"] = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    db.bucket.broken.add(f"{ORG}/sessions/{ids[0]}/f1/00001")
+
+    assert asyncio.run(sweep_expired_sessions(page_size=1)) == 2
+    assert [r["id"] for r in db.tables["upload_sessions"]] == [ids[0]]
@@ -0,0 +1,55 @@
+-- Durable batch extraction queue consumed by `python -m app.worker`.
+-- Backend uses the service role (bypasses RLS); RLS is enabled with no policies so clients cannot read it.
+
+ALTER TABLE batches DROP CONSTRAINT IF EXISTS batches_status_check;
+ALTER TABLE batches ADD CONSTRAINT batches_status_check
+  CHECK (status IN ('pending', 'queued', 'processing', 'done', 'partial', 'failed'));
+
+CREATE TABLE extraction_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  batch_id UUID NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+  org_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  storage_paths JSONB NOT NULL,
+  status TEXT NOT NULL CHECK (status IN ('queued', 'leased', 'done', 'dead')) DEFAULT 'queued',
+  attempts INT NOT NULL DEFAULT 0,
+  max_attempts INT NOT NULL DEFAULT 3,
+  available_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  lease_until TIMESTAMPTZ,
+  worker_id TEXT,
+  last_error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_extraction_jobs_runnable ON extraction_jobs(available_at) WHERE status = 'queued';
+CREATE INDEX idx_extraction_jobs_lease ON extraction_jobs(lease_until) WHERE status = 'leased';
+CREATE INDEX idx_extraction_jobs_batch_id ON extraction_jobs(batch_id);
+
+ALTER TABLE extraction_jobs ENABLE ROW LEVEL SECURITY;
+
+-- Claim the next runnable job: queued and due, or leased with an expired visibility timeout.
+-- SKIP LOCKED lets many workers poll concurrently without blocking each other.
+CREATE OR REPLACE FUNCTION lease_extraction_job(p_worker_id TEXT, p_visibility_seconds INT)
+RETURNS SETOF extraction_jobs AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE extraction_jobs j
+  SET status = 'leased',
+      worker_id = p_worker_id,
+      attempts = j.attempts + 1,
+      lease_until = NOW() + make_interval(secs => p_visibility_seconds),
+      updated_at = NOW()
+  WHERE j.id = (
+    SELECT c.id FROM extraction_jobs c
+    WHERE (c.status = 'queued' AND c.available_at <= NOW())
+       OR (c.status = 'leased' AND c.lease_until < NOW())
+    ORDER BY c.available_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING j.*;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION lease_extraction_job(TEXT, INT) FROM PUBLIC, anon, authenticated;
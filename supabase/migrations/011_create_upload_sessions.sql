@@ -0,0 +1,79 @@
+-- Resumable upload sessions (POST /upload/sessions): files arrive as independently
+-- uploaded parts, then the session is committed into a batch.
+-- Backend uses the service role (bypasses RLS); RLS is enabled with no policies so clients cannot read it.
+
+CREATE TABLE upload_sessions (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  org_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  status TEXT NOT NULL CHECK (status IN ('open', 'committing', 'committed')) DEFAULT 'open',
+  batch_id UUID REFERENCES batches(id) ON DELETE SET NULL,
+  -- A commit holds the session until this passes; then another commit may take it over.
+  commit_deadline TIMESTAMPTZ,
+  expires_at TIMESTAMPTZ NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_upload_sessions_org_id ON upload_sessions(org_id);
+CREATE INDEX idx_upload_sessions_expires_at ON upload_sessions(expires_at);
+
+-- One row per file; file_id is chosen by the client so re-declaring a file is idempotent.
+CREATE TABLE upload_session_files (
+  session_id UUID NOT NULL REFERENCES upload_sessions(id) ON DELETE CASCADE,
+  file_id TEXT NOT NULL,
+  filename TEXT NOT NULL,
+  ext TEXT NOT NULL,
+  size_bytes BIGINT NOT NULL,
+  sha256 TEXT NOT NULL,
+  part_count INT NOT NULL CHECK (part_count > 0),
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (session_id, file_id)
+);
+
+-- Parts already stored (in the receipts bucket under {org_id}/sessions/{session_id}/).
+CREATE TABLE upload_session_parts (
+  session_id UUID NOT NULL,
+  file_id TEXT NOT NULL,
+  part_number INT NOT NULL CHECK (part_number >= 1),
+  size_bytes BIGINT NOT NULL,
+  sha256 TEXT NOT NULL,
+  storage_path TEXT NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (session_id, file_id, part_number),
+  FOREIGN KEY (session_id, file_id) REFERENCES upload_session_files(session_id, file_id) ON DELETE CASCADE
+);
+
+-- Record a stored part only while its session is open; returns the sha256 now stored for the part,
+-- or NULL if the session is no longer open. The row lock makes this atomic with a commit starting
+-- (begin_commit's UPDATE waits for it, and a part arriving after that sees the new status).
+CREATE OR REPLACE FUNCTION put_upload_session_part(
+  p_session_id UUID,
+  p_file_id TEXT,
+  p_part_number INT,
+  p_size_bytes BIGINT,
+  p_sha256 TEXT,
+  p_storage_path TEXT
+)
+RETURNS TEXT AS $$
+DECLARE
+  stored TEXT;
+BEGIN
+  PERFORM 1 FROM upload_sessions WHERE id = p_session_id AND status = 'open' FOR SHARE;
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+  INSERT INTO upload_session_parts (session_id, file_id, part_number, size_bytes, sha256, storage_path)
+  VALUES (p_session_id, p_file_id, p_part_number, p_size_bytes, p_sha256, p_storage_path)
+  ON CONFLICT (session_id, file_id, part_number) DO NOTHING;
+  SELECT sha256 INTO stored FROM upload_session_parts
+  WHERE session_id = p_session_id AND file_id = p_file_id AND part_number = p_part_number;
+  RETURN stored;
+END;
+$$ LANGUAGE plpgsql;
+
+REVOKE EXECUTE ON FUNCTION put_upload_session_part(UUID, TEXT, INT, BIGINT, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+
+ALTER TABLE upload_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE upload_session_files ENABLE ROW LEVEL SECURITY;
+ALTER TABLE upload_session_parts ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,12 @@
+-- Perceptual hash of each receipt image (64 hex chars, app.services.duplicate_index) and the
+-- earlier receipt it closely matched, if any; near-duplicates are saved with needs_review.
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS image_phash TEXT;
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES receipts(id) ON DELETE SET NULL;
+
+-- The backend loads an org's hashes into an in-memory index.
+CREATE INDEX IF NOT EXISTS idx_receipts_org_phash ON receipts(org_id, created_at)
+  WHERE image_phash IS NOT NULL AND is_deleted = FALSE;
+
+-- Images a batch did not extract because they nearly match an earlier receipt
+-- (DUPLICATE_SKIP_DISTANCE): [{"index": file index, "duplicate_of": receipt id, "distance": bits}].
+ALTER TABLE batches ADD COLUMN IF NOT EXISTS skipped_duplicates JSONB NOT NULL DEFAULT '[]'::jsonb;
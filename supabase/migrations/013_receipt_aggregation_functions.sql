@@ -0,0 +1,36 @@
+-- Filtered search for the chat agent tools (app.services.receipt_tools), computed in Postgres so a
+-- tool call returns a few rows instead of the org's whole history. The spend summary
+-- (receipt_spend_summary) is defined with the rollups in migration 014.
+
+CREATE INDEX IF NOT EXISTS idx_receipts_org_date ON receipts(org_id, date) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_receipts_org_category ON receipts(org_id, category) WHERE is_deleted = FALSE;
+
+-- Receipts matching a text query (vendor or category, case-insensitive) and optional filters, newest first.
+CREATE OR REPLACE FUNCTION search_receipts_filtered(
+  p_org_id UUID,
+  p_query TEXT DEFAULT NULL,
+  p_date_from DATE DEFAULT NULL,
+  p_date_to DATE DEFAULT NULL,
+  p_category TEXT DEFAULT NULL,
+  p_min_total NUMERIC DEFAULT NULL,
+  p_max_total NUMERIC DEFAULT NULL,
+  p_limit INT DEFAULT 50
+)
+RETURNS TABLE (id UUID, vendor TEXT, date DATE, total NUMERIC, category TEXT) AS $$
+  SELECT r.id, r.vendor, r.date, r.total, r.category
+  FROM receipts r
+  WHERE r.org_id = p_org_id
+    AND r.is_deleted = FALSE
+    AND (p_query IS NULL OR p_query = ''
+         OR r.vendor ILIKE '%' || p_query || '%' OR r.category ILIKE '%' || p_query || '%')
+    AND (p_date_from IS NULL OR r.date >= p_date_from)
+    AND (p_date_to IS NULL OR r.date <= p_date_to)
+    AND (p_category IS NULL OR r.category ILIKE p_category)
+    AND (p_min_total IS NULL OR r.total >= p_min_total)
+    AND (p_max_total IS NULL OR r.total <= p_max_total)
+  ORDER BY r.date DESC NULLS LAST, r.created_at DESC
+  LIMIT LEAST(GREATEST(p_limit, 1), 200);
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION search_receipts_filtered(UUID, TEXT, DATE, DATE, TEXT, NUMERIC, NUMERIC, INT)
+  FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,184 @@
+-- Per-org spend rollups: one row per (org, year, month, category, vendor, currency, dated), kept current by
+-- a trigger on receipts so every write path (bulk saves, PATCH, templates, soft deletes) is covered.
+-- Receipts without a date are counted in the month they were created, kept apart (dated = FALSE) so
+-- date-filtered summaries leave them out. Missing category/vendor are ''.
+-- Backend uses the service role (bypasses RLS); RLS is enabled with no policies so clients cannot read it.
+
+CREATE TABLE receipt_spend_rollups (
+  org_id UUID NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+  year INT NOT NULL,
+  month INT NOT NULL,
+  category TEXT NOT NULL,
+  vendor TEXT NOT NULL,
+  currency VARCHAR(3) NOT NULL,
+  dated BOOLEAN NOT NULL DEFAULT TRUE,
+  receipt_count BIGINT NOT NULL DEFAULT 0,
+  total_sum NUMERIC(16, 2) NOT NULL DEFAULT 0,
+  tax_sum NUMERIC(16, 2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (org_id, year, month, category, vendor, currency, dated)
+);
+
+ALTER TABLE receipt_spend_rollups ENABLE ROW LEVEL SECURITY;
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one receipt's contribution.
+CREATE OR REPLACE FUNCTION apply_receipt_spend_rollup(r receipts, p_sign INT)
+RETURNS VOID AS $$
+DECLARE
+  d DATE := COALESCE(r.date, r.created_at::date, CURRENT_DATE);
+BEGIN
+  IF r.is_deleted THEN
+    RETURN;
+  END IF;
+  INSERT INTO receipt_spend_rollups AS s
+    (org_id, year, month, category, vendor, currency, dated, receipt_count, total_sum, tax_sum)
+  VALUES (
+    r.org_id, EXTRACT(YEAR FROM d)::int, EXTRACT(MONTH FROM d)::int,
+    COALESCE(r.category, ''), COALESCE(r.vendor, ''), COALESCE(r.currency, 'USD'), r.date IS NOT NULL,
+    p_sign, p_sign * COALESCE(r.total, 0), p_sign * COALESCE(r.tax, 0)
+  )
+  ON CONFLICT (org_id, year, month, category, vendor, currency, dated) DO UPDATE
+  SET receipt_count = s.receipt_count + EXCLUDED.receipt_count,
+      total_sum = s.total_sum + EXCLUDED.total_sum,
+      tax_sum = s.tax_sum + EXCLUDED.tax_sum;
+  IF p_sign < 0 THEN
+    DELETE FROM receipt_spend_rollups
+    WHERE org_id = r.org_id AND year = EXTRACT(YEAR FROM d)::int AND month = EXTRACT(MONTH FROM d)::int
+      AND category = COALESCE(r.category, '') AND vendor = COALESCE(r.vendor, '')
+      AND currency = COALESCE(r.currency, 'USD') AND dated = (r.date IS NOT NULL) AND receipt_count <= 0;
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION receipts_spend_rollup_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM apply_receipt_spend_rollup(OLD, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM apply_receipt_spend_rollup(NEW, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER receipts_spend_rollup
+AFTER INSERT OR DELETE OR UPDATE OF org_id, date, total, tax, category, vendor, currency, is_deleted
+ON receipts
+FOR EACH ROW EXECUTE FUNCTION receipts_spend_rollup_trigger();
+
+-- Recompute rollups from receipts (one org, or all when p_org_id is NULL): backfill and repair.
+-- The lock holds back concurrent trigger updates until the rebuilt rows are committed.
+CREATE OR REPLACE FUNCTION rebuild_receipt_spend_rollups(p_org_id UUID DEFAULT NULL)
+RETURNS BIGINT AS $$
+DECLARE
+  n BIGINT;
+BEGIN
+  LOCK TABLE receipt_spend_rollups IN EXCLUSIVE MODE;
+  DELETE FROM receipt_spend_rollups WHERE p_org_id IS NULL OR org_id = p_org_id;
+  INSERT INTO receipt_spend_rollups
+    (org_id, year, month, category, vendor, currency, dated, receipt_count, total_sum, tax_sum)
+  SELECT org_id,
+         EXTRACT(YEAR FROM COALESCE(date, created_at::date))::int,
+         EXTRACT(MONTH FROM COALESCE(date, created_at::date))::int,
+         COALESCE(category, ''), COALESCE(vendor, ''), COALESCE(currency, 'USD'), date IS NOT NULL,
+         COUNT(*), COALESCE(SUM(total), 0), COALESCE(SUM(tax), 0)
+  FROM receipts
+  WHERE is_deleted = FALSE AND (p_org_id IS NULL OR org_id = p_org_id)
+  GROUP BY 1, 2, 3, 4, 5, 6, 7;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_receipt_spend_rollups();
+
+-- Shared shape of both summaries: rows of (category, vendor, currency, month, receipt_count, total, tax);
+-- month is NULL for undated receipts (counted in totals, not in by_month).
+CREATE OR REPLACE FUNCTION spend_summary_json(p_rows JSONB, p_top_vendors INT)
+RETURNS JSONB AS $$
+  WITH r AS (
+    SELECT x.category, x.vendor, x.currency, x.month, x.receipt_count, x.total, x.tax
+    FROM jsonb_to_recordset(p_rows)
+      AS x(category TEXT, vendor TEXT, currency TEXT, month TEXT, receipt_count BIGINT, total NUMERIC, tax NUMERIC)
+  )
+  SELECT jsonb_build_object(
+    'receipt_count', (SELECT COALESCE(SUM(receipt_count), 0) FROM r),
+    'total_spend', (SELECT COALESCE(SUM(total), 0) FROM r),
+    'total_tax', (SELECT COALESCE(SUM(tax), 0) FROM r),
+    'by_category', (
+      SELECT COALESCE(jsonb_object_agg(category, spend), '{}'::jsonb)
+      FROM (SELECT category, SUM(total) AS spend FROM r GROUP BY category) c
+    ),
+    'by_vendor', (
+      SELECT COALESCE(jsonb_object_agg(vendor, spend), '{}'::jsonb)
+      FROM (SELECT vendor, SUM(total) AS spend FROM r GROUP BY vendor ORDER BY spend DESC LIMIT p_top_vendors) v
+    ),
+    'by_month', (
+      SELECT COALESCE(jsonb_object_agg(month, spend ORDER BY month), '{}'::jsonb)
+      FROM (SELECT month, SUM(total) AS spend FROM r WHERE month IS NOT NULL GROUP BY month) m
+    ),
+    'by_currency', (
+      SELECT COALESCE(jsonb_object_agg(currency, spend), '{}'::jsonb)
+      FROM (SELECT currency, SUM(total) AS spend FROM r GROUP BY currency) cur
+    )
+  );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Spend summary, exact for any date range: rollups (O(groups)) answer whole calendar months and the
+-- all-time summary; other ranges are aggregated from receipts (indexes from migration 013).
+CREATE OR REPLACE FUNCTION receipt_spend_summary(
+  p_org_id UUID,
+  p_date_from DATE DEFAULT NULL,
+  p_date_to DATE DEFAULT NULL,
+  p_top_vendors INT DEFAULT 20
+)
+RETURNS JSONB AS $$
+DECLARE
+  whole_months BOOLEAN :=
+    (p_date_from IS NULL OR EXTRACT(DAY FROM p_date_from) = 1)
+    AND (p_date_to IS NULL OR p_date_to = (date_trunc('month', p_date_to) + INTERVAL '1 month - 1 day')::date);
+  filtered BOOLEAN := p_date_from IS NOT NULL OR p_date_to IS NOT NULL;
+  grouped JSONB;
+BEGIN
+  IF whole_months THEN
+    SELECT COALESCE(jsonb_agg(g), '[]'::jsonb) INTO grouped FROM (
+      SELECT CASE WHEN category = '' THEN 'Other' ELSE category END AS category,
+             CASE WHEN vendor = '' THEN 'Unknown' ELSE vendor END AS vendor,
+             currency,
+             CASE WHEN dated THEN to_char(make_date(year, month, 1), 'YYYY-MM') END AS month,
+             SUM(receipt_count) AS receipt_count, SUM(total_sum) AS total, SUM(tax_sum) AS tax
+      FROM receipt_spend_rollups
+      WHERE org_id = p_org_id
+        AND (NOT filtered OR dated)
+        AND (p_date_from IS NULL OR make_date(year, month, 1) >= p_date_from)
+        AND (p_date_to IS NULL OR make_date(year, month, 1) <= p_date_to)
+      GROUP BY 1, 2, 3, 4
+    ) g;
+  ELSE
+    SELECT COALESCE(jsonb_agg(g), '[]'::jsonb) INTO grouped FROM (
+      SELECT COALESCE(category, 'Other') AS category,
+             COALESCE(vendor, 'Unknown') AS vendor,
+             COALESCE(currency, 'USD') AS currency,
+             to_char(date, 'YYYY-MM') AS month,
+             COUNT(*) AS receipt_count, COALESCE(SUM(total), 0) AS total, COALESCE(SUM(tax), 0) AS tax
+      FROM receipts
+      WHERE org_id = p_org_id
+        AND is_deleted = FALSE
+        AND (p_date_from IS NULL OR date >= p_date_from)
+        AND (p_date_to IS NULL OR date <= p_date_to)
+      GROUP BY 1, 2, 3, 4
+    ) g;
+  END IF;
+  RETURN spend_summary_json(grouped, p_top_vendors) || jsonb_build_object(
+    'date_from', p_date_from,
+    'date_to', p_date_to,
+    'source', CASE WHEN whole_months THEN 'rollups' ELSE 'receipts' END
+  );
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+REVOKE EXECUTE ON FUNCTION receipt_spend_summary(UUID, DATE, DATE, INT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION spend_summary_json(JSONB, INT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION rebuild_receipt_spend_rollups(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION apply_receipt_spend_rollup(receipts, INT) FROM PUBLIC, anon, authenticated;
@@ -0,0 +1,108 @@
+-- Receipt search (GET /receipts/search, chat search_receipts): full-text over vendor, category, notes and
+-- line-item descriptions, plus trigram similarity on vendor for typos. Ranked, keyset-paged by (score, id).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+
+-- notes is editable through PATCH /receipts; item_text mirrors receipt_items.description for the index.
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS notes TEXT;
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS item_text TEXT NOT NULL DEFAULT '';
+ALTER TABLE receipts ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+  setweight(to_tsvector('simple', COALESCE(vendor, '')), 'A') ||
+  setweight(to_tsvector('simple', COALESCE(category, '')), 'B') ||
+  setweight(to_tsvector('simple', COALESCE(notes, '')), 'C') ||
+  setweight(to_tsvector('simple', item_text), 'D')
+) STORED;
+
+-- btree_gin puts org_id in the same GIN index, so a search only visits the org's postings.
+CREATE INDEX IF NOT EXISTS idx_receipts_search ON receipts USING GIN (org_id, search_vector) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_receipts_vendor_trgm ON receipts USING GIN (org_id, vendor gin_trgm_ops) WHERE is_deleted = FALSE;
+
+-- Keep item_text in step with receipt_items; statement-level so a multi-row insert updates each receipt once.
+CREATE OR REPLACE FUNCTION refresh_receipt_item_text(p_receipt_ids UUID[])
+RETURNS VOID AS $$
+  UPDATE receipts r
+  SET item_text = COALESCE((
+    SELECT string_agg(i.description, ' ') FROM receipt_items i WHERE i.receipt_id = r.id
+  ), '')
+  WHERE r.id = ANY(p_receipt_ids);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION receipt_items_search_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM refresh_receipt_item_text(ARRAY(SELECT DISTINCT receipt_id FROM new_items));
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM refresh_receipt_item_text(ARRAY(SELECT DISTINCT receipt_id FROM old_items));
+  ELSE
+    PERFORM refresh_receipt_item_text(ARRAY(
+      SELECT receipt_id FROM new_items UNION SELECT receipt_id FROM old_items
+    ));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER receipt_items_search_insert AFTER INSERT ON receipt_items
+REFERENCING NEW TABLE AS new_items FOR EACH STATEMENT EXECUTE FUNCTION receipt_items_search_trigger();
+CREATE TRIGGER receipt_items_search_update AFTER UPDATE ON receipt_items
+REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items FOR EACH STATEMENT EXECUTE FUNCTION receipt_items_search_trigger();
+CREATE TRIGGER receipt_items_search_delete AFTER DELETE ON receipt_items
+REFERENCING OLD TABLE AS old_items FOR EACH STATEMENT EXECUTE FUNCTION receipt_items_search_trigger();
+
+-- Backfill item_text for existing receipts.
+UPDATE receipts r
+SET item_text = i.text
+FROM (SELECT receipt_id, string_agg(description, ' ') AS text FROM receipt_items GROUP BY receipt_id) i
+WHERE i.receipt_id = r.id;
+
+-- Ranked search. Matches full-text (every word, last word as a prefix) or a vendor within trigram
+-- similarity; score = text rank + vendor similarity. Pass the last row's (score, id) to get the next page.
+CREATE OR REPLACE FUNCTION search_receipts_ranked(
+  p_org_id UUID,
+  p_query TEXT,
+  p_limit INT DEFAULT 20,
+  p_after_score REAL DEFAULT NULL,
+  p_after_id UUID DEFAULT NULL,
+  p_date_from DATE DEFAULT NULL,
+  p_date_to DATE DEFAULT NULL,
+  p_category TEXT DEFAULT NULL,
+  p_min_total NUMERIC DEFAULT NULL,
+  p_max_total NUMERIC DEFAULT NULL
+)
+RETURNS TABLE (
+  id UUID, vendor TEXT, date DATE, total NUMERIC, currency VARCHAR, category TEXT,
+  needs_review BOOLEAN, created_at TIMESTAMPTZ, score REAL
+) AS $$
+  WITH q AS (
+    SELECT NULLIF(
+             array_to_string(
+               ARRAY(SELECT quote_literal(w) || ':*'
+                     FROM regexp_split_to_table(lower(p_query), '[^[:alnum:]]+') AS w WHERE w <> ''),
+               ' & '),
+             '')::tsquery AS ts,
+           lower(p_query) AS text
+  ),
+  hits AS (
+    SELECT r.id, r.vendor, r.date, r.total, r.currency, r.category, r.needs_review, r.created_at,
+           (COALESCE(ts_rank_cd(r.search_vector, q.ts), 0) + similarity(COALESCE(r.vendor, ''), q.text))::real AS score
+    FROM receipts r, q
+    WHERE r.org_id = p_org_id
+      AND r.is_deleted = FALSE
+      AND ((q.ts IS NOT NULL AND r.search_vector @@ q.ts) OR r.vendor % q.text)
+      AND (p_date_from IS NULL OR r.date >= p_date_from)
+      AND (p_date_to IS NULL OR r.date <= p_date_to)
+      AND (p_category IS NULL OR r.category ILIKE p_category)
+      AND (p_min_total IS NULL OR r.total >= p_min_total)
+      AND (p_max_total IS NULL OR r.total <= p_max_total)
+  )
+  SELECT * FROM hits h
+  WHERE p_after_score IS NULL OR (h.score, h.id) < (p_after_score, p_after_id)
+  ORDER BY h.score DESC, h.id DESC
+  LIMIT LEAST(GREATEST(p_limit, 1), 100);
+$$ LANGUAGE sql STABLE;
+
+REVOKE EXECUTE ON FUNCTION search_receipts_ranked(UUID, TEXT, INT, REAL, UUID, DATE, DATE, TEXT, NUMERIC, NUMERIC)
+  FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION refresh_receipt_item_text(UUID[]) FROM PUBLIC, anon, authenticated;
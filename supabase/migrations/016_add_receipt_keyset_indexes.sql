@@ -0,0 +1,10 @@
+-- Keyset paging for GET /receipts (app.services.receipt_query): ORDER BY <sort> DESC NULLS LAST, id DESC
+-- continues after the previous page's last row, and the reverse order is a backward scan of the same index.
+CREATE INDEX IF NOT EXISTS idx_receipts_org_created_keyset ON receipts(org_id, created_at DESC NULLS LAST, id DESC)
+  WHERE NOT is_deleted;
+CREATE INDEX IF NOT EXISTS idx_receipts_org_date_keyset ON receipts(org_id, date DESC NULLS LAST, id DESC)
+  WHERE NOT is_deleted;
+CREATE INDEX IF NOT EXISTS idx_receipts_org_total_keyset ON receipts(org_id, total DESC NULLS LAST, id DESC)
+  WHERE NOT is_deleted;
+CREATE INDEX IF NOT EXISTS idx_receipts_org_review ON receipts(org_id, created_at DESC, id DESC)
+  WHERE NOT is_deleted AND needs_review;